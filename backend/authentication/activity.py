@@ -0,0 +1,97 @@
+"""
+Buffered writer for the Activity feed.
+
+``record()`` never touches the database. Once the surrounding transaction
+commits, the event is appended to an in-process buffer. The buffer is written
+with one ``bulk_create`` from the ``request_finished`` signal, which fires
+after the response has been sent, as soon as it holds ACTIVITY_FLUSH_SIZE
+events or ACTIVITY_FLUSH_INTERVAL seconds have passed since the last write.
+Anything still buffered is written at interpreter exit, and readers of the
+feed call ``flush()`` first so this process's own events are always visible.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .models import Activity
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SIZE = getattr(settings, 'ACTIVITY_FLUSH_SIZE', 100)
+FLUSH_INTERVAL = getattr(settings, 'ACTIVITY_FLUSH_INTERVAL', 2.0)
+# A failing database must not let the buffer grow without bound.
+MAX_BUFFERED = getattr(settings, 'ACTIVITY_MAX_BUFFERED', 10000)
+
+
+class ActivityBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, activity):
+        with self._lock:
+            if len(self._pending) >= MAX_BUFFERED:
+                logger.warning('Activity buffer full; dropping %s', activity.verb)
+                return
+            self._pending.append(activity)
+
+    def clear(self):
+        with self._lock:
+            self._pending = []
+
+    def due(self):
+        return len(self._pending) >= FLUSH_SIZE or (
+            self._pending and time.monotonic() - self._last_flush >= FLUSH_INTERVAL
+        )
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if not batch:
+            return 0
+        try:
+            Activity.objects.bulk_create(batch)
+        except DatabaseError:
+            logger.exception('Could not write %d activities', len(batch))
+            return 0
+        return len(batch)
+
+
+buffer = ActivityBuffer()
+
+
+def record(actor, verb, description, status='', target=None):
+    """Queue an activity; it is dropped if the current transaction rolls back."""
+    activity = Activity(
+        actor_id=getattr(actor, 'pk', None),
+        verb=verb,
+        description=description[:255],
+        status=status,
+        target_type=target._meta.model_name if target is not None else '',
+        target_id=target.pk if target is not None else None,
+        created_at=timezone.now(),
+    )
+    transaction.on_commit(lambda: buffer.add(activity))
+
+
+def flush():
+    return buffer.flush()
+
+
+def flush_if_due(**kwargs):
+    """request_finished receiver."""
+    if buffer.due():
+        buffer.flush()
+
+
+atexit.register(flush)
@@ -1,65 +1,92 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.contrib.auth.models import User
+from django.db import transaction
 from django.db.models import Count
-from .models import UserProfile, Business
-from products.models import Product
-from .serializers import UserSerializer
+from .models import Activity, UserProfile, Business
+from products import workflow
+from products.models import Product, ProductStatusCounter
+from .serializers import ActivitySerializer, UserSerializer
+from . import activity
+from .backends import email_matches
 from .decorators import admin_required, role_required
+from .tokens import bump_token_version, forget_token_version
+from marketplace import instrumentation
+from marketplace.pagination import FeedKeysetPagination, UserKeysetPagination, paginate
+from marketplace.renderers import FastJSONRenderer
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 @admin_required
 def admin_stats(request):
     """Get admin dashboard statistics"""
+    counts = ProductStatusCounter.objects.dashboard_counts()
     stats = {
         'total_users': User.objects.count(),
-        'total_products': Product.objects.count(),
-        'pending_approvals': Product.objects.filter(status='pending_approval').count(),
+        'total_products': counts['total'],
+        'pending_approvals': counts['pending'],
         'total_businesses': Business.objects.count()
     }
     return Response(stats)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@admin_required
+def request_timings(request):
+    """Per-route latency histograms for the requests this process served recently"""
+    samples = instrumentation.timings.snapshot()
+    return Response({
+        'requests': len(samples),
+        'buffer_size': instrumentation.BUFFER_SIZE,
+        'routes': instrumentation.route_summaries(samples),
+    })
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 @admin_required
 def all_users(request):
     """Get all users for admin management"""
     users = User.objects.select_related('profile', 'profile__business').all()
-    return Response(UserSerializer(users, many=True).data)
+    return paginate(
+        request, users, lambda rows: UserSerializer(rows, many=True).data,
+        pagination_class=UserKeysetPagination
+    )
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@renderer_classes([FastJSONRenderer])
 @admin_required
 def all_products(request):
     """Get all products for admin management"""
-    from products.serializers import ProductSerializer
-    products = Product.objects.select_related('created_by', 'business').all()
-    return Response(ProductSerializer(products, many=True).data)
+    from products.listing import paginated_rows
+    return Response(paginated_rows(request, Product.objects.all()))
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@admin_required
+def export_products(request, export_format):
+    """Stream every product as CSV or JSON Lines"""
+    from products.exports import FORMATS, export_response
+    if export_format not in FORMATS:
+        return Response(
+            {'error': f'Unsupported format. Use one of: {", ".join(FORMATS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return export_response(Product.objects.all(), export_format)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 @admin_required
 def recent_activities(request):
     """Get recent activities for admin dashboard"""
-    # Mock activities - in real app, you'd have an Activity model
-    activities = [
-        {
-            'user': 'John Smith',
-            'action': 'Created product "Wireless Headphones"',
-            'time': '2024-01-15T10:30:00Z',
-            'status': 'pending_approval'
-        },
-        {
-            'user': 'Sarah Johnson',
-            'action': 'Approved product "Smart Watch"',
-            'time': '2024-01-15T09:15:00Z',
-            'status': 'approved'
-        }
-    ]
-    return Response(activities)
+    activity.flush()
+    activities = Activity.objects.select_related('actor')
+    return paginate(
+        request, activities, lambda rows: ActivitySerializer(rows, many=True).data,
+        pagination_class=FeedKeysetPagination
+    )
 
 @api_view(['PATCH'])
 @permission_classes([IsAuthenticated])
@@ -75,6 +102,8 @@ def update_user_role(request, user_id):
         
         user.profile.role = new_role
         user.profile.save()
+        bump_token_version(user.id)
+        activity.record(request.user, 'user.updated', f'Changed role of {user.username} to {new_role}', target=user)
         
         return Response({'message': 'Role updated successfully'})
     except User.DoesNotExist:
@@ -92,7 +121,7 @@ def create_user(request):
         if field not in data:
             return Response({'error': f'{field} is required'}, status=status.HTTP_400_BAD_REQUEST)
     
-    if User.objects.filter(email=data['email']).exists():
+    if User.objects.filter(email_matches(data['email'])).exists():
         return Response({'error': 'User with this email already exists'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
@@ -108,6 +137,7 @@ def create_user(request):
             role=data['role'],
             business_id=data.get('business_id')  # Optional
         )
+        activity.record(request.user, 'user.created', f'Created user {user.username}', target=user)
         return Response({'message': 'User created successfully', 'user_id': user.id}, status=status.HTTP_201_CREATED)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -127,7 +157,7 @@ def update_user(request, user_id):
         if 'last_name' in data:
             user.last_name = data['last_name']
         if 'email' in data:
-            if User.objects.filter(email=data['email']).exclude(id=user_id).exists():
+            if User.objects.filter(email_matches(data['email'])).exclude(id=user_id).exists():
                 return Response({'error': 'Email already in use'}, status=status.HTTP_400_BAD_REQUEST)
             user.email = data['email']
             user.username = data['email']
@@ -144,7 +174,15 @@ def update_user(request, user_id):
             if 'business_id' in data:
                 user.profile.business_id = data['business_id']
             user.profile.save()
+            if 'role' in data or 'business_id' in data:
+                bump_token_version(user.id)
         
+        if 'email' in data or 'business_id' in data:
+            # Public catalogue entries embed the creator's username and business name.
+            from products import catalogue
+            catalogue.bump()
+        
+        activity.record(request.user, 'user.updated', f'Updated user {user.username}', target=user)
         return Response({'message': 'User updated successfully'})
     except User.DoesNotExist:
         return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -159,7 +197,10 @@ def delete_user(request, user_id):
         if user.profile.role == 'admin':
             return Response({'error': 'Cannot delete admin user'}, status=status.HTTP_400_BAD_REQUEST)
 
+        username = user.username
         user.delete()
+        forget_token_version(user_id)
+        activity.record(request.user, 'user.deleted', f'Deleted user {username}')
         return Response({'message': 'User deleted successfully'})
     except User.DoesNotExist:
         return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -169,16 +210,16 @@ def delete_user(request, user_id):
 @role_required(['viewer'])
 def viewer_stats(request):
     """Get viewer dashboard statistics"""
-    from products.models import Product
-    total_products = Product.objects.count()
-    categories = Product.objects.values('category').distinct().count()
-    recently_added = Product.objects.order_by('-created_at')[:10].count()
+    counts = ProductStatusCounter.objects.dashboard_counts()
+    # Products have no category; the catalogue is browsed by business industry.
+    categories = ProductStatusCounter.objects.industry_count()
+    recently_added = counts['weekly_approved']
 
     # For favorites, if there's a favorites model, but for now, dummy
     favorites = 0  # TODO: implement favorites
 
     stats = {
-        'available_products': total_products,
+        'available_products': counts['approved'],
         'categories': categories,
         'recently_added': recently_added,
         'favorites': favorites
@@ -194,16 +235,26 @@ def update_product(request, product_id):
         product = Product.objects.get(id=product_id)
         
         # Update fields if provided
-        if 'name' in request.data:
-            product.name = request.data['name']
-        if 'description' in request.data:
-            product.description = request.data['description']
-        if 'price' in request.data:
-            product.price = request.data['price']
-        if 'status' in request.data:
-            product.status = request.data['status']
+        fields = [name for name in ['name', 'description', 'price'] if name in request.data]
+        for name in fields:
+            setattr(product, name, request.data[name])
+        action = None
+        if request.data.get('status', product.status) != product.status:
+            action = workflow.action_between(product.status, request.data['status'])
+            if action is None:
+                return Response(
+                    {'error': f'Cannot move a {product.status} product to {request.data["status"]}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
         
-        product.save()
+        with transaction.atomic():
+            if action and not workflow.transition(product, action, request.user.pk):
+                return Response({'error': 'Product was changed by another request'}, status=status.HTTP_409_CONFLICT)
+            if fields:
+                workflow.save_edits(product, fields)
+        activity.record(
+            request.user, 'product.updated', f'Updated product "{product.name}"', product.status, product
+        )
         return Response({'message': 'Product updated successfully'})
     except Product.DoesNotExist:
         return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -216,6 +267,7 @@ def delete_product(request, product_id):
     try:
         product = Product.objects.get(id=product_id)
         product.delete()
+        activity.record(request.user, 'product.deleted', f'Deleted product "{product.name}"')
         return Response({'message': 'Product deleted successfully'})
     except Product.DoesNotExist:
         return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.core.signals import request_finished
+from django.db.models.signals import post_delete, post_save
 
 
 class AuthenticationConfig(AppConfig):
     name = 'authentication'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from . import activity, tokens
+        request_finished.connect(activity.flush_if_due, dispatch_uid='activity-flush')
+        post_save.connect(tokens.forget_saved_user, sender=get_user_model(), dispatch_uid='token-version-save')
+        post_delete.connect(tokens.forget_saved_user, sender=get_user_model(), dispatch_uid='token-version-delete')
@@ -0,0 +1,94 @@
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from . import tokens
+
+
+class ProfileJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that loads the user's profile and business in the same
+    query as the user.
+
+    Role checks (role_required/admin_required) and views then read
+    ``request.user.profile`` and ``profile.business`` from that one object
+    instead of lazily loading each relation.
+    """
+
+    def get_user_queryset(self):
+        return self.user_model.objects.select_related('profile', 'profile__business')
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        try:
+            user = self.get_user_queryset().get(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    Authenticated user backed by verified token claims.
+
+    ``role_claim`` and ``business_id_claim`` are answered from the token.
+    Everything else loads the real user (with profile and business, in one
+    query) on first access, so the object still works as a User.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id, role, business_id, load):
+        super().__init__(load)
+        self.__dict__['_user_id'] = user_id
+        self.__dict__['role_claim'] = role
+        self.__dict__['business_id_claim'] = business_id
+
+    @property
+    def pk(self):
+        return self.__dict__['_user_id']
+
+    id = pk
+
+    def __bool__(self):
+        return True
+
+
+class RoleClaimsJWTAuthentication(ProfileJWTAuthentication):
+    """
+    Authenticate from role claims without loading the user.
+
+    Tokens without claims, whose ``token_version`` is stale, or whose user is
+    inactive, take the ProfileJWTAuthentication path, which loads the user
+    and refuses inactive ones.
+    """
+
+    def get_user(self, validated_token):
+        role = validated_token.get(tokens.ROLE_CLAIM)
+        version = validated_token.get(tokens.VERSION_CLAIM)
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if role is None or version is None or user_id is None:
+            return super().get_user(validated_token)
+        if tokens.current_token_version(user_id) != version:
+            return super().get_user(validated_token)
+        return ClaimsUser(
+            user_id, role, validated_token.get(tokens.BUSINESS_CLAIM),
+            lambda: ProfileJWTAuthentication.get_user(self, validated_token),
+        )
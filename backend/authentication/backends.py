@@ -1,25 +1,46 @@
-from django.contrib.auth.backends import BaseBackend
-from django.contrib.auth.models import User
+"""
+Email login.
+
+Emails are unique case-insensitively through a partial unique index on
+``LOWER(email)`` that skips blank emails (migration 0005). ``email_matches()``
+builds the filter that index answers. It repeats the index condition, which
+SQLite needs before it will use a partial index, and lowercases both sides
+with the database's LOWER, since SQLite's only folds ASCII and Python's
+``str.lower()`` would then miss non-ASCII emails stored as typed.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Q, Value
+from django.db.models.functions import Lower
+from django.db.models.lookups import Exact
+
+UserModel = get_user_model()
+
+
+def email_matches(email):
+    """Filter for users whose email equals ``email`` ignoring case, answered by the unique index."""
+    return Q(Exact(Lower('email'), Lower(Value(email)))) & ~Q(email='')
+
+
+class EmailBackend(ModelBackend):
+    """
+    Authenticate with an email address, or a username when the identifier has no ``@``.
+
+    Either way it is one indexed query. On a miss the password is hashed
+    anyway, so unknown emails take as long as wrong passwords.
+    """
 
-class EmailBackend(BaseBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if not username or password is None:
+            return None
+        lookup = email_matches(username) if '@' in username else Q(username=username)
         try:
-            # Try to find user by email first
-            user = User.objects.get(email=username)
-            if user.check_password(password):
-                return user
-        except User.DoesNotExist:
-            # If not found by email, try by username
-            try:
-                user = User.objects.get(username=username)
-                if user.check_password(password):
-                    return user
-            except User.DoesNotExist:
-                return None
+            user = UserModel._default_manager.get(lookup)
+        except UserModel.DoesNotExist:
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
         return None
-
-    def get_user(self, user_id):
-        try:
-            return User.objects.get(pk=user_id)
-        except User.DoesNotExist:
-            return None
\ No newline at end of file
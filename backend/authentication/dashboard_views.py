@@ -118,13 +118,13 @@ def viewer_dashboard(request):
 @require_http_methods(["GET"])
 def get_user_dashboard(request):
     """Route user to appropriate dashboard based on role"""
-    from rest_framework_simplejwt.authentication import JWTAuthentication
     from rest_framework.exceptions import AuthenticationFailed
+    from .authentication import ProfileJWTAuthentication
     
     # Authenticate user
-    jwt_auth = JWTAuthentication()
+    jwt_auth = ProfileJWTAuthentication()
     try:
-        user, token = jwt_auth.authenticate(request)
+        user, token = jwt_auth.authenticate(request) or (None, None)
         if not user or not hasattr(user, 'profile'):
             return JsonResponse(
                 {'error': 'Authentication required'}, 
@@ -136,6 +136,10 @@ def get_user_dashboard(request):
             status=401
         )
     
+    # The role dashboards below read request.user; hand them the user loaded
+    # with its profile instead of the session user.
+    request.user = user
+    
     # Route based on role
     role = user.profile.role
     
@@ -1,12 +1,23 @@
 from functools import wraps
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.response import Response
 from rest_framework import status
 
+def user_role(user):
+    """Role of ``user``, from token claims when present, else from the profile"""
+    role = getattr(user, 'role_claim', None)
+    if role is not None:
+        return role
+    profile = getattr(user, 'profile', None)
+    return profile.role if profile is not None else None
+
 def admin_required(view_func):
     """Decorator to ensure only admin users can access the view"""
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
-        if not hasattr(request.user, 'profile') or request.user.profile.role != 'admin':
+        if user_role(request.user) != 'admin':
             return Response(
                 {'error': 'Admin access required'}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -19,11 +30,41 @@ def role_required(allowed_roles):
     def decorator(view_func):
         @wraps(view_func)
         def wrapper(request, *args, **kwargs):
-            if not hasattr(request.user, 'profile') or request.user.profile.role not in allowed_roles:
+            if user_role(request.user) not in allowed_roles:
                 return Response(
                     {'error': f'Access denied. Required roles: {", ".join(allowed_roles)}'}, 
                     status=status.HTTP_403_FORBIDDEN
                 )
             return view_func(request, *args, **kwargs)
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
+
+async def authenticate_async(request):
+    """Run the default JWT authentication for a plain (non-DRF) async view"""
+    from .authentication import RoleClaimsJWTAuthentication
+    result = await sync_to_async(RoleClaimsJWTAuthentication().authenticate)(request)
+    return result[0] if result else None
+
+def async_role_required(allowed_roles):
+    """role_required for async Django views: authenticates the JWT itself"""
+    def decorator(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                user = await authenticate_async(request)
+            except AuthenticationFailed as exc:
+                return JsonResponse({'detail': exc.detail}, status=status.HTTP_401_UNAUTHORIZED)
+            if user is None:
+                return JsonResponse(
+                    {'detail': 'Authentication credentials were not provided.'},
+                    status=status.HTTP_401_UNAUTHORIZED
+                )
+            if user_role(user) not in allowed_roles:
+                return JsonResponse(
+                    {'error': f'Access denied. Required roles: {", ".join(allowed_roles)}'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            request.user = user
+            return await view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,67 @@
+import logging
+import time
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from authentication.backends import email_matches
+from products.benchmarks import analyze, count_queries, measure, scratch_database
+from products.synthetic import PASSWORD, Generator
+
+USERS_PER_BUSINESS = 1000
+# Businesses per Generator.users() call, which keeps memory bounded at 1M users.
+CHUNK = 10
+
+
+class Command(BaseCommand):
+    help = 'Measure the login user lookup and login latency and throughput at scale'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stdout.write(f'Seeding {options["users"]} users...')
+            started = time.perf_counter()
+            generator = Generator()
+            businesses = max(1, options['users'] // USERS_PER_BUSINESS)
+            for chunk in range(0, businesses, CHUNK):
+                generator.users(
+                    generator.businesses(min(CHUNK, businesses - chunk)), USERS_PER_BUSINESS,
+                    prefix=f'login{chunk}-', role='viewer'
+                )
+            analyze()
+            self.stdout.write(f'  seeded in {time.perf_counter() - started:.1f}s')
+
+            email = f'login{(businesses - 1) // CHUNK * CHUNK}-0@example.test'
+            self.stdout.write(f'Plan: {User.objects.filter(email_matches(email)).explain()}')
+            lookups = [
+                ('LOWER(email) index', lambda: User.objects.get(email_matches(email.upper()))),
+                # Baselines: what the lookup cost before the index.
+                ('email= (unindexed)', lambda: list(User.objects.filter(email=email))),
+                ('email__iexact (unindexed)', lambda: list(User.objects.filter(email__iexact=email))),
+            ]
+            for label, lookup in lookups:
+                self.report(f'lookup {label}', measure(lookup, options['repeat']))
+
+            # Hashing dominates a login, so the three outcomes should cost the same.
+            client = APIClient()
+            logging.getLogger('django.request').setLevel(logging.ERROR)  # one 401 warning per failed login
+            for label, credentials in [
+                ('success', {'email': email, 'password': PASSWORD}),
+                ('wrong password', {'email': email, 'password': 'wrong'}),
+                ('unknown email', {'email': 'nobody@example.test', 'password': PASSWORD}),
+            ]:
+                with count_queries() as counter:
+                    authenticate(None, username=credentials['email'], password=credentials['password'])
+                stats = measure(lambda: client.post('/api/auth/login/', credentials, format='json'), options['repeat'])
+                self.report(f'login {label} ({counter["queries"]} auth queries)', stats)
+
+    def report(self, label, stats):
+        self.stdout.write(
+            f'{label}: p50={stats["p50_ms"]}ms p95={stats["p95_ms"]}ms max={stats["max_ms"]}ms '
+            f'({1000 / stats["p50_ms"]:.1f}/s)'
+        )
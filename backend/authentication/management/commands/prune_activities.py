@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from authentication.models import Activity
+
+
+class Command(BaseCommand):
+    help = 'Delete activities past the retention window and beyond the row cap, in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'ACTIVITY_RETENTION_DAYS', 90))
+        parser.add_argument(
+            '--keep', type=int, default=getattr(settings, 'ACTIVITY_MAX_ROWS', 1_000_000),
+            help='Keep at most this many of the newest activities.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Rows per DELETE, so each statement holds its locks briefly.'
+        )
+
+    def handle(self, *args, **options):
+        expired = Q(created_at__lt=timezone.now() - timedelta(days=options['days']))
+
+        # The newest row past the cap: it and everything older goes.
+        boundary = Activity.objects.order_by('-created_at', '-id').values_list(
+            'created_at', 'id'
+        )[options['keep']:options['keep'] + 1].first()
+        if boundary is not None:
+            created_at, activity_id = boundary
+            expired |= Q(created_at__lt=created_at) | Q(created_at=created_at, id__lte=activity_id)
+
+        deleted = 0
+        while True:
+            ids = list(
+                Activity.objects.filter(expired).order_by('created_at', 'id')
+                .values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            deleted += Activity.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} activities'))
@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-10-18 05:10
+
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+# Lives on auth.User, which this app doesn't own, so it's created through the
+# schema editor instead of an AddConstraint on the model state.
+EMAIL_UNIQUE = models.UniqueConstraint(
+    Lower('email'), condition=~models.Q(email=''), name='auth_user_email_ci_unique'
+)
+
+
+def add_constraint(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    duplicates = list(
+        User.objects.exclude(email='').values(lowered=Lower('email'))
+        .annotate(count=models.Count('id')).filter(count__gt=1).values_list('lowered', flat=True)[:10]
+    )
+    if duplicates:
+        raise RuntimeError(
+            'Emails must be unique ignoring case before this migration can run; shared by several users: '
+            + ', '.join(duplicates)
+        )
+    schema_editor.add_constraint(User, EMAIL_UNIQUE)
+
+
+def remove_constraint(apps, schema_editor):
+    schema_editor.remove_constraint(apps.get_model('auth', 'User'), EMAIL_UNIQUE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0004_activity'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_constraint, remove_constraint),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 class Business(models.Model):
@@ -22,6 +23,8 @@ class UserProfile(models.Model):
     business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name='users')
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='viewer')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped whenever role or business change so older token claims are ignored.
+    token_version = models.PositiveIntegerField(default=0)
     
     def __str__(self):
         return f"{self.user.username} - {self.role} at {self.business.name}"
@@ -34,3 +37,26 @@ class UserProfile(models.Model):
     
     def can_manage_users(self):
         return self.role == 'admin'
+
+
+class Activity(models.Model):
+    """One entry in the admin activity feed. Rows are append-only."""
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='activities')
+    # Dotted event name, e.g. "product.approved" or "user.deleted".
+    verb = models.CharField(max_length=50)
+    description = models.CharField(max_length=255)
+    # Product status after the event, where it has one.
+    status = models.CharField(max_length=20, blank=True)
+    target_type = models.CharField(max_length=50, blank=True)
+    target_id = models.PositiveBigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Keyset-paginated feed, and the retention cutoff in prune_activities.
+            models.Index(fields=['-created_at', '-id'], name='activity_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.verb} by {self.actor_id} at {self.created_at}"
@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import UserProfile, Business
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from .backends import email_matches
+from .models import Activity, UserProfile, Business
+from .tokens import RoleRefreshToken
 
 class BusinessSerializer(serializers.ModelSerializer):
     class Meta:
@@ -35,6 +38,11 @@ class RegisterSerializer(serializers.ModelSerializer):
         model = User
         fields = ['username', 'email', 'password', 'confirm_password', 'first_name', 'last_name', 'company_name', 'industry', 'company_size', 'role']
     
+    def validate_email(self, value):
+        if value and User.objects.filter(email_matches(value)).exists():
+            raise serializers.ValidationError('A user with this email already exists.')
+        return value
+
     def validate(self, data):
         if data['password'] != data['confirm_password']:
             raise serializers.ValidationError("Passwords don't match")
@@ -63,4 +71,23 @@ class RegisterSerializer(serializers.ModelSerializer):
             role=role
         )
         
-        return user
\ No newline at end of file
+        return user
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh that re-stamps role claims from the current profile"""
+    token_class = RoleRefreshToken
+
+
+class ActivitySerializer(serializers.ModelSerializer):
+    user = serializers.SerializerMethodField()
+    action = serializers.CharField(source='description')
+    time = serializers.DateTimeField(source='created_at')
+
+    class Meta:
+        model = Activity
+        fields = ['id', 'user', 'action', 'time', 'status', 'verb', 'target_type', 'target_id']
+
+    def get_user(self, activity):
+        if activity.actor is None:
+            return 'Deleted user'
+        return activity.actor.get_full_name() or activity.actor.username
@@ -1,3 +1,382 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 
-# Create your tests here.
+from products.models import Product
+
+from . import activity
+from .backends import email_matches
+from .models import Activity, Business, UserProfile
+
+
+class AuthTestCase(TestCase):
+    """Shared fixtures: one business with a user per role."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.business = Business.objects.create(
+            name='Acme', industry='Technology', company_size='10-50'
+        )
+        cls.users = {}
+        for role in ['admin', 'editor', 'approver', 'viewer']:
+            user = User.objects.create_user(
+                username=role, email=f'{role}@acme.test', password='password123'
+            )
+            UserProfile.objects.create(user=user, business=cls.business, role=role)
+            cls.users[role] = user
+
+    def setUp(self):
+        # Buffered events belong to this test's database, which is rolled back.
+        activity.buffer.clear()
+        self.addCleanup(activity.buffer.clear)
+
+    def token_client(self, role):
+        client = APIClient()
+        token = RefreshToken.for_user(self.users[role]).access_token
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client
+
+    def capture(self, client, url):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        return response, [q['sql'] for q in context]
+
+
+class ProfileJWTAuthenticationTests(AuthTestCase):
+
+    def test_role_gated_endpoint_costs_one_auth_query(self):
+        response, queries = self.capture(self.token_client('approver'), '/api/products/stats/')
+        self.assertEqual(response.status_code, 200)
+        auth_queries = [q for q in queries if 'auth_user' in q or 'authentication_' in q]
+        self.assertEqual(len(auth_queries), 1)
+        self.assertIn('authentication_business', auth_queries[0])
+
+    def test_profile_is_reused_by_the_view(self):
+        response, queries = self.capture(self.token_client('editor'), '/api/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 2)  # user+profile+business, product list
+
+    def test_wrong_role_is_rejected(self):
+        response, _ = self.capture(self.token_client('viewer'), '/api/products/pending/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_user_dashboard_routes_by_role(self):
+        response, _ = self.capture(self.token_client('admin'), '/api/auth/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['dashboard_type'], 'admin')
+
+
+class ViewerStatsTests(AuthTestCase):
+
+    def test_counts_approved_products_from_the_counters(self):
+        other = Business.objects.create(name='Globex', industry='Retail', company_size='1-10')
+        seller = User.objects.create_user(username='seller', email='seller@globex.test', password='x')
+        profiles = [self.users['editor'].profile, UserProfile.objects.create(user=seller, business=other, role='editor')]
+        for profile, status in [(profiles[0], 'approved'), (profiles[0], 'approved'), (profiles[1], 'approved'),
+                                (profiles[1], 'draft')]:
+            Product.objects.create(
+                name='Lamp', description='Desk lamp', price='9.99', status=status,
+                created_by=profile.user, business=profile
+            )
+        response, queries = self.capture(self.token_client('viewer'), '/api/auth/viewer/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'available_products': 3, 'categories': 2, 'recently_added': 3, 'favorites': 0,
+        })
+        self.assertFalse([q for q in queries if 'FROM "products_product"' in q])
+        self.assertEqual(self.capture(self.token_client('editor'), '/api/auth/viewer/stats/')[0].status_code, 403)
+
+
+class RoleClaimsTests(AuthTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def login(self, role):
+        response = APIClient().post(
+            '/api/auth/login/', {'email': f'{role}@acme.test', 'password': 'password123'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def bearer(self, access):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        return client
+
+    def test_login_token_carries_role_claims(self):
+        access = AccessToken(self.login('approver')['access'])
+        self.assertEqual(access['role'], 'approver')
+        self.assertEqual(access['business_id'], self.business.id)
+        self.assertEqual(access['token_version'], 0)
+
+    def test_role_check_does_not_load_the_user(self):
+        client = self.bearer(self.login('approver')['access'])
+        response, queries = self.capture(client, '/api/products/stats/')
+        self.assertEqual(response.status_code, 200)
+        auth_queries = [q for q in queries if 'auth_user' in q or 'authentication_' in q]
+        self.assertEqual(len(auth_queries), 1)  # the token version
+        self.assertNotIn('authentication_business', auth_queries[0])
+
+    def test_token_versions_can_come_from_a_shared_cache(self):
+        import tempfile
+        from django.core.exceptions import ImproperlyConfigured
+        from django.test import override_settings
+
+        client = self.bearer(self.login('approver')['access'])
+        with tempfile.TemporaryDirectory() as location, override_settings(
+            CACHES={
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'tokens': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location},
+            },
+            TOKEN_VERSION_CACHE_ALIAS='tokens',
+        ):
+            client.get('/api/products/stats/')  # warm the cache
+            response, queries = self.capture(client, '/api/products/stats/')
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse([q for q in queries if 'auth_user' in q or 'authentication_' in q])
+
+            user = self.users['approver']
+            user.is_active = False
+            user.save()
+            self.assertEqual(client.get('/api/products/stats/').status_code, 401)
+
+            with override_settings(TOKEN_VERSION_CACHE_ALIAS='default'), self.assertRaises(ImproperlyConfigured):
+                client.get('/api/products/stats/')
+
+    def test_inactive_user_is_rejected(self):
+        client = self.bearer(self.login('approver')['access'])
+        self.assertEqual(client.get('/api/products/pending/').status_code, 200)
+        User.objects.filter(pk=self.users['approver'].pk).update(is_active=False)
+        self.assertEqual(client.get('/api/products/pending/').status_code, 401)
+        self.assertEqual(client.get('/api/products/stats/').status_code, 401)
+
+    def test_role_change_invalidates_claims(self):
+        client = self.bearer(self.login('approver')['access'])
+        self.assertEqual(client.get('/api/products/stats/').status_code, 200)
+
+        admin = self.bearer(self.login('admin')['access'])
+        response = admin.patch(
+            f'/api/auth/admin/users/{self.users["approver"].id}/update/',
+            {'role': 'viewer'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.get('/api/products/stats/').status_code, 403)
+
+    def test_refresh_restamps_claims(self):
+        tokens = self.login('editor')
+        profile = self.users['editor'].profile
+        profile.role = 'approver'
+        profile.save()
+        response = APIClient().post('/api/auth/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(AccessToken(response.json()['access'])['role'], 'approver')
+
+    def test_deleted_user_is_rejected(self):
+        client = self.bearer(self.login('approver')['access'])
+        self.assertEqual(client.get('/api/products/stats/').status_code, 200)
+        admin = self.bearer(self.login('admin')['access'])
+        admin.delete(f'/api/auth/admin/users/{self.users["approver"].id}/delete/')
+        self.assertEqual(client.get('/api/products/stats/').status_code, 401)
+
+    def test_claims_user_still_creates_products(self):
+        client = self.bearer(self.login('editor')['access'])
+        response = client.post('/api/products/', {'name': 'Lamp', 'description': 'Desk lamp', 'price': '12.50'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+
+class EmailBackendTests(AuthTestCase):
+
+    def login(self, email, password='password123'):
+        return APIClient().post('/api/auth/login/', {'email': email, 'password': password}, format='json')
+
+    def test_login_is_one_case_insensitive_query(self):
+        from django.contrib.auth import authenticate
+
+        with CaptureQueriesContext(connection) as context:
+            user = authenticate(None, username='Editor@ACME.test', password='password123')
+        self.assertEqual(user, self.users['editor'])
+        self.assertEqual(len(context), 1)
+        self.assertIn('LOWER', context[0]['sql'])
+        self.assertEqual(self.login('admin').status_code, 200)  # usernames still work, for the admin site
+        self.assertEqual(self.login('editor@acme.test', 'wrong').status_code, 401)
+
+        User.objects.filter(pk=self.users['viewer'].pk).update(is_active=False)
+        self.assertEqual(self.login('viewer@acme.test').status_code, 401)
+
+    def test_non_ascii_emails_log_in_as_registered(self):
+        User.objects.create_user(username='elise', email='Élise@x.test', password='password123')
+        self.assertEqual(self.login('Élise@x.test').status_code, 200)
+        self.assertEqual(self.login('ÉLISE@X.TEST').status_code, 200)
+        self.assertIn('auth_user_email_ci_unique', User.objects.filter(email_matches('Élise@x.test')).explain())
+
+    def test_misses_still_hash_the_password(self):
+        from unittest import mock
+        from django.contrib.auth.hashers import make_password
+
+        with mock.patch('django.contrib.auth.base_user.make_password', wraps=make_password) as hasher:
+            self.assertEqual(self.login('nobody@acme.test').status_code, 401)
+        hasher.assert_called_once_with('password123')
+
+    def test_emails_are_unique_ignoring_case(self):
+        from django.db import IntegrityError, transaction
+
+        User.objects.create_user(username='blank1', password='x')
+        User.objects.create_user(username='blank2', password='x')  # blank emails are exempt
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user(username='shout', email='EDITOR@acme.test', password='x')
+
+        admin = self.token_client('admin')
+        response = admin.post('/api/auth/admin/users/create/', {
+            'first_name': 'New', 'last_name': 'User', 'email': 'Viewer@Acme.test',
+            'password': 'password123', 'role': 'viewer',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = admin.patch(
+            f'/api/auth/admin/users/{self.users["editor"].id}/update/', {'email': 'VIEWER@acme.test'}, format='json'
+        )
+        self.assertEqual(response.json(), {'error': 'Email already in use'})
+        response = APIClient().post('/api/auth/register/', {
+            'username': 'newcomer', 'email': 'APPROVER@acme.test', 'password': 'password123',
+            'confirm_password': 'password123', 'first_name': 'N', 'last_name': 'C',
+            'company_name': 'Co', 'industry': 'Retail', 'company_size': '1-10',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json())
+
+
+class ActivityTests(AuthTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_feed_lists_events_newest_first(self):
+        admin, editor, approver = (self.token_client(role) for role in ['admin', 'editor', 'approver'])
+        with self.captureOnCommitCallbacks(execute=True):
+            admin.post('/api/auth/admin/users/create/', {
+                'first_name': 'New', 'last_name': 'User', 'email': 'new@acme.test',
+                'password': 'password123', 'role': 'viewer', 'business_id': self.business.id,
+            }, format='json')
+            editor.post('/api/products/', {'name': 'Lamp', 'description': 'Desk lamp', 'price': '12.50'}, format='json')
+            product_id = Product.objects.get(name='Lamp').id
+            editor.patch(f'/api/products/{product_id}/submit/')
+            approver.patch(f'/api/products/{product_id}/approve/')
+
+        page = admin.get('/api/auth/admin/activities/').json()
+        self.assertEqual(
+            [row['verb'] for row in page['results']],
+            ['product.approved', 'product.submitted', 'product.created', 'user.created']
+        )
+        self.assertEqual(page['results'][0]['user'], 'approver')
+        self.assertEqual(page['results'][0]['action'], 'Approved product "Lamp"')
+        self.assertEqual(page['results'][0]['status'], 'approved')
+
+    def test_feed_is_keyset_paginated(self):
+        Activity.objects.bulk_create([
+            Activity(actor=self.users['admin'], verb='user.updated', description=f'Event {i}') for i in range(5)
+        ])
+        client = self.token_client('admin')
+        first = client.get('/api/auth/admin/activities/?page_size=3').json()
+        second = client.get(first['next']).json()
+        self.assertEqual(len(first['results']) + len(second['results']), 5)
+        self.assertIsNone(second['next'])
+
+    def test_events_are_buffered_until_flushed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            activity.record(self.users['admin'], 'user.updated', 'Buffered')
+        self.assertEqual(len(activity.buffer), 1)
+        self.assertFalse(Activity.objects.exists())
+        self.assertEqual(activity.flush(), 1)
+        self.assertEqual(Activity.objects.get().description, 'Buffered')
+
+    def test_rolled_back_events_are_dropped(self):
+        from django.db import transaction
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                activity.record(self.users['admin'], 'user.updated', 'Rolled back')
+                raise RuntimeError
+        self.assertEqual(len(activity.buffer), 0)
+
+    def test_prune_enforces_retention_and_row_cap(self):
+        from datetime import timedelta
+        from io import StringIO
+        from django.core.management import call_command
+        from django.utils import timezone
+
+        now = timezone.now()
+        Activity.objects.bulk_create([
+            Activity(verb='user.updated', description=f'Event {i}', created_at=now - timedelta(days=i * 10))
+            for i in range(20)
+        ])
+        call_command('prune_activities', days=100, keep=5, batch_size=2, stdout=StringIO())
+        self.assertEqual(
+            list(Activity.objects.values_list('description', flat=True)),
+            [f'Event {i}' for i in range(5)]
+        )
+
+
+class RequestTimingTests(AuthTestCase):
+
+    def setUp(self):
+        from marketplace import instrumentation
+
+        super().setUp()
+        instrumentation.timings.clear()
+
+    def server_timing(self, response):
+        return dict(
+            (part.split(';')[0].strip(), part) for part in response['Server-Timing'].split(', ')
+        )
+
+    def test_header_counts_queries_and_duplicates(self):
+        Product.objects.bulk_create([
+            Product(name=f'Lamp {i}', description='Lamp', price='9.99', status='approved',
+                    created_by=self.users['editor'], business=self.users['editor'].profile)
+            for i in range(3)
+        ])
+        response = self.token_client('editor').get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+        timing = self.server_timing(response)
+        self.assertIn('total', timing)
+        self.assertIn('render', timing)
+        self.assertRegex(timing['db'], r'desc="[1-9]\d* queries \(0 duplicate\)"')
+
+        from products.serializers import ProductSerializer
+        from marketplace.instrumentation import RequestTiming
+
+        # Serializing model instances without select_related is an N+1 per relation.
+        timing = RequestTiming()
+        with connection.execute_wrapper(timing):
+            ProductSerializer(Product.objects.all(), many=True).data
+        self.assertGreaterEqual(timing.duplicates, 2)
+
+    async def test_async_views_count_their_queries(self):
+        from django.test import AsyncClient
+
+        response = await AsyncClient().get('/api/products/async/public/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(self.server_timing(response)['db'], r'desc="[1-9]\d* queries')
+
+    def test_admin_gets_per_route_histograms(self):
+        client = self.token_client('admin')
+        for _ in range(3):
+            client.get('/api/auth/admin/stats/')
+        client.get('/api/auth/admin/users/')
+        self.assertEqual(self.token_client('viewer').get('/api/auth/admin/timings/').status_code, 403)
+
+        data = client.get('/api/auth/admin/timings/').json()
+        routes = {(row['method'], row['route']): row for row in data['routes']}
+        stats = routes[('GET', 'api/auth/admin/stats/')]
+        self.assertEqual(stats['count'], 3)
+        self.assertEqual(stats['statuses'], {'200': 3})
+        self.assertEqual(sum(bucket['count'] for bucket in stats['histogram']), 3)
+        self.assertGreater(stats['avg_queries'], 0)
+        self.assertGreater(stats['avg_size_bytes'], 0)
+        self.assertIn(('GET', 'api/auth/admin/users/'), routes)
+        self.assertEqual(routes[('GET', 'api/auth/admin/timings/')]['statuses'], {'403': 1})
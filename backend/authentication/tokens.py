@@ -0,0 +1,109 @@
+"""
+JWTs that carry the caller's role and business as claims.
+
+Access tokens minted here include ``role``, ``business_id`` and
+``token_version``. RoleClaimsJWTAuthentication trusts those claims for role
+checks as long as ``token_version`` still matches the profile's, so
+role-gated endpoints can authorize without loading the user. Changing a role
+or business bumps the version, and older tokens then fall back to the
+database. Inactive users have no current version, so their tokens fall back
+too and are refused there.
+
+The current version is one indexed query per request. Set
+TOKEN_VERSION_CACHE_ALIAS to a cache shared by every worker process (not local
+memory, or a bump in one worker would go unseen in the others) to answer it
+from that cache instead.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import UserProfile
+
+ROLE_CLAIM = 'role'
+BUSINESS_CLAIM = 'business_id'
+VERSION_CLAIM = 'token_version'
+
+# Bumps delete the cached entry, so this only bounds how long unused ones linger.
+TOKEN_VERSION_CACHE_TIMEOUT = getattr(settings, 'TOKEN_VERSION_CACHE_TIMEOUT', 3600)
+
+MISSING_PROFILE = -1
+
+
+def _version_key(user_id):
+    return f'auth:token_version:{user_id}'
+
+
+def _version_cache():
+    alias = getattr(settings, 'TOKEN_VERSION_CACHE_ALIAS', None)
+    if alias is None:
+        return None
+    cache = caches[alias]
+    if isinstance(cache, LocMemCache):
+        raise ImproperlyConfigured('TOKEN_VERSION_CACHE_ALIAS must name a cache shared between processes')
+    return cache
+
+
+def _stored_token_version(user_id):
+    version = UserProfile.objects.filter(user_id=user_id, user__is_active=True).values_list(
+        'token_version', flat=True
+    ).first()
+    return MISSING_PROFILE if version is None else version
+
+
+def current_token_version(user_id):
+    cache = _version_cache()
+    if cache is None:
+        return _stored_token_version(user_id)
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = _stored_token_version(user_id)
+        cache.set(_version_key(user_id), version, TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def bump_token_version(user_id):
+    """Invalidate the role claims of every token issued to ``user_id``."""
+    UserProfile.objects.filter(user_id=user_id).update(token_version=F('token_version') + 1)
+    forget_token_version(user_id)
+
+
+def forget_token_version(user_id):
+    """Drop the cached version, e.g. after the user has been deleted."""
+    cache = _version_cache()
+    if cache is not None:
+        cache.delete(_version_key(user_id))
+
+
+def forget_saved_user(sender, instance, **kwargs):
+    """User post_save/post_delete receiver: ``is_active`` is part of the cached version."""
+    forget_token_version(instance.pk)
+
+
+class RoleRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry up-to-date role claims."""
+
+    _profile = None
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token._profile = getattr(user, 'profile', None)
+        return token
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        profile = self._profile
+        if profile is None:
+            # Refreshing: re-read the profile so role changes are picked up.
+            profile = UserProfile.objects.filter(user_id=self.payload.get(api_settings.USER_ID_CLAIM)).first()
+        if profile is not None:
+            access[ROLE_CLAIM] = profile.role
+            access[BUSINESS_CLAIM] = profile.business_id
+            access[VERSION_CLAIM] = profile.token_version
+        return access
@@ -17,11 +17,13 @@ urlpatterns = [
     
     # Admin endpoints
     path('admin/stats/', admin_views.admin_stats, name='admin-stats'),
+    path('admin/timings/', admin_views.request_timings, name='request-timings'),
     path('admin/users/', admin_views.all_users, name='admin-users'),
     path('admin/users/create/', admin_views.create_user, name='create-user'),
     path('admin/users/<int:user_id>/update/', admin_views.update_user, name='update-user'),
     path('admin/users/<int:user_id>/delete/', admin_views.delete_user, name='delete-user'),
     path('admin/products/', admin_views.all_products, name='admin-products'),
+    path('admin/products/export/<str:export_format>/', admin_views.export_products, name='export-products'),
     path('admin/products/<int:product_id>/update/', admin_views.update_product, name='update-product'),
     path('admin/products/<int:product_id>/delete/', admin_views.delete_product, name='delete-product'),
     path('admin/activities/', admin_views.recent_activities, name='recent-activities'),
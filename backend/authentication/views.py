@@ -2,10 +2,12 @@ from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
+from marketplace import metrics
 from .serializers import RegisterSerializer, UserSerializer
 from .models import UserProfile
+from . import activity
+from .tokens import RoleRefreshToken
 
 class RegisterView(generics.CreateAPIView):
     serializer_class = RegisterSerializer
@@ -15,7 +17,8 @@ class RegisterView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
-        refresh = RefreshToken.for_user(user)
+        activity.record(user, 'user.created', f'{user.username} registered', target=user)
+        refresh = RoleRefreshToken.for_user(user)
         
         return Response({
             'user': UserSerializer(user).data,
@@ -31,8 +34,9 @@ def login_view(request):
     
     if email and password:
         user = authenticate(request, username=email, password=password)
+        metrics.LOGIN_ATTEMPTS.inc('success' if user else 'failure')
         if user:
-            refresh = RefreshToken.for_user(user)
+            refresh = RoleRefreshToken.for_user(user)
             return Response({
                 'user': UserSerializer(user).data,
                 'refresh': str(refresh),
@@ -0,0 +1,212 @@
+"""
+Per-request timing and query instrumentation.
+
+RequestTimingMiddleware measures every request:
+
+- wall time
+- time spent in database queries, and how many ran
+- duplicate queries: the same SQL run more than once, usually an N+1
+- time spent rendering the response body
+- response size
+
+The numbers are sent back in a ``Server-Timing`` header, so they show up in
+the browser's network panel. Each request is also appended to a ring buffer
+of the last REQUEST_TIMING_BUFFER_SIZE requests in this process, which
+``route_summaries()`` folds into per-route latency histograms for the admin
+API, and observed by the request latency histogram in ``metrics``.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict, deque, namedtuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+
+from . import metrics
+
+BUFFER_SIZE = getattr(settings, 'REQUEST_TIMING_BUFFER_SIZE', 10000)
+# Upper bounds in milliseconds; requests slower than the last land in the overflow bucket.
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+RequestSample = namedtuple(
+    'RequestSample', 'method route status total_ms db_ms queries duplicates render_ms size'
+)
+
+
+class RequestTiming:
+    """Collects one request's numbers; also the execute wrapper that times its queries."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db = 0.0
+        self.queries = 0
+        self.statements = set()
+        self.render = 0.0
+        self._render_started = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+            self.statements.add(sql)
+
+    @property
+    def duplicates(self):
+        return self.queries - len(self.statements)
+
+    def render_started(self):
+        self._render_started = time.perf_counter()
+
+    def rendered(self, response):
+        self.render = time.perf_counter() - self._render_started
+
+    def sample(self, request, response):
+        match = request.resolver_match
+        return RequestSample(
+            method=request.method,
+            route=match.route if match else None,
+            status=response.status_code,
+            total_ms=(time.perf_counter() - self.started) * 1000,
+            db_ms=self.db * 1000,
+            queries=self.queries,
+            duplicates=self.duplicates,
+            render_ms=self.render * 1000,
+            size=None if response.streaming else len(response.content),
+        )
+
+
+def server_timing(sample):
+    queries = f'{sample.queries} queries ({sample.duplicates} duplicate)'
+    return (
+        f'db;dur={sample.db_ms:.2f};desc="{queries}", '
+        f'render;dur={sample.render_ms:.2f}, '
+        f'total;dur={sample.total_ms:.2f}'
+    )
+
+
+class TimingBuffer:
+    def __init__(self, size=BUFFER_SIZE):
+        # deque appends are atomic, but copying one while it is appended to is not.
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=size)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def add(self, sample):
+        with self._lock:
+            self._samples.append(sample)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._samples)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+
+timings = TimingBuffer()
+
+
+def attach(wrapper):
+    connection.execute_wrappers.append(wrapper)
+
+
+def detach(wrapper):
+    connection.execute_wrappers.remove(wrapper)
+
+
+class RequestTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        request.timing = RequestTiming()
+        with connection.execute_wrapper(request.timing):
+            response = self.get_response(request)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        request.timing = RequestTiming()
+        # Connections are per thread and async ORM calls run on the request's
+        # sync_to_async thread, so the wrapper goes on that thread's connection.
+        await sync_to_async(attach)(request.timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(detach)(request.timing)
+        return self.finish(request, response)
+
+    def process_template_response(self, request, response):
+        # DRF responses render after the view returns and after this hook.
+        request.timing.render_started()
+        response.add_post_render_callback(request.timing.rendered)
+        return response
+
+    def finish(self, request, response):
+        sample = request.timing.sample(request, response)
+        timings.add(sample)
+        metrics.REQUEST_LATENCY.observe(
+            sample.total_ms / 1000, sample.method, sample.route or 'unmatched', str(sample.status)
+        )
+        response['Server-Timing'] = server_timing(sample)
+        return response
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def route_summaries(samples):
+    """Per (method, route) latency histograms and averages, slowest p95 first."""
+    groups = defaultdict(list)
+    for sample in samples:
+        groups[(sample.method, sample.route)].append(sample)
+
+    summaries = []
+    for (method, route), group in groups.items():
+        latencies = sorted(sample.total_ms for sample in group)
+        counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        for latency in latencies:
+            counts[bisect_left(LATENCY_BUCKETS_MS, latency)] += 1
+        statuses = defaultdict(int)
+        for sample in group:
+            statuses[str(sample.status)] += 1
+        sizes = [sample.size for sample in group if sample.size is not None]
+        summaries.append({
+            'method': method,
+            'route': route,
+            'count': len(group),
+            'statuses': dict(statuses),
+            'latency_ms': {
+                'p50': round(percentile(latencies, 0.5), 2),
+                'p95': round(percentile(latencies, 0.95), 2),
+                'p99': round(percentile(latencies, 0.99), 2),
+                'max': round(latencies[-1], 2),
+            },
+            'histogram': [
+                {'le_ms': bound, 'count': count}
+                for bound, count in zip(LATENCY_BUCKETS_MS + [None], counts)
+            ],
+            'avg_db_ms': round(sum(sample.db_ms for sample in group) / len(group), 2),
+            'avg_render_ms': round(sum(sample.render_ms for sample in group) / len(group), 2),
+            'avg_queries': round(sum(sample.queries for sample in group) / len(group), 1),
+            'max_duplicate_queries': max(sample.duplicates for sample in group),
+            'avg_size_bytes': round(sum(sizes) / len(sizes)) if sizes else None,
+        })
+    summaries.sort(key=lambda summary: summary['latency_ms']['p95'], reverse=True)
+    return summaries
@@ -0,0 +1,244 @@
+"""
+Prometheus metrics, served in the text exposition format at ``/metrics``.
+
+A deliberately small registry: counters and histograms live in this
+process's memory, one lock per metric, so an update is a lock, a dict
+lookup and an add. Gauges are callbacks evaluated at scrape time.
+
+With several worker processes, point METRICS_DIR at a directory the workers
+of one deployment share and that is emptied when it starts. Each process
+writes its counters and histograms to ``<pid>.json`` there, from
+``request_finished`` and at most every METRICS_WRITE_INTERVAL seconds, and a
+scrape adds every file up, so whichever worker answers reports all of them.
+Without METRICS_DIR a scrape reports the process that answers it.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+
+METRICS_DIR = getattr(settings, 'METRICS_DIR', None)
+WRITE_INTERVAL = getattr(settings, 'METRICS_WRITE_INTERVAL', 5.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+
+def escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def snapshot(self):
+        with self._lock:
+            return {key: self.copy(value) for key, value in self._values.items()}
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    @staticmethod
+    def copy(value):
+        return value
+
+    @staticmethod
+    def merge(total, value):
+        return value if total is None else total + value
+
+    def lines(self, values):
+        for labels, value in sorted(values.items()):
+            yield f'{self.name}{format_labels(self.labels, labels)} {format_value(value)}'
+
+
+class Histogram(Metric):
+    """Values are per-bucket counts (the last one unbounded) followed by the sum."""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = list(buckets)
+
+    def observe(self, amount, *labels):
+        index = bisect_left(self.buckets, amount)
+        with self._lock:
+            value = self._values.get(labels)
+            if value is None:
+                value = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            value[index] += 1
+            value[-1] += amount
+
+    @staticmethod
+    def copy(value):
+        return list(value)
+
+    @staticmethod
+    def merge(total, value):
+        return list(value) if total is None else [a + b for a, b in zip(total, value)]
+
+    def lines(self, values):
+        names = self.labels + ('le',)
+        for labels, value in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ['+Inf'], value[:-1]):
+                cumulative += count
+                yield f'{self.name}_bucket{format_labels(names, labels + (bound,))} {cumulative}'
+            yield f'{self.name}_sum{format_labels(self.labels, labels)} {format_value(value[-1])}'
+            yield f'{self.name}_count{format_labels(self.labels, labels)} {cumulative}'
+
+
+class Gauge:
+    """A value read at scrape time: ``callback()`` returns a number."""
+    kind = 'gauge'
+    header = Metric.header
+
+    def __init__(self, name, documentation, callback):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def lines(self):
+        yield f'{self.name} {format_value(self.callback())}'
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._gauges = []
+        self._last_write = time.monotonic()
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def gauge(self, name, documentation, callback):
+        self._gauges.append(Gauge(name, documentation, callback))
+
+    def _register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self):
+        """``{name: [[labels, value], ...]}``, as written to METRICS_DIR."""
+        return {
+            name: [[list(labels), value] for labels, value in metric.snapshot().items()]
+            for name, metric in self._metrics.items()
+        }
+
+    def clear(self):
+        for metric in self._metrics.values():
+            metric.clear()
+
+    def collect(self, directory=METRICS_DIR):
+        """This process's values plus, with a directory, every other process's last snapshot."""
+        snapshots = [self.snapshot()]
+        if directory:
+            own = f'{os.getpid()}.json'
+            for filename in os.listdir(directory):
+                if filename.endswith('.json') and filename != own:
+                    try:
+                        with open(os.path.join(directory, filename)) as f:
+                            snapshots.append(json.load(f))
+                    except (OSError, ValueError):
+                        # Removed while the directory was listed.
+                        continue
+        totals = {name: {} for name in self._metrics}
+        for snapshot in snapshots:
+            for name, samples in snapshot.items():
+                metric = self._metrics.get(name)
+                if metric is None:
+                    continue
+                for labels, value in samples:
+                    key = tuple(labels)
+                    totals[name][key] = metric.merge(totals[name].get(key), value)
+        return totals
+
+    def exposition(self, directory=METRICS_DIR):
+        lines = []
+        for name, values in self.collect(directory).items():
+            metric = self._metrics[name]
+            lines.extend(metric.header())
+            lines.extend(metric.lines(values))
+        for gauge in self._gauges:
+            lines.extend(gauge.header())
+            lines.extend(gauge.lines())
+        return '\n'.join(lines) + '\n'
+
+    def write(self, directory=METRICS_DIR):
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(f'{path}.tmp', path)
+        self._last_write = time.monotonic()
+
+    def write_if_due(self, **kwargs):
+        """request_finished receiver."""
+        if METRICS_DIR and time.monotonic() - self._last_write >= WRITE_INTERVAL:
+            self.write()
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.histogram(
+    'http_request_duration_seconds', 'Request latency by route.', ['method', 'route', 'status']
+)
+PRODUCT_TRANSITIONS = registry.counter(
+    'product_transitions_total', 'Committed product status transitions.', ['from', 'to']
+)
+LOGIN_ATTEMPTS = registry.counter('login_attempts_total', 'Login attempts by outcome.', ['result'])
+
+
+def approval_queue_depth():
+    from products.models import ProductStatusCounter
+
+    return ProductStatusCounter.objects.dashboard_counts()['pending']
+
+
+registry.gauge('approval_queue_depth', 'Products waiting for approval.', approval_queue_depth)
+
+request_finished.connect(registry.write_if_due, dispatch_uid='metrics-write')
+if METRICS_DIR:
+    atexit.register(registry.write)
+
+
+@require_GET
+def metrics_view(request):
+    """Prometheus scrape endpoint"""
+    return HttpResponse(registry.exposition(), content_type=CONTENT_TYPE)
@@ -0,0 +1,245 @@
+import base64
+import json
+import math
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on a unique, totally ordered tuple of columns.
+
+    Unlike offset pagination the cost of a page does not grow with its
+    position, and unlike DRF's CursorPagination ties on the leading column are
+    broken by the trailing ones instead of by an offset. Cursor mode is opt-in:
+    requests without ``cursor`` or ``page_size`` get the plain list response.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+
+    @staticmethod
+    def get_query_params(request):
+        # DRF requests expose query_params; plain (async) Django views only GET.
+        return getattr(request, 'query_params', request.GET)
+
+    def is_requested(self, request):
+        params = self.get_query_params(request)
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        value = self.get_query_params(request).get(self.page_size_query_param)
+        if value is None:
+            return self.page_size
+        try:
+            size = int(value)
+        except ValueError:
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset, reverse = self._prepare(queryset, request)
+        rows = list(queryset[:self.page_size + 1])
+        return self._finish(rows, reverse)
+
+    async def apaginate_queryset(self, queryset, request):
+        """Async counterpart of ``paginate_queryset`` for async views."""
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset, reverse = self._prepare(queryset, request)
+        rows = [row async for row in queryset[:self.page_size + 1]]
+        return self._finish(rows, reverse)
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ])
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if self._next_position is None:
+            return None
+        return self._build_link(self._next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self._previous_position is None:
+            return None
+        return self._build_link(self._previous_position, reverse=True)
+
+    def _prepare(self, queryset, request):
+        cursor = self.decode_cursor(request)
+        reverse = False
+        ordering = self.ordering
+        if cursor is not None:
+            position, reverse = cursor
+            if reverse:
+                ordering = tuple(self._flip(field) for field in ordering)
+            try:
+                queryset = queryset.filter(self._after(queryset.model, ordering, position))
+            except (ValidationError, TypeError, ValueError, OverflowError):
+                raise NotFound(self.invalid_cursor_message)
+        self._has_cursor = cursor is not None
+        return queryset.order_by(*ordering), reverse
+
+    def _finish(self, rows, reverse):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        first = self._position(rows[0]) if rows else None
+        last = self._position(rows[-1]) if rows else None
+        if reverse:
+            self._next_position = last
+            self._previous_position = first if has_more else None
+        else:
+            self._next_position = last if has_more else None
+            self._previous_position = first if self._has_cursor else None
+        return rows
+
+    def _after(self, model, ordering, position):
+        """Build the lexicographic "row comes after position" filter."""
+        values = []
+        for field, raw in zip(ordering, position):
+            name = field.lstrip('-')
+            try:
+                value = model._meta.get_field(name).to_python(raw)
+            except FieldDoesNotExist:
+                # An annotation (e.g. a search rank): compare the JSON value as is.
+                if not isinstance(raw, (int, float, str)):
+                    raise ValidationError('Invalid cursor value')
+                value = raw
+            if isinstance(value, int) and not -2**63 <= value < 2**63:
+                raise ValidationError('Cursor value out of range')
+            values.append((name, field.startswith('-'), value))
+
+        condition = Q()
+        for index, (name, descending, value) in enumerate(values):
+            lookup = 'lt' if descending else 'gt'
+            clause = Q(**{f'{name}__{lookup}': value})
+            for prev_name, _, prev_value in values[:index]:
+                clause &= Q(**{prev_name: prev_value})
+            condition |= clause
+        return condition
+
+    def _position(self, row):
+        position = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            value = row[name] if isinstance(row, dict) else getattr(row, name)
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return position
+
+    def _build_link(self, position, reverse):
+        payload = {'p': position}
+        if reverse:
+            payload['r'] = 1
+        token = base64.urlsafe_b64encode(
+            json.dumps(payload, separators=(',', ':')).encode()
+        ).decode().rstrip('=')
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = self.get_query_params(request).get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            position = payload['p']
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+            if not all(self._valid_value(value) for value in position):
+                raise ValueError
+            return position, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _valid_value(value):
+        """Cursor values are what ``_position`` writes: strings and finite numbers."""
+        if isinstance(value, float):
+            return math.isfinite(value)
+        return isinstance(value, (int, str)) and not isinstance(value, bool)
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+
+class UserKeysetPagination(KeysetPagination):
+    ordering = ('-date_joined', '-id')
+
+
+class SearchPagination(KeysetPagination):
+    """Ranked results, best first; ``rank`` must be annotated with lower meaning better."""
+    ordering = ('rank', 'id')
+    page_size = 20
+
+    def is_requested(self, request):
+        return True
+
+
+class FeedKeysetPagination(KeysetPagination):
+    """Always paginated: feeds are unbounded, so there is no plain list mode."""
+    page_size = 20
+
+    def is_requested(self, request):
+        return True
+
+
+def paginated_data(request, queryset, serialize, pagination_class=KeysetPagination):
+    """
+    Run a function-based list view through cursor pagination.
+
+    ``serialize`` turns the (possibly paginated) rows into response data.
+    """
+    paginator = pagination_class()
+    page = paginator.paginate_queryset(queryset, request)
+    if page is None:
+        return serialize(queryset)
+    return paginator.get_paginated_data(serialize(page))
+
+
+def paginate(request, queryset, serialize, pagination_class=KeysetPagination):
+    return Response(paginated_data(request, queryset, serialize, pagination_class))
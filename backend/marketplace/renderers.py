@@ -0,0 +1,54 @@
+"""
+Fast JSON rendering for high-volume read endpoints.
+
+FastJSONRenderer encodes with orjson when it is installed and falls back to
+the stdlib encoder otherwise. Both produce the same output. It also encodes
+the raw column values that ``values()`` rows carry, matching the strings DRF
+fields would produce: Decimal as its exact string, aware datetimes in ISO
+8601 with a ``Z`` suffix for UTC. Views opt in with
+``@renderer_classes([FastJSONRenderer])`` (or ``renderer_classes`` on class
+based views). Helpers that build rows can check ``renders_raw_values()`` to
+skip formatting values themselves.
+"""
+import datetime
+import json
+import uuid
+from decimal import Decimal
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised by patching in tests
+    orjson = None
+
+
+def encode_default(value):
+    """Encode the types neither encoder handles natively the way DRF fields render them."""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        text = value.isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is not None:
+            return orjson.dumps(data, default=encode_default, option=orjson.OPT_UTC_Z)
+        return json.dumps(
+            data, default=encode_default, ensure_ascii=False, separators=(',', ':')
+        ).encode()
+
+
+def renders_raw_values(request):
+    """Whether the negotiated renderer for ``request`` encodes raw Decimal/datetime values itself."""
+    return isinstance(getattr(request, 'accepted_renderer', None), FastJSONRenderer)
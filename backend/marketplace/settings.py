@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'marketplace.instrumentation.RequestTimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -131,7 +133,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.RoleClaimsJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -144,6 +146,7 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.serializers.RoleTokenRefreshSerializer',
 }
 
 # CORS Configuration
@@ -154,8 +157,47 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Caches
+# The public catalogue cache is keyed by catalogue generation, so entries never
+# need a TTL. Set CATALOGUE_CACHE_BACKEND to "file" or "redis" (with
+# CATALOGUE_CACHE_LOCATION) to share it between worker processes.
+CATALOGUE_CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+CATALOGUE_CACHE_ALIAS = 'catalogue'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    CATALOGUE_CACHE_ALIAS: {
+        'BACKEND': CATALOGUE_CACHE_BACKENDS[os.environ.get('CATALOGUE_CACHE_BACKEND', 'locmem')],
+        'LOCATION': os.environ.get('CATALOGUE_CACHE_LOCATION', 'catalogue'),
+        'TIMEOUT': None,
+    },
+}
+
+# Role-claim token versions are read from the database on every request
+# unless this names a cache every worker process shares (e.g. a Redis entry in
+# CACHES); local memory is refused, since bumps would stay in one process.
+TOKEN_VERSION_CACHE_ALIAS = os.environ.get('TOKEN_VERSION_CACHE_ALIAS') or None
+
+# Request instrumentation
+# RequestTimingMiddleware keeps this many recent requests per process for
+# the admin timings endpoint.
+REQUEST_TIMING_BUFFER_SIZE = 10000
+
+# Metrics
+# /metrics reports only the worker that answers the scrape unless
+# METRICS_DIR names a directory every worker process can write to.
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+METRICS_WRITE_INTERVAL = 5.0
+
 # Authentication Backends
+# EmailBackend extends ModelBackend and also accepts usernames (for the admin
+# site), so ModelBackend itself would only repeat a failed lookup.
 AUTHENTICATION_BACKENDS = [
     'authentication.backends.EmailBackend',
-    'django.contrib.auth.backends.ModelBackend',
 ]
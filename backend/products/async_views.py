@@ -0,0 +1,101 @@
+"""
+ASGI-native variants of the read-heavy product endpoints.
+
+These are plain async Django views built on the async ORM, so one ASGI worker
+can keep many requests in flight while they wait on the database. They return
+the same JSON as their DRF counterparts in views.py.
+"""
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import APIException
+
+from authentication.decorators import async_role_required
+from authentication.models import UserProfile
+from marketplace.pagination import KeysetPagination
+from . import catalogue
+from .listing import ProductRows, requested_fields
+from .models import Product, ProductStatusCounter
+from .serializers import CatalogueFilterSerializer
+from .views import build_analytics, build_approval_stats, review_stats_since
+
+
+async def paginated_products(request, queryset):
+    rows = ProductRows(requested_fields(request.GET))
+    queryset = rows.values(queryset)
+    paginator = KeysetPagination()
+    page = await paginator.apaginate_queryset(queryset, request)
+    if page is None:
+        return rows.serialize([row async for row in queryset])
+    return paginator.get_paginated_data(rows.serialize(page))
+
+
+def error_response(exc):
+    # DRF's exception handler doesn't run for plain Django views.
+    detail = exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}
+    return JsonResponse(detail, status=exc.status_code)
+
+
+@require_GET
+async def public_products(request):
+    """Public endpoint for approved products, filterable, cached per catalogue generation"""
+    filters = CatalogueFilterSerializer(data=request.GET)
+    if not filters.is_valid():
+        return JsonResponse(filters.errors, status=400)
+    generation, changed_at = await catalogue.acurrent()
+    # Separate prefix from the sync view: cached pages embed their own URL in cursor links.
+    key = catalogue.cache_key('public-async', generation, request.GET, request.get_host())
+    etag = catalogue.etag(key)
+    last_modified = int(changed_at.timestamp())
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    cache = catalogue.get_cache()
+    data = await cache.aget(key)
+    if data is None:
+        products = Product.objects.filter(status='approved', **filters.lookups())
+        try:
+            data = await paginated_products(request, products)
+        except APIException as exc:
+            return error_response(exc)
+        await cache.aset(key, data)
+
+    response = JsonResponse(data, safe=False)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+@require_GET
+@async_role_required(['approver', 'admin'])
+async def pending_products(request):
+    """Get all products pending approval"""
+    products = Product.objects.filter(status='pending_approval')
+    try:
+        data = await paginated_products(request, products)
+    except APIException as exc:
+        return error_response(exc)
+    return JsonResponse(data, safe=False)
+
+
+@require_GET
+@async_role_required(['approver', 'admin'])
+async def approval_stats(request):
+    """Get approval statistics for approver dashboard"""
+    counts = await ProductStatusCounter.objects.adashboard_counts()
+    review_times = await Product.objects.areview_time_stats(review_stats_since())
+    return JsonResponse(build_approval_stats(counts, review_times))
+
+
+@require_GET
+@async_role_required(['approver', 'admin'])
+async def analytics_data(request):
+    """Get comprehensive analytics data for approver dashboard"""
+    counts = await ProductStatusCounter.objects.adashboard_counts()
+    editor_stats = [row async for row in ProductStatusCounter.objects.top_businesses()]
+    editors = await UserProfile.objects.select_related('user').ain_bulk(
+        [editor['business'] for editor in editor_stats]
+    )
+    return JsonResponse(build_analytics(counts, editor_stats, editors))
@@ -0,0 +1,300 @@
+"""
+In-process type-ahead over approved product names.
+
+The index is a sorted array of packed ``(slot << 8) | offset`` integers, one
+per word start in each name. Ordered by the lowercased name from that word
+on, it acts as a suffix array restricted to word boundaries. Any prefix of any
+word sequence in a name is found with one bisect plus a short forward scan,
+so "oak ta" matches "Rustic oak table". Names are held once (twice if they
+are not already lowercase), and the entries cost 8 bytes each in an
+``array('Q')``.
+
+The index is built lazily on the first query of a process. It stays current
+in two ways:
+
+* changes made by this process are applied incrementally (``apply``), from
+  the product signals and the workflow, once their transaction commits;
+* every query compares the catalogue generation with the one the index has
+  accounted for. When another process has changed the catalogue, the products
+  it logged as changed (``catalogue.changes_since``) are re-read and applied
+  the same way; the index is only rebuilt when that log no longer reaches back
+  far enough.
+
+Changes are applied a batch at a time (``update``): the new entries are
+sorted and merged into the array, and removed ones are skipped, in one pass
+over it, rather than inserting or deleting entries one by one.
+
+Building stops once the estimated size reaches AUTOCOMPLETE_MEMORY_BUDGET.
+Newest products are loaded first, so the oldest are the ones left out.
+"""
+import re
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import transaction
+
+from . import catalogue
+from .models import Product
+
+MEMORY_BUDGET = getattr(settings, 'AUTOCOMPLETE_MEMORY_BUDGET', 256 * 1024 * 1024)
+# Word starts indexed per name; offsets must fit in the low 8 bits.
+MAX_WORDS = 6
+MAX_OFFSET = 255
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+LOAD_CHUNK = 10000
+
+_SEPARATORS = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def normalize(text):
+    """Lowercase, with every run of punctuation and whitespace as one space."""
+    return _SEPARATORS.sub(' ', text).strip().lower()
+
+
+def word_starts(normalized):
+    offsets = []
+    offset = 0
+    for word in normalized.split(' ', MAX_WORDS - 1)[:MAX_WORDS]:
+        if offset > MAX_OFFSET:
+            break
+        offsets.append(offset)
+        offset += len(word) + 1
+    return offsets
+
+
+class PrefixIndex:
+    def __init__(self, memory_budget=MEMORY_BUDGET):
+        self.memory_budget = memory_budget
+        self.truncated = False
+        self._names = []
+        self._lowered = []
+        self._ids = array('q')
+        self._slots = {}
+        self._free = []
+        self._entries = array('Q')
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._slots)
+
+    @property
+    def estimated_bytes(self):
+        return self._bytes + self._entries.itemsize * len(self._entries) + self._ids.itemsize * len(self._ids)
+
+    def _suffix(self, entry):
+        return self._lowered[entry >> 8][entry & 0xFF:]
+
+    def _cost(self, name, lowered):
+        # The name strings, their list slots and the id -> slot dict entry.
+        cost = sys.getsizeof(name) + 8 * 2 + 100
+        if lowered is not name:
+            cost += sys.getsizeof(lowered)
+        return cost
+
+    def _store(self, product_id, name):
+        """Give the product a slot; return ``(slot, lowered)`` or None when over budget."""
+        lowered = normalize(name)
+        if lowered == name:
+            lowered = name
+        cost = self._cost(name, lowered)
+        # Each name adds about MAX_WORDS / 2 entries; leave room for them.
+        if self._bytes + len(self._entries) * 8 + cost + MAX_WORDS * 4 > self.memory_budget:
+            self.truncated = True
+            return None
+        if self._free:
+            slot = self._free.pop()
+            self._names[slot], self._lowered[slot], self._ids[slot] = name, lowered, product_id
+        else:
+            slot = len(self._names)
+            self._names.append(name)
+            self._lowered.append(lowered)
+            self._ids.append(product_id)
+        self._slots[product_id] = slot
+        self._bytes += cost
+        return slot, lowered
+
+    def load(self, rows):
+        """Bulk-load ``(id, name)`` rows into an empty index."""
+        packed = []
+        for product_id, name in rows:
+            stored = self._store(product_id, name)
+            if stored is None:
+                break
+            slot, lowered = stored
+            packed.extend((slot << 8) | offset for offset in word_starts(lowered))
+
+        # Sort bucket by bucket on the suffix's first character, so only one
+        # bucket's suffix strings exist at a time instead of one per entry.
+        buckets = {}
+        for entry in packed:
+            buckets.setdefault(self._lowered[entry >> 8][entry & 0xFF], []).append(entry)
+        del packed
+        for first in sorted(buckets):
+            self._entries.extend(sorted(buckets.pop(first), key=self._suffix))
+
+    def add(self, product_id, name):
+        self.update([(product_id, name)])
+
+    def remove(self, product_id):
+        self.update([(product_id, None)])
+
+    def update(self, changes):
+        """Apply ``(product_id, name)`` changes, ``name=None`` removing the product."""
+        latest = dict(changes)
+        present = [product_id for product_id in latest if product_id in self._slots]
+        positions = []
+        for product_id in present:
+            positions.extend(self._positions(self._slots[product_id]))
+        if positions:
+            self._entries = self._without(sorted(positions))
+        for product_id in present:
+            self._release(product_id)
+
+        added = []
+        for product_id, name in latest.items():
+            if name is None:
+                continue
+            stored = self._store(product_id, name)
+            if stored is None:
+                continue
+            slot, lowered = stored
+            added.extend((slot << 8) | offset for offset in word_starts(lowered))
+        if added:
+            added.sort(key=self._suffix)
+            self._entries = self._merged(added)
+
+    def _positions(self, slot):
+        """Where the slot's entries are in the array."""
+        lowered = self._lowered[slot]
+        for offset in word_starts(lowered):
+            entry = (slot << 8) | offset
+            index = bisect_left(self._entries, lowered[offset:], key=self._suffix)
+            while self._entries[index] != entry:
+                index += 1
+            yield index
+
+    def _without(self, positions):
+        entries = self._entries
+        kept = array('Q')
+        start = 0
+        for position in positions:
+            kept.extend(entries[start:position])
+            start = position + 1
+        kept.extend(entries[start:])
+        return kept
+
+    def _merged(self, added):
+        """The entries with ``added``, already sorted by suffix, merged in."""
+        entries = self._entries
+        merged = array('Q')
+        start = 0
+        for entry in added:
+            position = bisect_left(entries, self._suffix(entry), lo=start, key=self._suffix)
+            merged.extend(entries[start:position])
+            merged.append(entry)
+            start = position
+        merged.extend(entries[start:])
+        return merged
+
+    def _release(self, product_id):
+        slot = self._slots.pop(product_id)
+        self._bytes -= self._cost(self._names[slot], self._lowered[slot])
+        self._names[slot] = self._lowered[slot] = ''
+        self._free.append(slot)
+
+    def complete(self, prefix, limit=DEFAULT_LIMIT):
+        """Up to ``limit`` ``(id, name)`` pairs with a word sequence starting with ``prefix``."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        results = []
+        seen = set()
+        entries = self._entries
+        index = bisect_left(entries, prefix, key=self._suffix)
+        while index < len(entries) and len(results) < limit:
+            entry = entries[index]
+            if not self._suffix(entry).startswith(prefix):
+                break
+            slot = entry >> 8
+            if slot not in seen:
+                seen.add(slot)
+                results.append((self._ids[slot], self._names[slot]))
+            index += 1
+        return results
+
+
+class Autocomplete:
+    """The process-wide index plus the bookkeeping that keeps it current."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._generation = None
+        # Catalogue bumps made by this process and already applied to the index.
+        self._local_bumps = 0
+
+    def reset(self):
+        with self._lock:
+            self._index = None
+
+    def _rebuild(self, generation):
+        index = PrefixIndex()
+        rows = Product.objects.filter(status='approved').order_by('-created_at', '-id').values_list('id', 'name')
+        index.load(rows.iterator(chunk_size=LOAD_CHUNK))
+        self._index, self._generation, self._local_bumps = index, generation, 0
+
+    def _catch_up(self, generation):
+        """Re-read the products changed since the index's generation, or rebuild if they are unknown."""
+        product_ids = catalogue.changes_since(self._generation, generation)
+        if product_ids is None:
+            self._rebuild(generation)
+            return
+        product_ids = list(product_ids)
+        names = {}
+        for start in range(0, len(product_ids), LOAD_CHUNK):
+            names.update(
+                Product.objects.filter(id__in=product_ids[start:start + LOAD_CHUNK], status='approved')
+                .values_list('id', 'name')
+            )
+        self._index.update((product_id, names.get(product_id)) for product_id in product_ids)
+        self._generation, self._local_bumps = generation, 0
+
+    def index(self):
+        generation, _ = catalogue.current()
+        with self._lock:
+            if self._index is None:
+                self._rebuild(generation)
+            elif generation != self._generation + self._local_bumps:
+                # Another process changed the catalogue; local changes are re-applied too, harmlessly.
+                self._catch_up(generation)
+            else:
+                self._generation, self._local_bumps = generation, 0
+            return self._index
+
+    def complete(self, prefix, limit=DEFAULT_LIMIT):
+        index = self.index()
+        with self._lock:
+            return index.complete(prefix, limit)
+
+    def apply(self, changes):
+        """
+        Record one catalogue bump's worth of changes once the transaction commits.
+
+        ``changes`` are ``(product_id, name)`` pairs, with ``name=None`` for
+        products that left the approved catalogue.
+        """
+        transaction.on_commit(lambda: self._apply(changes))
+
+    def _apply(self, changes):
+        with self._lock:
+            if self._index is None:
+                return
+            self._index.update(changes)
+            self._local_bumps += 1
+
+
+autocomplete = Autocomplete()
@@ -0,0 +1,87 @@
+"""
+Helpers shared by the benchmark management commands.
+
+Benchmarks never touch the configured database: they run against a scratch
+copy created the same way the test runner creates its test database.
+"""
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from authentication import activity
+from authentication.models import Business
+from .synthetic import Generator
+
+
+@contextmanager
+def scratch_database(verbosity=0):
+    """Create a throwaway migrated database (and test client environment) for the block."""
+    old_name = connection.settings_dict['NAME']
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        # Events recorded against the scratch database must not reach the real one.
+        activity.buffer.clear()
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        teardown_test_environment()
+
+
+def seed_products(count, users=100, batch_size=10000, seed=0, stdout=None):
+    """Insert ``count`` products spread over a year and ``users`` editors."""
+    generator = Generator(seed=seed, batch_size=batch_size, stdout=stdout)
+    business = Business.objects.create(name='Benchmark Co', industry='Retail', company_size='1000+')
+    profiles = generator.users([business], users, prefix='bench', domain='bench.test', role='editor')
+    generator.products(profiles, count)
+    return profiles
+
+
+def measure(func, repeat=20):
+    """Run ``func`` ``repeat`` times and return latency stats in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def summarize(samples):
+    """Latency stats for a list of millisecond samples."""
+    samples = sorted(samples)
+    nearest = lambda fraction: samples[min(len(samples) - 1, int(len(samples) * fraction))]
+    return {
+        'min_ms': round(samples[0], 3),
+        'p50_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(nearest(0.95), 3),
+        'p99_ms': round(nearest(0.99), 3),
+        'max_ms': round(samples[-1], 3),
+    }
+
+
+@contextmanager
+def count_queries():
+    """
+    Count the queries executed inside the block.
+
+    Unlike CaptureQueriesContext this survives the queries log being reset
+    by request_started when driving views through the test client.
+    """
+    counter = {'queries': 0}
+
+    def wrapper(execute, sql, params, many, context):
+        counter['queries'] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield counter
+
+
+def analyze():
+    """Refresh planner statistics after bulk loads or index changes."""
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
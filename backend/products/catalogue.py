@@ -0,0 +1,105 @@
+"""
+Versioned cache for the public (approved) product catalogue.
+
+Cache keys embed the catalogue generation stored in CatalogueGeneration, so
+invalidation is exact: a bump makes every older entry unreachable and the
+backend's own eviction (LRU for local memory) reclaims it. The cache alias is
+configured through ``CATALOGUE_CACHE_ALIAS`` and the matching ``CACHES`` entry.
+
+Bumps also log which products changed as CatalogueChange rows, so in-process
+indexes over the catalogue (autocomplete) can catch up on other processes'
+writes with ``changes_since()``. The last CATALOGUE_CHANGE_RETENTION
+generations are kept.
+"""
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CatalogueChange, CatalogueGeneration
+
+GENERATION_ID = 1
+CHANGE_RETENTION = getattr(settings, 'CATALOGUE_CHANGE_RETENTION', 10000)
+# Old CatalogueChange rows are deleted every this many generations.
+PRUNE_EVERY = 1000
+
+
+def get_cache():
+    return caches[getattr(settings, 'CATALOGUE_CACHE_ALIAS', 'default')]
+
+
+def current():
+    """Return ``(generation, changed_at)`` of the public catalogue."""
+    row = CatalogueGeneration.objects.filter(pk=GENERATION_ID).values_list('generation', 'changed_at').first()
+    if row is None:
+        entry, _ = CatalogueGeneration.objects.get_or_create(pk=GENERATION_ID)
+        row = (entry.generation, entry.changed_at)
+    return row
+
+
+async def acurrent():
+    row = await CatalogueGeneration.objects.filter(pk=GENERATION_ID).values_list('generation', 'changed_at').afirst()
+    if row is None:
+        entry, _ = await CatalogueGeneration.objects.aget_or_create(pk=GENERATION_ID)
+        row = (entry.generation, entry.changed_at)
+    return row
+
+
+def bump(product_ids=(), everything=False):
+    """
+    Invalidate every cached catalogue response.
+
+    ``product_ids`` are the products whose public entry changed;
+    ``everything`` stands for a change too large to list.
+    """
+    updated = CatalogueGeneration.objects.filter(pk=GENERATION_ID).update(
+        generation=F('generation') + 1, changed_at=timezone.now()
+    )
+    if not updated:
+        CatalogueGeneration.objects.get_or_create(pk=GENERATION_ID, defaults={'generation': 1})
+    if not product_ids and not everything:
+        return
+    # The row stays locked by the update until commit, so this is our generation.
+    generation = CatalogueGeneration.objects.filter(pk=GENERATION_ID).values_list('generation', flat=True).get()
+    if everything:
+        product_ids = [None]
+    CatalogueChange.objects.bulk_create(
+        [CatalogueChange(generation=generation, product_id=product_id) for product_id in product_ids]
+    )
+    if generation % PRUNE_EVERY == 0:
+        CatalogueChange.objects.filter(generation__lte=generation - CHANGE_RETENTION).delete()
+
+
+def changes_since(generation, current):
+    """
+    Ids of the products that changed after ``generation`` up to ``current``,
+    or None when that is no longer known and readers must start over.
+    """
+    if current - generation >= CHANGE_RETENTION - PRUNE_EVERY:
+        return None
+    product_ids = set(
+        CatalogueChange.objects.filter(generation__gt=generation, generation__lte=current)
+        .values_list('product_id', flat=True)
+    )
+    if None in product_ids:
+        return None
+    return product_ids
+
+
+def affects_catalogue(previous_status, status):
+    """Whether a product write changes what the public catalogue shows."""
+    return previous_status == 'approved' or status == 'approved'
+
+
+def cache_key(prefix, generation, params, host=''):
+    # The host is part of the key because paginated responses embed absolute links.
+    query = host + '?' + urlencode(sorted(params.lists()), doseq=True)
+    digest = hashlib.md5(query.encode(), usedforsecurity=False).hexdigest()
+    return f'catalogue:{prefix}:{generation}:{digest}'
+
+
+def etag(key):
+    return '"%s"' % hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
@@ -0,0 +1,101 @@
+"""
+Incremental maintenance of ProductStatusCounter.
+
+Every change is expressed as ``(business_id, status, day, delta)``. Each change
+is applied twice: to the business's own row and to the marketplace-wide row
+(business=None). Callers must already be inside a transaction so that the
+counters commit or roll back together with the product rows.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def status_day(moment):
+    return timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+
+
+def entered(product):
+    """Change for a product that now counts in its current status."""
+    return (product.business_id, product.status, status_day(product.status_changed_at), 1)
+
+
+def left(business_id, status, changed_at):
+    """Change for a product that no longer counts in ``status``."""
+    return (business_id, status, status_day(changed_at), -1)
+
+
+def apply_changes(changes):
+    from .models import ProductStatusCounter
+
+    deltas = Counter()
+    for business_id, status, day, delta in changes:
+        deltas[(business_id, status, day)] += delta
+        deltas[(None, status, day)] += delta
+
+    for (business_id, status, day), delta in deltas.items():
+        if not delta:
+            continue
+        rows = ProductStatusCounter.objects.filter(business_id=business_id, status=status, day=day)
+        if rows.update(count=F('count') + delta) or delta < 0:
+            # A missing row on a decrement means it was cascade-deleted along
+            # with its business; there is nothing left to decrement.
+            continue
+        try:
+            with transaction.atomic():
+                ProductStatusCounter.objects.create(
+                    business_id=business_id, status=status, day=day, count=delta
+                )
+        except IntegrityError:
+            # Another transaction created the row first.
+            rows.update(count=F('count') + delta)
+
+
+def expected_counts(product_model):
+    """Recompute every counter row from the product table."""
+    rows = product_model.objects.order_by().annotate(
+        day=TruncDate('status_changed_at')
+    ).values('business_id', 'status', 'day').annotate(count=Count('id'))
+
+    expected = Counter()
+    for row in rows:
+        expected[(row['business_id'], row['status'], row['day'])] += row['count']
+        expected[(None, row['status'], row['day'])] += row['count']
+    return expected
+
+
+def stored_counts(counter_model):
+    return Counter({
+        (row['business_id'], row['status'], row['day']): row['count']
+        for row in counter_model.objects.values('business_id', 'status', 'day', 'count')
+        if row['count']
+    })
+
+
+def rebuild(product_model, counter_model, batch_size=5000):
+    """
+    Replace all counter rows with values recomputed from the product table.
+
+    Counter writes are blocked before the products are read: status changes
+    that committed earlier are in the read, and the rest wait and then apply
+    their deltas on top of the rebuilt rows.
+    """
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            table = connection.ops.quote_name(counter_model._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {table} IN EXCLUSIVE MODE')
+        # On SQLite this first write takes the database write lock.
+        counter_model.objects.all().delete()
+        expected = expected_counts(product_model)
+        counter_model.objects.bulk_create(
+            [
+                counter_model(business_id=business_id, status=status, day=day, count=count)
+                for (business_id, status, day), count in expected.items()
+            ],
+            batch_size=batch_size,
+        )
+    return len(expected)
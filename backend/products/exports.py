@@ -0,0 +1,81 @@
+"""
+Streaming exports of the product table.
+
+Rows are read with ``QuerySet.iterator(chunk_size)`` (a server-side cursor on
+PostgreSQL) straight from ``values()``, so no model instances or full result
+lists are built and memory stays flat however large the table is. Each row is
+shaped like ProductSerializer's output.
+"""
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+EXPORT_FIELDS = [
+    'id', 'name', 'description', 'price', 'status', 'created_by', 'created_by_name',
+    'business', 'business_name', 'created_at', 'updated_at',
+]
+
+# values() lookups for the fields that don't live on the product row itself.
+SOURCES = {
+    'created_by': 'created_by_id',
+    'created_by_name': 'created_by__username',
+    'business': 'business_id',
+    'business_name': 'business__business__name',
+}
+
+CHUNK_SIZE = 2000
+
+
+def isoformat(value):
+    """Render a datetime the way DRF's DateTimeField does."""
+    if value is None:
+        return None
+    value = timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def export_rows(queryset, chunk_size=CHUNK_SIZE):
+    """Yield one dict per product, keyed by EXPORT_FIELDS."""
+    lookups = [SOURCES.get(field, field) for field in EXPORT_FIELDS]
+    for values in queryset.order_by('id').values_list(*lookups).iterator(chunk_size=chunk_size):
+        row = dict(zip(EXPORT_FIELDS, values))
+        row['price'] = str(row['price'])
+        row['created_at'] = isoformat(row['created_at'])
+        row['updated_at'] = isoformat(row['updated_at'])
+        yield row
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.DictWriter(_Echo(), fieldnames=EXPORT_FIELDS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+
+FORMATS = {
+    'csv': (stream_csv, 'text/csv'),
+    'jsonl': (stream_jsonl, 'application/x-ndjson'),
+}
+
+
+def export_response(queryset, export_format, chunk_size=CHUNK_SIZE):
+    stream, content_type = FORMATS[export_format]
+    response = StreamingHttpResponse(stream(export_rows(queryset, chunk_size)), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="products.{export_format}"'
+    return response
@@ -0,0 +1,65 @@
+"""
+Facet counts for the public catalogue.
+
+Every facet comes from one grouped aggregate: approved products matching the
+current filters, grouped by company (Business, with its name and industry)
+and price bucket, with a count and the price extremes per group. Companies,
+industries and price ranges are then summed from those rows in Python; there
+are at most companies x buckets of them, so the folding is cheap regardless
+of catalogue size.
+"""
+from decimal import Decimal
+
+from django.db.models import Case, Count, IntegerField, Max, Min, Value, When
+
+# Lower bounds of the price range facet; the last range is open-ended.
+PRICE_BUCKETS = [Decimal(bound) for bound in ('0', '25', '50', '100', '250', '500', '1000')]
+
+
+def price_bucket():
+    whens = [When(price__gte=bound, then=Value(index)) for index, bound in reversed(list(enumerate(PRICE_BUCKETS)))]
+    return Case(*whens, default=Value(0), output_field=IntegerField())
+
+
+def price_range(index):
+    upper = PRICE_BUCKETS[index + 1] if index + 1 < len(PRICE_BUCKETS) else None
+    return {'min': str(PRICE_BUCKETS[index]), 'max': str(upper) if upper is not None else None}
+
+
+def format_price(value):
+    # SQLite hands aggregates back without the column's two decimal places.
+    return f'{value:.2f}' if value is not None else None
+
+
+def facet_counts(queryset):
+    rows = (
+        queryset.order_by()
+        .values('business__business_id', 'business__business__name', 'business__business__industry', bucket=price_bucket())
+        .annotate(count=Count('id'), min_price=Min('price'), max_price=Max('price'))
+    )
+
+    companies, industries, buckets = {}, {}, {}
+    total, lowest, highest = 0, None, None
+    for row in rows:
+        count = row['count']
+        total += count
+        company = companies.setdefault(row['business__business_id'], {
+            'id': row['business__business_id'], 'name': row['business__business__name'], 'count': 0,
+        })
+        company['count'] += count
+        industry = row['business__business__industry']
+        industries[industry] = industries.get(industry, 0) + count
+        buckets[row['bucket']] = buckets.get(row['bucket'], 0) + count
+        lowest = row['min_price'] if lowest is None else min(lowest, row['min_price'])
+        highest = row['max_price'] if highest is None else max(highest, row['max_price'])
+
+    by_count = lambda item: (-item['count'], item['name'])
+    return {
+        'total': total,
+        'price': {'min': format_price(lowest), 'max': format_price(highest)},
+        'price_ranges': [{**price_range(index), 'count': buckets[index]} for index in sorted(buckets)],
+        'companies': sorted(companies.values(), key=by_count),
+        'industries': sorted(
+            ({'name': name, 'count': count} for name, count in industries.items()), key=by_count
+        ),
+    }
@@ -0,0 +1,133 @@
+"""
+Bulk product import from CSV or JSON Lines uploads.
+
+The upload is read and validated one row at a time with
+ProductCreateSerializer. Valid rows are collected into batches, and each batch
+is written with one ``bulk_create`` in its own transaction together with its
+counter updates. bulk_create skips the post_save signals, so counters are
+applied here. A bad row never aborts the import: it is reported by line
+number and the rest carry on. Uploads are decoded line by line, so that holds
+for lines that are not valid UTF-8 too.
+"""
+import csv
+import json
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from . import counters
+from .models import Product
+from .serializers import ProductCreateSerializer
+
+DEFAULT_BATCH_SIZE = getattr(settings, 'PRODUCT_IMPORT_BATCH_SIZE', 1000)
+MAX_BATCH_SIZE = 10000
+# Stop listing individual errors past this many; the total is still counted.
+MAX_REPORTED_ERRORS = 1000
+
+NOT_UTF8 = 'Line is not valid UTF-8'
+
+
+def decoded_lines(stream, undecodable):
+    """
+    Decode the binary ``stream`` one line at a time, so a bad byte only costs
+    its own line. Lines that are not UTF-8 are decoded with replacement
+    characters and their numbers added to ``undecodable``.
+    """
+    for line, raw in enumerate(stream, start=1):
+        try:
+            yield raw.decode('utf-8-sig' if line == 1 else 'utf-8')
+        except UnicodeDecodeError:
+            undecodable.add(line)
+            yield raw.decode('utf-8', 'replace')
+
+
+def read_csv(stream):
+    """Yield ``(line, row)`` pairs; line 1 is the header."""
+    undecodable = set()
+    reader = csv.DictReader(decoded_lines(stream, undecodable))
+    for row in reader:
+        # The reader has consumed exactly this row's lines, so these are its own.
+        if undecodable:
+            yield min(undecodable), ValueError(NOT_UTF8)
+            undecodable.clear()
+            continue
+        yield reader.line_num, row
+
+
+def read_jsonl(stream):
+    undecodable = set()
+    for line, raw in enumerate(decoded_lines(stream, undecodable), start=1):
+        if line in undecodable:
+            yield line, ValueError(NOT_UTF8)
+            continue
+        if not raw.strip():
+            continue
+        try:
+            row = json.loads(raw)
+        except ValueError as exc:
+            row = ValueError(f'Invalid JSON: {exc}')
+        else:
+            if not isinstance(row, dict):
+                row = ValueError('Each line must be a JSON object')
+        yield line, row
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+}
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def insert_batch(batch):
+    with transaction.atomic():
+        Product.objects.bulk_create(batch)
+        counters.apply_changes([counters.entered(product) for product in batch])
+
+
+def import_products(rows, user, profile, batch_size=DEFAULT_BATCH_SIZE):
+    """Validate and insert ``(line, row)`` pairs as products of ``profile``."""
+    report = ImportReport()
+    # One serializer validates every row: building a ModelSerializer's fields
+    # costs more than validating a row with them.
+    serializer = ProductCreateSerializer()
+    batch = []
+    for line, row in rows:
+        if isinstance(row, Exception):
+            report.error(line, {'non_field_errors': [str(row)]})
+            continue
+        try:
+            validated_data = serializer.run_validation(row)
+        except ValidationError as exc:
+            report.error(line, exc.detail)
+            continue
+        batch.append(Product(**validated_data, created_by=user, business=profile))
+        if len(batch) >= batch_size:
+            insert_batch(batch)
+            report.imported += len(batch)
+            batch = []
+    if batch:
+        insert_batch(batch)
+        report.imported += len(batch)
+    # Imported products start as drafts, so the public catalogue is unchanged.
+    return report
@@ -0,0 +1,94 @@
+"""
+Lightweight product list payloads.
+
+ProductSerializer builds every row through eleven DRF fields from model
+instances with ``created_by`` and the business joined in. The list endpoints
+instead read only the columns the response needs with ``values_list()`` and
+shape each row with precompiled accessors. Rows match ProductSerializer's
+output field for field, and ``?fields=`` (a comma-separated subset of
+PRODUCT_FIELDS) narrows both the payload and the columns read. Views that
+render with marketplace.renderers.FastJSONRenderer also skip formatting
+prices and timestamps in Python; the encoder does it.
+"""
+from operator import itemgetter
+
+from rest_framework.exceptions import ValidationError
+
+from marketplace.pagination import KeysetPagination, paginated_data
+from marketplace.renderers import renders_raw_values
+from .exports import SOURCES, isoformat
+
+PRODUCT_FIELDS = [
+    'id', 'name', 'description', 'price', 'status', 'created_by', 'created_by_name',
+    'business', 'business_name', 'created_at', 'updated_at',
+]
+
+FORMATTERS = {
+    'price': str,
+    'created_at': isoformat,
+    'updated_at': isoformat,
+}
+
+FIELDS_PARAM = 'fields'
+
+
+def requested_fields(params, available=PRODUCT_FIELDS):
+    """The ``?fields=`` subset in canonical order, or every field when absent."""
+    value = params.get(FIELDS_PARAM)
+    if not value:
+        return list(available)
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = names - set(available)
+    if unknown:
+        raise ValidationError({FIELDS_PARAM: f'Unknown fields: {", ".join(sorted(unknown))}'})
+    return [name for name in available if name in names]
+
+
+class ProductRows:
+    """
+    One list response shape: the columns to read and how to turn them into dicts.
+
+    Rows are ``values_list(named=True)`` tuples, so each field is read with a
+    precompiled ``itemgetter`` instead of per-field lookups. The pagination
+    ``keys`` are always read, so cursors can be built from rows whose fields
+    leave them out. With ``raw=True`` Decimal and datetime values are passed
+    through for a renderer that encodes them (marketplace.renderers).
+    """
+
+    def __init__(self, fields, keys=('created_at', 'id'), raw=False):
+        self.fields = list(fields)
+        sources = [SOURCES.get(field, field) for field in self.fields]
+        self.lookups = list(dict.fromkeys(sources + list(keys)))
+        positions = [self.lookups.index(source) for source in sources]
+        if len(positions) == 1:
+            position = positions[0]
+            self._get = lambda row: (row[position],)
+        else:
+            self._get = itemgetter(*positions)
+        self._formatters = [] if raw else [
+            (index, FORMATTERS[field]) for index, field in enumerate(self.fields) if field in FORMATTERS
+        ]
+
+    def values(self, queryset):
+        return queryset.values_list(*self.lookups, named=True)
+
+    def serialize(self, rows):
+        fields, get = self.fields, self._get
+        if not self._formatters:
+            return [dict(zip(fields, get(row))) for row in rows]
+        data = []
+        for row in rows:
+            values = list(get(row))
+            for index, formatter in self._formatters:
+                if values[index] is not None:
+                    values[index] = formatter(values[index])
+            data.append(dict(zip(fields, values)))
+        return data
+
+
+def paginated_rows(request, queryset, pagination_class=KeysetPagination, params=None):
+    """List-view response data for ``queryset``, narrowed by ``?fields=``."""
+    fields = requested_fields(params if params is not None else request.query_params)
+    keys = [field.lstrip('-') for field in pagination_class.ordering]
+    rows = ProductRows(fields, keys, raw=renders_raw_values(request))
+    return paginated_data(request, rows.values(queryset), rows.serialize, pagination_class)
@@ -0,0 +1,337 @@
+"""
+In-process benchmark of every route in products/urls.py and authentication/urls.py.
+
+Each route is driven through the Django test client against a scratch
+database seeded with ``--rows`` products, authenticated the way real clients
+are: a JWT for the DRF views and the dashboard router, a session for the
+plain Django role dashboards, nothing for public routes. Routes that consume what they act on (approve,
+delete, register, ...) get a fresh target from ``prepare`` before every
+request; that setup is not timed.
+
+Reported per route: p50/p95/p99 latency, mean queries per request, status
+codes and sequential throughput (one client, requests per second of request
+time). ``--output`` stores the run as JSON; ``--compare`` prints the p50
+change against an earlier file, so runs on two commits can be diffed.
+"""
+import io
+import json
+import logging
+import subprocess
+import time
+from itertools import count
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from authentication import urls as authentication_urls
+from authentication.models import UserProfile
+from authentication.tokens import RoleRefreshToken
+from products import counters
+from products import urls as product_urls
+from products.benchmarks import analyze, count_queries, scratch_database, seed_products, summarize
+from products.models import Product, ProductStatusCounter
+
+URL_MODULES = [product_urls, authentication_urls]
+
+ROLES = ['admin', 'editor', 'approver', 'viewer']
+PASSWORD = 'password123'
+
+
+class Route:
+    """
+    How to exercise one URL name with one method.
+
+    ``auth`` is ``'jwt'``, ``'session'`` or None. ``prepare(fixture)``, when
+    given, runs before each request and returns overrides for ``kwargs``,
+    ``data`` and ``query``.
+    """
+
+    def __init__(self, name, method='GET', role=None, auth='jwt', kwargs=None, data=None,
+                 query='', prepare=None, multipart=False, max_repeat=None):
+        self.name = name
+        self.method = method
+        self.role = role
+        self.auth = auth if role else None
+        self.kwargs = kwargs or {}
+        self.data = data
+        self.query = query
+        self.prepare = prepare
+        self.multipart = multipart
+        self.max_repeat = max_repeat
+
+    @property
+    def label(self):
+        return f'{self.method} {self.name}' + (f'?{self.query}' if self.query else '')
+
+
+class Fixture:
+    """The seeded data routes point at, plus helpers making fresh targets."""
+
+    def __init__(self, rows):
+        profiles = seed_products(rows)
+        self.business = profiles[0].business
+        self.users = {}
+        for role in ROLES:
+            email = f'{role}@bench.test'
+            user = User.objects.create_user(username=email, email=email, password=PASSWORD)
+            UserProfile.objects.create(user=user, business=self.business, role=role)
+            self.users[role] = User.objects.select_related('profile').get(pk=user.pk)
+        self.editor = self.users['editor']
+
+        # Give the benchmark editor a realistic share of the catalogue to list and edit.
+        Product.objects.filter(business=profiles[0]).update(business=self.editor.profile, created_by=self.editor)
+        counters.rebuild(Product, ProductStatusCounter)
+        self.product = Product.objects.filter(business=self.editor.profile).order_by('id').first()
+        analyze()
+
+        self.tokens = {
+            role: f'Bearer {RoleRefreshToken.for_user(user).access_token}' for role, user in self.users.items()
+        }
+        self._sequence = count()
+
+    def unique(self, prefix):
+        return f'{prefix}{next(self._sequence)}'
+
+    def new_product(self, status='draft'):
+        return Product.objects.create(
+            name=self.unique('Benchmark product '), description='Created by benchmark_api', price='19.99',
+            status=status, created_by=self.editor, business=self.editor.profile,
+        )
+
+    def new_user(self):
+        email = self.unique('user') + '@bench.test'
+        user = User.objects.create_user(username=email, email=email, password=PASSWORD)
+        UserProfile.objects.create(user=user, business=self.business, role='viewer')
+        return user
+
+
+def import_file(fixture):
+    lines = ['name,description,price'] + [f'Imported {i},Imported by benchmark_api,9.99' for i in range(100)]
+    upload = io.BytesIO('\n'.join(lines).encode())
+    upload.name = 'products.csv'
+    return {'data': {'file': upload}}
+
+
+ROUTES = [
+    # products/urls.py
+    Route('product-list-create', role='editor', query='page_size=50'),
+    Route('product-list-create', 'POST', 'editor',
+          data={'name': 'Benchmark lamp', 'description': 'Bright', 'price': '25.00'}),
+    Route('product-detail', role='editor', prepare=lambda f: {'kwargs': {'pk': f.product.pk}}),
+    Route('product-detail', 'PATCH', 'editor', data={'price': '12.50'},
+          prepare=lambda f: {'kwargs': {'pk': f.product.pk}}),
+    Route('product-detail', 'DELETE', 'editor', prepare=lambda f: {'kwargs': {'pk': f.new_product().pk}}),
+    Route('pending-products', role='approver', query='page_size=50'),
+    Route('rejected-products', role='approver', query='page_size=50'),
+    Route('approval-stats', role='approver'),
+    Route('analytics-data', role='approver'),
+    Route('approve-product', 'PATCH', 'approver',
+          prepare=lambda f: {'kwargs': {'product_id': f.new_product('pending_approval').pk}}),
+    Route('reject-product', 'PATCH', 'approver',
+          prepare=lambda f: {'kwargs': {'product_id': f.new_product('pending_approval').pk}}),
+    Route('bulk-review', 'POST', 'approver', kwargs={'action': 'approve'},
+          prepare=lambda f: {'data': {'ids': [f.new_product('pending_approval').pk for _ in range(20)]}}),
+    Route('submit-for-approval', 'PATCH', 'editor',
+          prepare=lambda f: {'kwargs': {'product_id': f.new_product().pk}}),
+    Route('import-products', 'POST', 'editor', kwargs={'import_format': 'csv'}, multipart=True,
+          prepare=import_file),
+    Route('public-products', query='page_size=50'),
+    Route('public-facets'),
+    Route('search-products', query='q=oak+lamp'),
+    Route('autocomplete-products', query='q=oak'),
+    Route('public-products-async', query='page_size=50'),
+    Route('pending-products-async', role='approver', query='page_size=50'),
+    Route('approval-stats-async', role='approver'),
+    Route('analytics-data-async', role='approver'),
+
+    # authentication/urls.py
+    Route('register', 'POST', prepare=lambda f: {'data': {
+        'username': f.unique('registered'), 'email': f.unique('registered') + '@bench.test',
+        'password': PASSWORD, 'confirm_password': PASSWORD, 'first_name': 'Bench', 'last_name': 'User',
+        'company_name': 'Registered Co', 'industry': 'Retail', 'company_size': '1-10',
+    }}),
+    Route('login', 'POST', data={'email': 'viewer@bench.test', 'password': PASSWORD}),
+    Route('profile', role='viewer'),
+    Route('token_refresh', 'POST', prepare=lambda f: {
+        'data': {'refresh': str(RoleRefreshToken.for_user(f.users['viewer']))},
+    }),
+    Route('user_dashboard', role='viewer'),
+    Route('admin_dashboard', role='admin', auth='session'),
+    Route('editor_dashboard', role='editor', auth='session'),
+    Route('approver_dashboard', role='approver', auth='session'),
+    Route('viewer_dashboard', role='viewer', auth='session'),
+    Route('admin-stats', role='admin'),
+    Route('request-timings', role='admin'),
+    Route('metrics'),
+    Route('admin-users', role='admin', query='page_size=50'),
+    Route('create-user', 'POST', 'admin', prepare=lambda f: {'data': {
+        'first_name': 'Bench', 'last_name': 'User', 'email': f.unique('created') + '@bench.test',
+        'password': PASSWORD, 'role': 'viewer', 'business_id': f.business.pk,
+    }}),
+    Route('update-user', 'PATCH', 'admin', data={'first_name': 'Renamed'},
+          prepare=lambda f: {'kwargs': {'user_id': f.users['viewer'].pk}}),
+    Route('delete-user', 'DELETE', 'admin', prepare=lambda f: {'kwargs': {'user_id': f.new_user().pk}}),
+    Route('admin-products', role='admin', query='page_size=50'),
+    # Streams the whole table; a few samples are enough.
+    Route('export-products', role='admin', kwargs={'export_format': 'csv'}, max_repeat=3),
+    Route('update-product', 'PATCH', 'admin', data={'price': '10.00'},
+          prepare=lambda f: {'kwargs': {'product_id': f.product.pk}}),
+    Route('delete-product', 'DELETE', 'admin', prepare=lambda f: {'kwargs': {'product_id': f.new_product().pk}}),
+    Route('recent-activities', role='admin', query='page_size=20'),
+    Route('viewer-stats', role='viewer'),
+]
+
+
+def url_names():
+    """Every named route in the benchmarked URL modules."""
+    return {
+        pattern.name for module in URL_MODULES for pattern in module.urlpatterns
+        if isinstance(pattern, URLPattern) and pattern.name
+    }
+
+
+def uncovered_routes(routes=ROUTES):
+    covered = {route.name for route in routes}
+    return sorted(name for name in url_names() if name not in covered)
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark every products and authentication API route in-process and store the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=50, help='Timed requests per route')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per route first')
+        parser.add_argument('--route', action='append', help='Only routes whose label contains this; repeatable')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='Earlier --output file to compare p50 latencies against')
+
+    def handle(self, *args, **options):
+        missing = uncovered_routes()
+        if missing:
+            raise CommandError(f'No benchmark defined for: {", ".join(missing)}')
+        routes = [
+            route for route in ROUTES
+            if not options['route'] or any(part in route.label for part in options['route'])
+        ]
+
+        # Server errors are reported per route in status_codes, not as logged tracebacks.
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            with scratch_database():
+                self.stdout.write(f'Seeding {options["rows"]} products ({connection.vendor})...')
+                fixture = Fixture(options['rows'])
+                results = []
+                for route in routes:
+                    result = self.run_route(route, fixture, options)
+                    results.append(result)
+                    self.report(result)
+        finally:
+            request_logger.setLevel(level)
+
+        run = {
+            'commit': current_commit(),
+            'started_at': timezone.now().isoformat(),
+            'vendor': connection.vendor,
+            'rows': options['rows'],
+            'repeat': options['repeat'],
+            'routes': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(run, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
+        if options['compare']:
+            self.compare(run, options['compare'])
+
+    def client_for(self, route, fixture):
+        client = Client(raise_request_exception=False)
+        headers = {}
+        if route.auth == 'session':
+            client.force_login(fixture.users[route.role])
+        elif route.auth == 'jwt':
+            headers['Authorization'] = fixture.tokens[route.role]
+        return client, headers
+
+    def send(self, client, headers, route, fixture):
+        overrides = route.prepare(fixture) if route.prepare else {}
+        kwargs = overrides.get('kwargs', route.kwargs)
+        data = overrides.get('data', route.data)
+        url = reverse(route.name, kwargs=kwargs)
+        if route.query:
+            url += f'?{route.query}'
+        method = getattr(client, route.method.lower())
+        if route.method == 'GET':
+            request = lambda: method(url, headers=headers)
+        elif route.multipart:
+            request = lambda: method(url, data, headers=headers)
+        else:
+            request = lambda: method(url, json.dumps(data or {}), content_type='application/json', headers=headers)
+
+        with count_queries() as counter:
+            start = time.perf_counter()
+            response = request()
+            if getattr(response, 'streaming', False):
+                for _ in response.streaming_content:
+                    pass
+            elapsed = (time.perf_counter() - start) * 1000
+        return elapsed, counter['queries'], response.status_code
+
+    def run_route(self, route, fixture, options):
+        client, headers = self.client_for(route, fixture)
+        for _ in range(options['warmup']):
+            self.send(client, headers, route, fixture)
+
+        repeat = min(options['repeat'], route.max_repeat or options['repeat'])
+        samples, queries, statuses = [], 0, {}
+        for _ in range(repeat):
+            elapsed, query_count, status_code = self.send(client, headers, route, fixture)
+            samples.append(elapsed)
+            queries += query_count
+            statuses[str(status_code)] = statuses.get(str(status_code), 0) + 1
+        return {
+            'route': route.label,
+            'requests': repeat,
+            **summarize(samples),
+            'queries_per_request': round(queries / repeat, 1),
+            'throughput_rps': round(repeat / (sum(samples) / 1000), 1),
+            'status_codes': statuses,
+        }
+
+    def report(self, result):
+        codes = ' '.join(f'{code}x{n}' for code, n in sorted(result['status_codes'].items()))
+        self.stdout.write(
+            f'{result["route"]}: p50={result["p50_ms"]}ms p95={result["p95_ms"]}ms p99={result["p99_ms"]}ms '
+            f'{result["queries_per_request"]} queries, {result["throughput_rps"]} req/s [{codes}]'
+        )
+
+    def compare(self, run, path):
+        with open(path) as previous_file:
+            previous = json.load(previous_file)
+        before = {result['route']: result for result in previous['routes']}
+        self.stdout.write(f'p50 change against {previous.get("commit") or path}:')
+        for result in run['routes']:
+            old = before.get(result['route'])
+            if old is None:
+                self.stdout.write(f'  {result["route"]}: new')
+                continue
+            change = (result['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0
+            self.stdout.write(
+                f'  {result["route"]}: {old["p50_ms"]}ms -> {result["p50_ms"]}ms ({change:+.0f}%), '
+                f'queries {old["queries_per_request"]} -> {result["queries_per_request"]}'
+            )
@@ -0,0 +1,77 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+
+from authentication.models import UserProfile
+from authentication.tokens import RoleRefreshToken
+from products.benchmarks import analyze, scratch_database, seed_products, summarize
+
+ROUTES = ['public/?page_size=50', 'pending/?page_size=50', 'stats/', 'analytics/']
+
+
+class Command(BaseCommand):
+    help = 'Compare sync (WSGI) and async (ASGI) read endpoints under many concurrent clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--clients', type=int, default=500)
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per route')
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stdout.write(f'Seeding {options["rows"]} products...')
+            profiles = seed_products(options['rows'])
+            analyze()
+
+            approver = User.objects.create_user(username='bench-approver', password='password123')
+            UserProfile.objects.create(user=approver, business=profiles[0].business, role='approver')
+            approver = User.objects.select_related('profile').get(pk=approver.pk)
+            headers = {'Authorization': f'Bearer {RoleRefreshToken.for_user(approver).access_token}'}
+
+            for route in ROUTES:
+                wsgi = self.run_wsgi(f'/api/products/{route}', headers, options)
+                self.report(f'WSGI /api/products/{route}', *wsgi)
+                asgi = asyncio.run(self.run_asgi(f'/api/products/async/{route}', headers, options))
+                self.report(f'ASGI /api/products/async/{route}', *asgi)
+
+    def run_wsgi(self, url, headers, options):
+        """One thread per client, as a threaded WSGI server would run them."""
+        client = Client()
+
+        def request(_):
+            start = time.perf_counter()
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200, response.status_code
+            return (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['clients']) as pool:
+            samples = list(pool.map(request, range(options['requests'])))
+        return samples, time.perf_counter() - start
+
+    async def run_asgi(self, url, headers, options):
+        """All clients multiplexed on one event loop, as a single ASGI worker would."""
+        client = AsyncClient()
+        slots = asyncio.Semaphore(options['clients'])
+
+        async def request():
+            async with slots:
+                start = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                assert response.status_code == 200, response.status_code
+                return (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        samples = await asyncio.gather(*(request() for _ in range(options['requests'])))
+        return samples, time.perf_counter() - start
+
+    def report(self, label, samples, elapsed):
+        stats = summarize(samples)
+        self.stdout.write(
+            f'{label}: {len(samples) / elapsed:.0f} req/s, '
+            f'p50={stats["p50_ms"]}ms p95={stats["p95_ms"]}ms max={stats["max_ms"]}ms'
+        )
@@ -0,0 +1,78 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.test import APIClient
+
+from products import catalogue
+from products.autocomplete import PrefixIndex, autocomplete
+from products.benchmarks import measure, scratch_database, seed_products
+from products.models import Product
+
+PREFIXES = ['l', 'lam', 'oak ta', 'vintage walnut', 'rustic oak lamp', 'zzz']
+
+
+class Command(BaseCommand):
+    help = 'Measure autocomplete build time, memory and lookup latency over approved product names'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stdout.write(f'Seeding {options["rows"]} products ({connection.vendor})...')
+            seed_products(options['rows'], stdout=self.stdout)
+            Product.objects.filter(status='pending_approval').update(status='approved')
+            rows = list(Product.objects.filter(status='approved').values_list('id', 'name'))
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            index = PrefixIndex()
+            index.load(rows)
+            build_s = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            retained = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            self.stdout.write(
+                f'Built {len(index)} names in {build_s:.2f}s: retained {retained / 2**20:.1f}MB '
+                f'(estimated {index.estimated_bytes / 2**20:.1f}MB), peak {peak / 2**20:.1f}MB'
+            )
+
+            for prefix in PREFIXES:
+                stats = measure(lambda: index.complete(prefix), options['repeat'])
+                self.stdout.write(
+                    f'{prefix!r}: {len(index.complete(prefix))} results, '
+                    f'p50={stats["p50_ms"]}ms p95={stats["p95_ms"]}ms max={stats["max_ms"]}ms'
+                )
+
+            # A bulk-review chunk's worth of changes: half leave the catalogue, half come back renamed.
+            sample = rows[:1000]
+            started = time.perf_counter()
+            index.update([(product_id, None) for product_id, _ in sample[:500]])
+            index.update([(product_id, f'{name} v2') for product_id, name in sample])
+            self.stdout.write(
+                f'Incremental update: {(time.perf_counter() - started) * 1000:.0f}ms for two {len(sample) // 2}'
+                f'-/{len(sample)}-name batches'
+            )
+
+            client = APIClient()
+            autocomplete.reset()
+            started = time.perf_counter()
+            client.get('/api/products/autocomplete/?q=lam')
+            self.stdout.write(f'Endpoint cold start (lazy build): {time.perf_counter() - started:.2f}s')
+            stats = measure(lambda: client.get('/api/products/autocomplete/?q=oak+ta'), options['repeat'] // 10)
+            self.stdout.write(
+                f'Endpoint q=oak+ta: p50={stats["p50_ms"]}ms p95={stats["p95_ms"]}ms max={stats["max_ms"]}ms'
+            )
+
+            # Another process approves a chunk: the next query catches up from the change log.
+            changed = [product_id for product_id, _ in rows[:1000]]
+            Product.objects.filter(id__in=changed).update(name='Catch-up lamp')
+            catalogue.bump(changed)
+            started = time.perf_counter()
+            client.get('/api/products/autocomplete/?q=catch')
+            self.stdout.write(
+                f'Catch-up on {len(changed)} changes from another process: {time.perf_counter() - started:.2f}s'
+            )
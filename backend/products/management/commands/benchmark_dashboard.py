@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from authentication.models import UserProfile
+from products.benchmarks import analyze, count_queries, measure, scratch_database, seed_products
+from products.models import Product, ProductStatusCounter
+
+
+class Command(BaseCommand):
+    help = 'Measure approver dashboard endpoints (stats and analytics) at scale'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stdout.write(f'Seeding {options["rows"]} products...')
+            profiles = seed_products(options['rows'])
+            analyze()
+
+            approver = User.objects.create_user(username='bench-approver', password='password123')
+            UserProfile.objects.create(user=approver, business=profiles[0].business, role='approver')
+            client = APIClient()
+            client.force_authenticate(User.objects.select_related('profile').get(pk=approver.pk))
+
+            for url in ['/api/products/stats/', '/api/products/analytics/']:
+                with count_queries() as counter:
+                    client.get(url)
+                stats = measure(lambda: client.get(url), options['repeat'])
+                self.report(url, stats, counter['queries'])
+
+            # Baseline: the per-number COUNT queries the dashboards used to run.
+            today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+
+            def separate_counts():
+                Product.objects.count()
+                for status in ['approved', 'rejected', 'pending_approval']:
+                    Product.objects.filter(status=status).count()
+                Product.objects.filter(status='approved', updated_at__gte=today).count()
+                for status in ['approved', 'rejected']:
+                    Product.objects.filter(status=status, updated_at__gte=today - timedelta(days=7)).count()
+            self.report('separate COUNT queries', measure(separate_counts, options['repeat']), 7)
+            self.report(
+                'ProductStatusCounter dashboard_counts()',
+                measure(ProductStatusCounter.objects.dashboard_counts, options['repeat']),
+                1,
+            )
+
+    def report(self, label, stats, queries):
+        self.stdout.write(
+            f'{label}: {queries} queries, p50={stats["p50_ms"]}ms p95={stats["p95_ms"]}ms max={stats["max_ms"]}ms'
+        )
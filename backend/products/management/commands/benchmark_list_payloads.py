@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from products.benchmarks import analyze, measure, scratch_database, seed_products
+from products.listing import PRODUCT_FIELDS, ProductRows
+from products.models import Product
+from products.serializers import ProductSerializer
+
+LISTS = {
+    'public': 'approved',
+    'pending': 'pending_approval',
+}
+
+COMPACT_FIELDS = ['id', 'name', 'price', 'status']
+
+
+class Command(BaseCommand):
+    help = 'Compare payload size and serialization time of the list representations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--limit', type=int, action='append', help='Rows per list; repeatable (default 500 and 10000)')
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+        with scratch_database():
+            self.stdout.write(f'Seeding {options["rows"]} products...')
+            seed_products(options['rows'], stdout=self.stdout)
+            Product.objects.filter(pk__in=Product.objects.filter(status='draft').values('pk')).update(status='approved')
+            analyze()
+
+            full, compact = ProductRows(PRODUCT_FIELDS), ProductRows(COMPACT_FIELDS)
+            for name, status in LISTS.items():
+                products = Product.objects.filter(status=status).order_by('-created_at', '-id')
+                for limit in options['limit'] or [500, 10000]:
+                    variants = {
+                        'ProductSerializer': lambda: ProductSerializer(
+                            products.select_related('created_by', 'business__business')[:limit], many=True
+                        ).data,
+                        'values() rows': lambda: full.serialize(full.values(products)[:limit]),
+                        f'values() fields={",".join(COMPACT_FIELDS)}': lambda: compact.serialize(
+                            compact.values(products)[:limit]
+                        ),
+                    }
+                    for label, build in variants.items():
+                        size = len(renderer.render(build()))
+                        stats = measure(lambda: renderer.render(build()), options['repeat'])
+                        self.stdout.write(
+                            f'{name} x{limit} {label}: {size / 1024:.0f}KB, '
+                            f'p50={stats["p50_ms"]}ms p95={stats["p95_ms"]}ms'
+                        )
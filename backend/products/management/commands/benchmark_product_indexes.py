@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from products.benchmarks import analyze, measure, scratch_database, seed_products
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Compare query plans and latency of the hot Product queries without and with the Meta indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stdout.write(f'Seeding {options["rows"]} products...')
+            profiles = seed_products(options['rows'])
+            queries = self.queries(profiles[0])
+
+            indexes = Product._meta.indexes
+            with connection.schema_editor() as editor:
+                for index in indexes:
+                    editor.remove_index(Product, index)
+            analyze()
+            before = self.run(queries, options['repeat'])
+
+            with connection.schema_editor() as editor:
+                for index in indexes:
+                    editor.add_index(Product, index)
+            analyze()
+            after = self.run(queries, options['repeat'])
+
+        for name in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label, results in (('without indexes', before), ('with indexes', after)):
+                plan, stats = results[name]
+                self.stdout.write(f'  {label}: p50={stats["p50_ms"]}ms p95={stats["p95_ms"]}ms')
+                for line in plan.splitlines():
+                    self.stdout.write(f'      {line}')
+
+    def queries(self, profile):
+        today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        return {
+            'public_products (first page)': lambda: Product.objects.filter(status='approved')[:50],
+            'pending_products (first page)': lambda: Product.objects.filter(status='pending_approval')[:50],
+            'business listing (first page)': lambda: Product.objects.filter(business=profile)[:50],
+            'approved today': lambda: Product.objects.filter(status='approved', updated_at__gte=today),
+            'rejected this week': lambda: Product.objects.filter(
+                status='rejected', updated_at__gte=today - timedelta(days=7)
+            ),
+            'pending count': lambda: Product.objects.filter(status='pending_approval'),
+        }
+
+    def run(self, queries, repeat):
+        results = {}
+        for name, build in queries.items():
+            queryset = build()
+            if queryset.query.is_sliced:
+                execute = lambda qs=queryset: list(qs.all())
+            else:
+                execute = lambda qs=queryset: qs.count()
+                queryset = queryset.order_by().values('id')
+            results[name] = (queryset.explain(), measure(execute, repeat))
+        return results
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.test import APIClient
+
+from products import search
+from products.benchmarks import analyze, count_queries, measure, scratch_database, seed_products
+from products.models import Product
+
+QUERIES = [
+    'q=lamp',
+    'q=oak+table',
+    'q=vint',
+    'q=wireless+headphones&max_price=200',
+    'q=chair&company={company}',
+    'q=lamp&page_size=20&cursor={cursor}',
+]
+
+
+class Command(BaseCommand):
+    help = 'Measure full-text product search latency at scale'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stdout.write(f'Seeding {options["rows"]} products ({connection.vendor})...')
+            profiles = seed_products(options['rows'], stdout=self.stdout)
+            Product.objects.filter(status='pending_approval').update(status='approved')
+            analyze()
+
+            client = APIClient()
+            first_page = client.get('/api/products/search/?q=lamp&page_size=20').json()
+            cursor = first_page['next'].split('cursor=')[1].split('&')[0]
+            for template in QUERIES:
+                url = '/api/products/search/?' + template.format(
+                    company=profiles[0].business_id, cursor=cursor
+                )
+                with count_queries() as counter:
+                    response = client.get(url)
+                stats = measure(lambda: client.get(url), options['repeat'])
+                self.stdout.write(
+                    f'{template}: {len(response.json()["results"])} results, {counter["queries"]} queries, '
+                    f'p50={stats["p50_ms"]}ms p95={stats["p95_ms"]}ms max={stats["max_ms"]}ms'
+                )
+
+            plan = search.search(Product.objects.filter(status='approved'), 'lamp').order_by('rank', 'id')[:20]
+            self.stdout.write('Plan for q=lamp:\n' + plan.explain())
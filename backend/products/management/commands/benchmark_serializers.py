@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from marketplace import renderers
+from marketplace.renderers import FastJSONRenderer
+from products.benchmarks import measure, scratch_database, seed_products
+from products.listing import PRODUCT_FIELDS, ProductRows
+from products.models import Product
+from products.serializers import ProductSerializer
+
+
+class Command(BaseCommand):
+    help = 'Microbenchmark ProductSerializer against the values() fast path, serialization and rendering only'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        sizes = options['sizes']
+        with scratch_database():
+            self.stdout.write(f'Seeding {max(sizes)} products...')
+            seed_products(max(sizes), stdout=self.stdout)
+            products = Product.objects.order_by('-created_at', '-id')
+            formatted, raw = ProductRows(PRODUCT_FIELDS), ProductRows(PRODUCT_FIELDS, raw=True)
+
+            for size in sizes:
+                # Rows are fetched up front: this measures the Python side only.
+                instances = list(products.select_related('created_by', 'business__business')[:size])
+                tuples = list(formatted.values(products)[:size])
+                variants = [
+                    ('ProductSerializer + JSONRenderer',
+                     lambda: JSONRenderer().render(ProductSerializer(instances, many=True).data)),
+                    ('values() rows + JSONRenderer',
+                     lambda: JSONRenderer().render(formatted.serialize(tuples))),
+                    ('values() raw rows + FastJSONRenderer (orjson)',
+                     lambda: FastJSONRenderer().render(raw.serialize(tuples))),
+                    ('values() raw rows + FastJSONRenderer (stdlib)', self.without_orjson(
+                     lambda: FastJSONRenderer().render(raw.serialize(tuples)))),
+                ]
+                baseline = None
+                for label, run in variants:
+                    if label.endswith('(orjson)') and renderers.orjson is None:
+                        self.stdout.write(f'{size} rows, {label}: skipped, orjson is not installed')
+                        continue
+                    stats = measure(run, options['repeat'])
+                    baseline = baseline or stats['p50_ms']
+                    self.stdout.write(
+                        f'{size} rows, {label}: p50={stats["p50_ms"]}ms p95={stats["p95_ms"]}ms '
+                        f'({baseline / stats["p50_ms"]:.1f}x)'
+                    )
+
+    @staticmethod
+    def without_orjson(func):
+        def run():
+            encoder, renderers.orjson = renderers.orjson, None
+            try:
+                return func()
+            finally:
+                renderers.orjson = encoder
+        return run
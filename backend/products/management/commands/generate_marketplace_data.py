@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from products.benchmarks import analyze
+from products.synthetic import BATCH_SIZE, PASSWORD, Generator, generated_users
+
+
+class Command(BaseCommand):
+    help = 'Generate deterministic synthetic businesses, users and products into the configured database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--businesses', type=int, default=100)
+        parser.add_argument('--users-per-business', type=int, default=10)
+        parser.add_argument('--products-per-user', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--as-of', type=parse_datetime,
+            help='ISO datetime the generated dates lead up to (default: now). Fix it to reproduce a dataset exactly.'
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        seed = options['seed']
+        prefix = f'gen{seed}-user'
+        if generated_users(prefix, 'example.test').exists():
+            raise CommandError(f'Users from seed {seed} already exist; pick another --seed')
+
+        generator = Generator(seed=seed, now=options['as_of'], batch_size=options['batch_size'], stdout=self.stdout)
+        started = time.perf_counter()
+        businesses = generator.businesses(options['businesses'], prefix=f'Gen{seed} ')
+        profiles = generator.users(businesses, options['users_per_business'], prefix=prefix)
+        self.stdout.write(
+            f'Created {len(businesses)} businesses and {len(profiles)} users '
+            f'in {time.perf_counter() - started:.1f}s'
+        )
+        products = generator.products(profiles, len(profiles) * options['products_per_user'])
+        analyze()
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {products} products in {time.perf_counter() - started:.1f}s. '
+            f'Log in as {prefix}0@example.test / {PASSWORD}'
+        ))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products import counters
+from products.models import Product, ProductStatusCounter
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild ProductStatusCounter from the product table, or verify it with --verify. '
+        'Product status changes wait while the rebuild runs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Only compare the stored counters with the product table; exit non-zero on drift.'
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify']:
+            rows = counters.rebuild(Product, ProductStatusCounter)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} counter rows'))
+            return
+
+        expected = counters.expected_counts(Product)
+        stored = counters.stored_counts(ProductStatusCounter)
+        mismatches = sorted(
+            (key for key in set(expected) | set(stored) if expected[key] != stored[key]),
+            key=lambda key: (key[0] or 0, key[1], key[2]),
+        )
+        for business_id, status, day in mismatches:
+            key = (business_id, status, day)
+            self.stdout.write(
+                f'business={business_id or "all"} status={status} day={day}: '
+                f'stored {stored[key]}, expected {expected[key]}'
+            )
+        if mismatches:
+            raise CommandError(f'{len(mismatches)} counter rows differ from the product table')
+        self.stdout.write(self.style.SUCCESS(f'All {len(expected)} counter rows match'))
@@ -0,0 +1,46 @@
+# Generated by Django 6.0.1 on 2026-10-18 02:45
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_counters(apps, schema_editor):
+    from products import counters
+
+    Product = apps.get_model('products', 'Product')
+    ProductStatusCounter = apps.get_model('products', 'ProductStatusCounter')
+    # Best available approximation of when existing rows entered their status.
+    Product.objects.update(status_changed_at=F('updated_at'))
+    counters.rebuild(Product, ProductStatusCounter)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_business_remove_userprofile_company_name_and_more'),
+        ('products', '0004_product_access_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='status_changed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='ProductStatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=20)),
+                ('day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('business', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='product_counters', to='authentication.userprofile')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('business__isnull', False)), fields=('business', 'status', 'day'), name='product_counter_business_uniq'), models.UniqueConstraint(condition=models.Q(('business__isnull', True)), fields=('status', 'day'), name='product_counter_total_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-18 02:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def create_generation_row(apps, schema_editor):
+    CatalogueGeneration = apps.get_model('products', 'CatalogueGeneration')
+    CatalogueGeneration.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_status_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogueGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('generation', models.BigIntegerField(default=0)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(create_generation_row, migrations.RunPython.noop),
+    ]
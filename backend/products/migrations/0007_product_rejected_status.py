@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_catalogue_generation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Draft'), ('pending_approval', 'Pending Approval'), ('approved', 'Approved'), ('rejected', 'Rejected')], default='draft', max_length=20),
+        ),
+    ]
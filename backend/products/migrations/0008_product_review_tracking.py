@@ -0,0 +1,51 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def stamp_existing_products(apps, schema_editor):
+    # Earlier submissions and reviews are only known by when the product
+    # entered its current status; their review_time stays unknown.
+    Product = apps.get_model('products', 'Product')
+    Product.objects.filter(status='pending_approval').update(submitted_at=F('status_changed_at'))
+    Product.objects.filter(status__in=['approved', 'rejected']).update(reviewed_at=F('status_changed_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_userprofile_token_version'),
+        ('products', '0007_product_rejected_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='review_time',
+            field=models.DurationField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reviewed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reviewed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviewed_products', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='submitted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('review_time__isnull', False)), fields=['reviewed_at', 'review_time'], name='product_review_time_idx'),
+        ),
+        migrations.RunPython(stamp_existing_products, migrations.RunPython.noop),
+    ]
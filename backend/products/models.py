@@ -1,12 +1,56 @@
-from django.db import models
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
 from django.contrib.auth.models import User
 from authentication.models import UserProfile
 
+
+class ProductQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Join everything ProductSerializer reads so lists cost one query"""
+        return self.select_related('created_by', 'business__business')
+
+    def reviewed_since(self, since):
+        return self.filter(reviewed_at__gte=since, review_time__isnull=False)
+
+    def review_time_stats(self, since):
+        """
+        Count, average, p50 and p95 of review_time for reviews since ``since``.
+
+        Everything is computed in the database: one aggregate plus one sorted
+        OFFSET lookup per percentile (nearest rank), which works the same on
+        SQLite and PostgreSQL. product_review_time_idx covers all three, so
+        they read only the index entries inside the window.
+        """
+        reviewed = self.reviewed_since(since)
+        stats = reviewed.aggregate(count=Count('id'), avg=Avg('review_time'))
+        ordered = reviewed.order_by('review_time').values_list('review_time', flat=True)
+        for name, rank in self._percentile_ranks(stats['count']):
+            stats[name] = ordered[rank] if rank is not None else None
+        return stats
+
+    async def areview_time_stats(self, since):
+        reviewed = self.reviewed_since(since)
+        stats = await reviewed.aaggregate(count=Count('id'), avg=Avg('review_time'))
+        ordered = reviewed.order_by('review_time').values_list('review_time', flat=True)
+        for name, rank in self._percentile_ranks(stats['count']):
+            stats[name] = await ordered[rank:rank + 1].afirst() if rank is not None else None
+        return stats
+
+    @staticmethod
+    def _percentile_ranks(count):
+        for name, fraction in [('p50', 0.5), ('p95', 0.95)]:
+            yield name, int(fraction * (count - 1)) if count else None
+
+
 class Product(models.Model):
     STATUS_CHOICES = [
         ('draft', 'Draft'),
         ('pending_approval', 'Pending Approval'),
         ('approved', 'Approved'),
+        ('rejected', 'Rejected'),
     ]
     
     name = models.CharField(max_length=200)
@@ -17,9 +61,187 @@ class Product(models.Model):
     business = models.ForeignKey('authentication.UserProfile', on_delete=models.CASCADE, related_name='products')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # When the product entered its current status; keys ProductStatusCounter rows.
+    status_changed_at = models.DateTimeField(default=timezone.now)
+    # Review tracking, stamped by the workflow transitions.
+    submitted_at = models.DateTimeField(null=True, blank=True)
+    reviewed_at = models.DateTimeField(null=True, blank=True)
+    reviewed_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='reviewed_products'
+    )
+    review_time = models.DurationField(null=True, blank=True)
+
+    objects = ProductQuerySet.as_manager()
+
+    # (status, status_changed_at) as last read from or written to the database,
+    # so the counter signals know which counter row a change moves out of.
+    _saved_status = None
     
     def __str__(self):
         return self.name
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_status()
+        return instance
+
+    def _remember_status(self):
+        if 'status' in self.__dict__ and 'status_changed_at' in self.__dict__:
+            self._saved_status = (self.status, self.status_changed_at)
+
+    def save(self, *args, **kwargs):
+        # Counter updates happen in post_save; keep them in the same transaction.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            return super().delete(*args, **kwargs)
     
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Public catalogue and status listings, newest first.
+            models.Index(fields=['status', '-created_at', '-id'], name='product_status_created_idx'),
+            # Per-business listings (ProductListCreateView).
+            models.Index(fields=['business', '-created_at', '-id'], name='product_business_created_idx'),
+            # "Reviewed today/this week" windows in the approver stats.
+            models.Index(fields=['status', 'updated_at'], name='product_status_updated_idx'),
+            # The approval queue is small relative to the table; keep its index small too.
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='product_pending_idx',
+                condition=models.Q(status='pending_approval'),
+            ),
+            # Review latency stats: range on reviewed_at, covering review_time.
+            models.Index(
+                fields=['reviewed_at', 'review_time'],
+                name='product_review_time_idx',
+                condition=models.Q(review_time__isnull=False),
+            ),
+        ]
+
+
+class ProductStatusCounterQuerySet(models.QuerySet):
+    def totals(self):
+        return self.filter(business__isnull=True)
+
+    def dashboard_counts(self):
+        """
+        Status totals and review windows for the dashboards.
+
+        Reads the global (business-less) rows only: one per status and day, so
+        the cost depends on the number of days with activity, not products.
+        """
+        return self._fold_dashboard_rows(self._dashboard_rows())
+
+    async def adashboard_counts(self):
+        return self._fold_dashboard_rows([row async for row in self._dashboard_rows()])
+
+    def top_businesses(self, limit=5):
+        """Businesses ranked by approved products, with their reviewed totals."""
+        return self.filter(
+            business__isnull=False,
+            status__in=['approved', 'rejected']
+        ).values('business').annotate(
+            total=Sum('count'),
+            approved=Sum('count', filter=Q(status='approved'), default=0)
+        ).filter(total__gt=0).order_by('-approved')[:limit]
+
+    def industry_count(self, status='approved'):
+        """How many industries have products in ``status``, from the per-business rows."""
+        return self.filter(business__isnull=False, status=status).values(
+            'business__business__industry'
+        ).annotate(total=Sum('count')).filter(total__gt=0).count()
+
+    def _dashboard_rows(self):
+        today = timezone.localdate()
+        week_ago = today - timedelta(days=7)
+        return self.totals().values('status').annotate(
+            all_time=Sum('count'),
+            today=Sum('count', filter=Q(day__gte=today), default=0),
+            week=Sum('count', filter=Q(day__gte=week_ago), default=0),
+        )
+
+    @staticmethod
+    def _fold_dashboard_rows(rows):
+        by_status = {row['status']: row for row in rows}
+        empty = {'all_time': 0, 'today': 0, 'week': 0}
+        approved = by_status.get('approved', empty)
+        rejected = by_status.get('rejected', empty)
+        return {
+            'total': sum(row['all_time'] for row in by_status.values()),
+            'approved': approved['all_time'],
+            'rejected': rejected['all_time'],
+            'pending': by_status.get('pending_approval', empty)['all_time'],
+            'approved_today': approved['today'],
+            'weekly_approved': approved['week'],
+            'weekly_rejected': rejected['week'],
+        }
+
+
+class ProductStatusCounter(models.Model):
+    """
+    Number of products per business and status, bucketed by the day they
+    entered that status. Rows with no business hold the marketplace-wide
+    totals. Maintained by products.counters; rebuild with
+    ``manage.py rebuild_product_counters``.
+    """
+    business = models.ForeignKey(
+        'authentication.UserProfile', on_delete=models.CASCADE,
+        related_name='product_counters', null=True, blank=True
+    )
+    status = models.CharField(max_length=20)
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+
+    objects = ProductStatusCounterQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.business_id or 'all'} {self.status} {self.day}: {self.count}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['business', 'status', 'day'],
+                condition=models.Q(business__isnull=False),
+                name='product_counter_business_uniq',
+            ),
+            models.UniqueConstraint(
+                fields=['status', 'day'],
+                condition=models.Q(business__isnull=True),
+                name='product_counter_total_uniq',
+            ),
+        ]
+
+
+class CatalogueGeneration(models.Model):
+    """
+    Single-row version number of the public (approved) catalogue.
+
+    Bumped by products.catalogue whenever the set of approved products or
+    the content of one of them changes; keys the public catalogue cache and
+    its ETags.
+    """
+    generation = models.BigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'catalogue generation {self.generation}'
+
+
+class CatalogueChange(models.Model):
+    """
+    A product whose public entry changed at a catalogue generation: it
+    joined or left the approved catalogue, or changed while approved. A row
+    without a product means the whole catalogue changed (a bulk load).
+
+    Written by products.catalogue.bump(); lets other processes catch up on
+    what changed since the generation they last saw.
+    """
+    generation = models.BigIntegerField(db_index=True)
+    product_id = models.BigIntegerField(null=True)
+
+    def __str__(self):
+        return f'generation {self.generation}: {self.product_id or "everything"}'
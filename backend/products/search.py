@@ -0,0 +1,102 @@
+"""
+Full-text search over product name and description.
+
+The index lives in the database and is kept in sync by the database itself
+(see migration 0009_product_search_index):
+
+* SQLite: an external-content FTS5 table, ``products_product_fts``, fed by
+  insert/update/delete triggers on ``products_product``. Ranking is bm25 with
+  name matches weighted above description matches.
+* PostgreSQL: a stored generated ``search_vector`` tsvector column (name
+  weighted A, description B) with a GIN index, ranked with ts_rank_cd.
+
+``search()`` annotates ``rank`` so that ascending order is best-first on
+both backends, which lets results be keyset-paginated on ``(rank, id)``.
+Other backends fall back to unranked ``icontains`` matching.
+
+Bulk loads can wrap themselves in ``index_suspended()`` to rebuild the SQLite
+index once at the end instead of maintaining it row by row.
+"""
+import re
+from contextlib import contextmanager
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'products_product_fts'
+# bm25 column weights: (name, description).
+FTS_WEIGHTS = (10.0, 1.0)
+TS_CONFIG = 'english'
+MAX_TERMS = 8
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def terms(text):
+    return _TERM.findall(text or '')[:MAX_TERMS]
+
+
+def fts5_query(words):
+    """
+    Quote every term so user input can't inject FTS5 syntax; the last term
+    also matches as a prefix, so partially typed words still hit.
+    """
+    quoted = [f'"{word}"' for word in words]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search(queryset, text):
+    """Restrict ``queryset`` to products matching ``text`` and annotate ``rank``."""
+    words = terms(text)
+    if not words:
+        return queryset.none().annotate(rank=Value(0.0, output_field=FloatField()))
+
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'sqlite':
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = {table}.id', f'{FTS_TABLE} MATCH %s'],
+            params=[fts5_query(words)],
+        ).annotate(rank=RawSQL(f'bm25({FTS_TABLE}, {weights})', [], output_field=FloatField()))
+
+    if connection.vendor == 'postgresql':
+        query = ' '.join(words)
+        return queryset.extra(
+            where=[f'{table}.search_vector @@ websearch_to_tsquery(%s, %s)'],
+            params=[TS_CONFIG, query],
+        ).annotate(rank=RawSQL(
+            # ts_rank_cd is a real; as a double, cursor values compare equal to it again.
+            f'-ts_rank_cd({table}.search_vector, websearch_to_tsquery(%s, %s))::float8',
+            [TS_CONFIG, query], output_field=FloatField(),
+        ))
+
+    condition = Q()
+    for word in words:
+        condition &= Q(name__icontains=word) | Q(description__icontains=word)
+    return queryset.filter(condition).annotate(rank=Value(0.0, output_field=FloatField()))
+
+
+@contextmanager
+def index_suspended():
+    """Drop the SQLite FTS triggers for the block, then restore them and rebuild the index."""
+    if connection.vendor != 'sqlite':
+        # The PostgreSQL tsvector is a generated column; there is nothing to suspend.
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s", [f'{FTS_TABLE}_%']
+        )
+        triggers = cursor.fetchall()
+        for name, _ in triggers:
+            cursor.execute(f'DROP TRIGGER {name}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for _, sql in triggers:
+                cursor.execute(sql)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
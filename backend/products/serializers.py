@@ -1,15 +1,38 @@
 from rest_framework import serializers
 from .models import Product
 from django.contrib.auth.models import User
+from django.utils.datastructures import MultiValueDict
+from .listing import requested_fields
 
-class ProductSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """Drop the fields not named in the request's ``?fields=`` (all are kept without it)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or not request.query_params.get('fields'):
+            return
+        keep = set(requested_fields(request.query_params, available=list(self.fields)))
+        for name in list(self.fields):
+            if name not in keep:
+                self.fields.pop(name)
+
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     created_by_name = serializers.CharField(source='created_by.username', read_only=True)
     business_name = serializers.CharField(source='business.business.name', read_only=True)
     
     class Meta:
         model = Product
         fields = ['id', 'name', 'description', 'price', 'status', 'created_by', 'created_by_name', 'business', 'business_name', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_by', 'business', 'created_at', 'updated_at']
+        # Status only moves through products.workflow.
+        read_only_fields = ['id', 'status', 'created_by', 'business', 'created_at', 'updated_at']
+
+    def update(self, instance, validated_data):
+        from .workflow import save_edits
+        for name, value in validated_data.items():
+            setattr(instance, name, value)
+        save_edits(instance, list(validated_data))
+        return instance
 
 class ProductCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -22,4 +45,75 @@ class ProductCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError('User profile not found')
         validated_data['created_by'] = user
         validated_data['business'] = user.profile
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+class BulkReviewFilterSerializer(serializers.Serializer):
+    business = serializers.IntegerField(required=False)
+    created_by = serializers.IntegerField(required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+    LOOKUPS = {
+        'business': 'business_id',
+        'created_by': 'created_by_id',
+        'created_after': 'created_at__gte',
+        'created_before': 'created_at__lt',
+    }
+
+    def validate(self, data):
+        # An empty filter would match every pending product in the marketplace.
+        if not data:
+            raise serializers.ValidationError('Provide at least one filter')
+        return data
+
+class BulkReviewSerializer(serializers.Serializer):
+    MAX_IDS = 10000
+
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=MAX_IDS)
+    filter = BulkReviewFilterSerializer(required=False)
+
+    def validate(self, data):
+        if ('ids' in data) == ('filter' in data):
+            raise serializers.ValidationError('Provide either ids or filter')
+        return data
+
+    def filter_lookups(self):
+        lookups = BulkReviewFilterSerializer.LOOKUPS
+        return {lookups[name]: value for name, value in self.validated_data['filter'].items()}
+
+class CatalogueFilterSerializer(serializers.Serializer):
+    """
+    Query-string filters for the public catalogue and search.
+
+    ``company`` is a Business id; ``business``, as in product rows and the
+    bulk review filter, means the seller's UserProfile.
+    """
+    min_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    max_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    business = serializers.IntegerField(required=False)
+    company = serializers.IntegerField(required=False)
+    industry = serializers.CharField(max_length=100, required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+    LOOKUPS = {
+        'min_price': 'price__gte',
+        'max_price': 'price__lte',
+        'business': 'business_id',
+        'company': 'business__business_id',
+        'industry': 'business__business__industry',
+        'created_after': 'created_at__gte',
+        'created_before': 'created_at__lt',
+    }
+
+    def validate(self, data):
+        if 'min_price' in data and 'max_price' in data and data['min_price'] > data['max_price']:
+            raise serializers.ValidationError('min_price must not exceed max_price')
+        return data
+
+    def lookups(self):
+        return {self.LOOKUPS[name]: value for name, value in self.validated_data.items()}
+
+    def signature(self):
+        """The validated filters in canonical form, so equivalent query strings share a cache key."""
+        return MultiValueDict({name: [str(value)] for name, value in self.validated_data.items()})
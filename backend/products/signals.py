@@ -0,0 +1,38 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import catalogue, counters
+from .autocomplete import autocomplete
+from .models import Product
+
+
+@receiver(pre_save, sender=Product)
+def stamp_status_change(sender, instance, **kwargs):
+    if instance._saved_status is not None and instance._saved_status[0] != instance.status:
+        instance.status_changed_at = timezone.now()
+
+
+@receiver(post_save, sender=Product)
+def count_status_change(sender, instance, created, **kwargs):
+    previous = instance._saved_status
+    if created:
+        counters.apply_changes([counters.entered(instance)])
+    elif previous is not None and previous[0] != instance.status:
+        counters.apply_changes([
+            counters.left(instance.business_id, *previous),
+            counters.entered(instance),
+        ])
+    if catalogue.affects_catalogue(previous and previous[0], instance.status):
+        catalogue.bump([instance.pk])
+        autocomplete.apply([(instance.pk, instance.name if instance.status == 'approved' else None)])
+    instance._remember_status()
+
+
+@receiver(post_delete, sender=Product)
+def count_deletion(sender, instance, **kwargs):
+    status, changed_at = instance._saved_status or (instance.status, instance.status_changed_at)
+    counters.apply_changes([counters.left(instance.business_id, status, changed_at)])
+    if status == 'approved':
+        catalogue.bump([instance.pk])
+        autocomplete.apply([(instance.pk, None)])
@@ -0,0 +1,293 @@
+"""
+Deterministic synthetic marketplace data.
+
+Shared by the generate_marketplace_data command and the benchmark seeding.
+Everything is drawn from one ``random.Random(seed)`` and dated relative to
+``now``, so a seed and an anchor reproduce the same rows.
+
+Businesses, users and profiles are small and go through ``bulk_create``
+with one pre-hashed password. Products are the table that reaches millions of
+rows. They are written as batched ``executemany`` INSERTs of precomputed
+tuples, because building a model instance per row costs several times more
+than the insert itself. While products load, the SQLite FTS triggers and
+the Meta indexes are dropped and each is rebuilt once at the end. Status
+counters are tallied as rows are generated, and the catalogue generation is
+bumped at the end.
+"""
+import random
+from collections import Counter
+from contextlib import contextmanager
+from bisect import bisect
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.duration import duration_microseconds
+
+from authentication.models import Business, UserProfile
+from . import catalogue, counters, search
+from .models import Product, ProductStatusCounter
+
+STATUS_WEIGHTS = [
+    ('approved', 70),
+    ('draft', 15),
+    ('pending_approval', 10),
+    ('rejected', 5),
+]
+
+# The first user of every business is its admin; the rest draw from these.
+ROLE_WEIGHTS = [
+    ('editor', 50),
+    ('approver', 20),
+    ('viewer', 30),
+]
+
+INDUSTRIES = ['Technology', 'Retail', 'Manufacturing', 'Healthcare', 'Food & Beverage', 'Fashion', 'Home & Garden']
+COMPANY_SIZES = ['1-10', '10-50', '50-200', '200-1000', '1000+']
+
+# Names and descriptions draw from these so search and autocomplete
+# benchmarks see realistic term frequencies.
+ADJECTIVES = [
+    'classic', 'compact', 'deluxe', 'ergonomic', 'foldable', 'handmade', 'heavy', 'light',
+    'modern', 'portable', 'premium', 'rustic', 'sleek', 'smart', 'vintage', 'wireless',
+]
+MATERIALS = [
+    'aluminium', 'bamboo', 'brass', 'ceramic', 'cotton', 'glass', 'leather', 'linen',
+    'marble', 'oak', 'pine', 'plastic', 'rubber', 'steel', 'walnut', 'wool',
+]
+NOUNS = [
+    'backpack', 'bench', 'blender', 'bottle', 'cabinet', 'chair', 'clock', 'desk',
+    'headphones', 'jacket', 'kettle', 'lamp', 'mirror', 'mug', 'rug', 'shelf',
+    'sneakers', 'speaker', 'stool', 'table', 'teapot', 'toaster', 'vase', 'watch',
+]
+
+# (name, description) for every word combination, so a row draws once.
+PRODUCT_WORDS = [
+    (f'{adjective.title()} {material} {noun}', f'A {adjective} {noun} made of {material}.')
+    for adjective in ADJECTIVES for material in MATERIALS for noun in NOUNS
+]
+
+PASSWORD = 'password123'
+HISTORY = timedelta(days=365)
+BATCH_SIZE = 10000
+
+STATUSES = [status for status, _ in STATUS_WEIGHTS]
+STATUS_CUM_WEIGHTS = list(accumulate(weight for _, weight in STATUS_WEIGHTS))
+
+PRODUCT_COLUMNS = [
+    'name', 'description', 'price', 'status', 'created_by_id', 'business_id', 'created_at', 'updated_at',
+    'status_changed_at', 'submitted_at', 'reviewed_at', 'reviewed_by_id', 'review_time',
+]
+COUNTER_COLUMNS = ['business_id', 'status', 'day', 'count']
+
+
+class Generator:
+    """Draws every value from one seeded RNG; use one instance per dataset."""
+
+    def __init__(self, seed=0, now=None, batch_size=BATCH_SIZE, stdout=None):
+        self.rng = random.Random(seed)
+        now = now or timezone.now()
+        self.now = timezone.make_aware(now) if timezone.is_naive(now) else now
+        self.batch_size = batch_size
+        self.stdout = stdout
+        self.password = make_password(PASSWORD)
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def businesses(self, count, prefix=''):
+        rng = self.rng
+        created = Business.objects.bulk_create([
+            Business(
+                name=f'{prefix}{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS).title()} Co {i}',
+                industry=rng.choice(INDUSTRIES),
+                company_size=rng.choice(COMPANY_SIZES),
+            )
+            for i in range(count)
+        ], batch_size=self.batch_size)
+        # Backends that can't return ids from bulk inserts leave pk unset.
+        if created and created[0].pk is None:
+            created = list(Business.objects.order_by('-id')[:count])[::-1]
+        return created
+
+    def users(self, businesses, per_business, prefix='user', domain='example.test', role=None):
+        """
+        ``per_business`` users in each business, ``username == email``, all
+        with the password PASSWORD. ``role`` fixes every role; otherwise the
+        first user of a business is its admin and the rest follow ROLE_WEIGHTS.
+        No existing username may start with ``prefix`` and end with ``@domain``.
+        """
+        names = [name for name, _ in ROLE_WEIGHTS]
+        weights = [weight for _, weight in ROLE_WEIGHTS]
+        users, assigned = [], []
+        for business in businesses:
+            for index in range(per_business):
+                email = f'{prefix}{len(users)}@{domain}'
+                users.append(User(username=email, email=email, password=self.password,
+                                  first_name=prefix.title(), last_name=str(len(users))))
+                if role is not None:
+                    assigned.append((business, role))
+                else:
+                    assigned.append((business, 'admin' if index == 0 else self.rng.choices(names, weights)[0]))
+        users = User.objects.bulk_create(users, batch_size=self.batch_size)
+        if users and users[0].pk is None:
+            # Backends that can't return ids from bulk inserts. Matched by
+            # pattern: an IN list of every username can exceed the parameter limit.
+            ids = dict(generated_users(prefix, domain).values_list('username', 'id'))
+            for user in users:
+                user.pk = ids[user.username]
+        profiles = UserProfile.objects.bulk_create([
+            UserProfile(user=user, business=business, role=user_role)
+            for user, (business, user_role) in zip(users, assigned)
+        ], batch_size=self.batch_size)
+        if profiles and profiles[0].pk is None:
+            profiles = list(
+                UserProfile.objects.filter(user__in=generated_users(prefix, domain)).select_related('user').order_by('id')
+            )
+        return profiles
+
+    def products(self, profiles, count):
+        """Insert ``count`` products, created by ``profiles`` in turn."""
+        if not count:
+            return 0
+        approvers = {}
+        for profile in profiles:
+            if profile.role in ('approver', 'admin'):
+                approvers.setdefault(profile.business_id, []).append(profile.user_id)
+
+        self.clock = StorageClock(self.now)
+        self.counts = Counter()
+        inserted = 0
+        with search.index_suspended(), indexes_dropped(Product):
+            while inserted < count:
+                rows = [
+                    self.product_row(i, profiles[i % len(profiles)], approvers)
+                    for i in range(inserted, min(count, inserted + self.batch_size))
+                ]
+                insert_rows(Product, PRODUCT_COLUMNS, rows)
+                inserted += len(rows)
+                self.log(f'  inserted {inserted}/{count} products')
+        self.add_counts(self.counts)
+        catalogue.bump(everything=True)
+        return inserted
+
+    def product_row(self, i, profile, approvers):
+        rng, clock = self.rng, self.clock
+        # Skewed towards recent dates, like a growing catalogue.
+        created = clock.now - HISTORY * (rng.random() ** 2)
+        updated = created + (clock.now - created) * rng.random()
+        status = STATUSES[bisect(STATUS_CUM_WEIGHTS, rng.random() * STATUS_CUM_WEIGHTS[-1])]
+        self.counts[(profile.id, status, clock.local_date(updated))] += 1
+        changed_at = clock.datetime(updated)
+        submitted = reviewed = reviewer = review_time = None
+        if status == 'pending_approval':
+            submitted = changed_at
+        elif status in ('approved', 'rejected'):
+            submitted_at = created + (updated - created) * rng.random()
+            submitted, reviewed = clock.datetime(submitted_at), changed_at
+            review_time = clock.duration(updated - submitted_at)
+            candidates = approvers.get(profile.business_id)
+            reviewer = rng.choice(candidates) if candidates else None
+        name, description = rng.choice(PRODUCT_WORDS)
+        return (
+            f'{name} {i}',
+            description,
+            Decimal(rng.randrange(100, 100000)) / 100,
+            status,
+            profile.user_id,
+            profile.id,
+            clock.datetime(created),
+            changed_at,
+            changed_at,
+            submitted,
+            reviewed,
+            reviewer,
+            review_time,
+        )
+
+    def add_counts(self, counts):
+        """
+        Fold per-(business, status, day) product counts into ProductStatusCounter.
+
+        Same result as counters.rebuild(), without re-reading the product table:
+        at a million products the counter table is nearly as large, so it is
+        rewritten the same way the products were inserted.
+        """
+        merged = counters.stored_counts(ProductStatusCounter)
+        for (business_id, status, day), count in counts.items():
+            merged[(business_id, status, day)] += count
+            merged[(None, status, day)] += count
+        adapt_date = connection.ops.adapt_datefield_value
+        rows = [(business_id, status, adapt_date(day), count) for (business_id, status, day), count in merged.items()]
+        with transaction.atomic():
+            ProductStatusCounter.objects.all().delete()
+            for start in range(0, len(rows), self.batch_size):
+                insert_rows(ProductStatusCounter, COUNTER_COLUMNS, rows[start:start + self.batch_size])
+
+
+@contextmanager
+def indexes_dropped(model):
+    """
+    Drop ``model``'s Meta indexes for the block and build each once afterwards.
+
+    The editor only renders SQL: entering it is refused on SQLite inside an
+    atomic block, and the load may run in one.
+    """
+    editor = connection.schema_editor()
+    table = editor.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        for index in model._meta.indexes:
+            cursor.execute(editor.sql_delete_index % {'name': editor.quote_name(index.name), 'table': table})
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for index in model._meta.indexes:
+                cursor.execute(str(index.create_sql(model, editor)))
+
+
+def insert_rows(model, columns, rows):
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table), ', '.join(map(quote, columns)), ', '.join(['%s'] * len(columns))
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def generated_users(prefix, domain):
+    return User.objects.filter(username__startswith=prefix, username__endswith=f'@{domain}')
+
+
+class StorageClock:
+    """
+    ``now`` in the form the database stores datetimes, plus matching adapters.
+
+    Adapting through connection.ops costs more than the rest of a product row
+    put together, so the conversion is decided once here. SQLite and MySQL
+    store naive datetimes in the connection's time zone: for them rows are
+    generated naive in that zone and only need ``str()``.
+    """
+
+    def __init__(self, now):
+        zone = timezone.get_current_timezone()
+        if isinstance(connection.ops.adapt_datetimefield_value(now), str):
+            self.now = timezone.make_naive(now, connection.timezone)
+            self.datetime = str
+            if connection.timezone_name == timezone.get_current_timezone_name():
+                self.local_date = datetime.date
+            else:
+                self.local_date = lambda value: timezone.make_aware(value, connection.timezone).astimezone(zone).date()
+        else:
+            self.now = now
+            self.datetime = lambda value: value
+            self.local_date = lambda value: value.astimezone(zone).date()
+        if connection.features.has_native_duration_field:
+            self.duration = lambda value: value
+        else:
+            self.duration = duration_microseconds
@@ -1,3 +1,1051 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, TransactionTestCase
+from django.utils.dateparse import parse_datetime
+from rest_framework.test import APIClient
+
+from authentication import activity
+from authentication.models import Business, UserProfile
+from . import catalogue, counters, workflow
+from .autocomplete import PrefixIndex, autocomplete
+from .models import Product, ProductStatusCounter
+
+
+class ProductTestCase(TestCase):
+    """Shared fixtures: one business with a user per role."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.business = Business.objects.create(
+            name='Acme', industry='Technology', company_size='10-50'
+        )
+        cls.users = {}
+        for role in ['admin', 'editor', 'approver', 'viewer']:
+            user = User.objects.create_user(
+                username=role, email=f'{role}@acme.test', password='password123'
+            )
+            UserProfile.objects.create(user=user, business=cls.business, role=role)
+            cls.users[role] = user
+        cls.editor_profile = cls.users['editor'].profile
+
+    def setUp(self):
+        # Generations restart with every test's database rollback.
+        catalogue.get_cache().clear()
+        autocomplete.reset()
+        # Buffered activity events belong to this test's database, which is rolled back.
+        activity.buffer.clear()
+        self.addCleanup(activity.buffer.clear)
+
+    def client_for(self, role):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username=role))
+        return client
+
+    def create_products(self, count, status='approved', **kwargs):
+        return [
+            Product.objects.create(
+                name=f'Product {i}',
+                description='Description',
+                price='9.99',
+                status=status,
+                created_by=self.users['editor'],
+                business=self.editor_profile,
+                **kwargs
+            )
+            for i in range(count)
+        ]
+
+    def assert_counters_match(self):
+        from django.core.management import call_command
+
+        call_command('rebuild_product_counters', verify=True, stdout=StringIO())
+
+
+class KeysetPaginationTests(ProductTestCase):
+
+    def test_unpaginated_by_default(self):
+        self.create_products(3)
+        response = self.client_for('viewer').get('/api/products/public/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+
+    def test_walks_every_row_once_in_ordering(self):
+        products = self.create_products(7)
+        expected = [p.id for p in sorted(products, key=lambda p: (p.created_at, p.id), reverse=True)]
+
+        client = self.client_for('viewer')
+        url = '/api/products/public/?page_size=3'
+        seen = []
+        while url:
+            page = client.get(url).json()
+            seen.extend(row['id'] for row in page['results'])
+            url = page['next']
+        self.assertEqual(seen, expected)
+
+    def test_previous_cursor_returns_prior_page(self):
+        self.create_products(5)
+        client = self.client_for('viewer')
+        first = client.get('/api/products/public/?page_size=2').json()
+        self.assertIsNone(first['previous'])
+        second = client.get(first['next']).json()
+        back = client.get(second['previous']).json()
+        self.assertEqual(
+            [row['id'] for row in back['results']],
+            [row['id'] for row in first['results']],
+        )
+
+    def test_page_size_is_capped(self):
+        self.create_products(2)
+        response = self.client_for('viewer').get('/api/products/public/?page_size=100000')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_invalid_cursor(self):
+        import base64
+
+        response = self.client_for('viewer').get('/api/products/public/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+        self.create_products(1)
+        for payload in [
+            '{"p":[[1],1]}', '{"p":[null,null]}', '{"p":[true,1]}', '["p"]',
+            '{"p":["2026-01-01T00:00:00",1e300]}', '{"p":["2026-01-01T00:00:00",Infinity]}',
+            '{"p":["2026-01-01T00:00:00",99999999999999999999]}', '{"p":["not a date",1]}',
+        ]:
+            cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+            for url in ['/api/products/public/', '/api/products/async/public/']:
+                response = self.client_for('viewer').get(f'{url}?cursor={cursor}')
+                self.assertEqual(response.status_code, 404, (url, payload))
+
+    def test_generic_list_view_paginates(self):
+        self.create_products(3, status='draft')
+        page = self.client_for('editor').get('/api/products/?page_size=2').json()
+        self.assertEqual(len(page['results']), 2)
+        self.assertIsNotNone(page['next'])
+
+
+class ListQueryCountTests(ProductTestCase):
+    """List endpoints must not issue per-row queries."""
+
+    endpoints = [
+        ('viewer', '/api/products/public/', 'approved'),
+        ('viewer', '/api/products/public/?page_size=50', 'approved'),
+        ('approver', '/api/products/pending/', 'pending_approval'),
+        ('approver', '/api/products/rejected/', 'rejected'),
+        ('editor', '/api/products/', 'draft'),
+        ('admin', '/api/auth/admin/products/', 'draft'),
+        ('admin', '/api/auth/admin/users/', 'draft'),
+    ]
+
+    def count_queries(self, client, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_query_count_is_independent_of_row_count(self):
+        for role, url, status in self.endpoints:
+            with self.subTest(url=url):
+                client = self.client_for(role)
+                self.create_products(1, status=status)
+                baseline = self.count_queries(client, url)
+                self.create_products(10, status=status)
+                other = Business.objects.create(name='Other', industry='Retail', company_size='1-10')
+                user = User.objects.create_user(username=f'extra-{status}-{url}', password='x')
+                UserProfile.objects.create(user=user, business=other, role='editor')
+                client = self.client_for(role)
+                with self.assertNumQueries(baseline):
+                    client.get(url)
+
+
+
+class CompactListTests(ProductTestCase):
+
+    def test_rows_match_product_serializer(self):
+        from .serializers import ProductSerializer
+
+        self.create_products(3, status='pending_approval')
+        rows = self.client_for('approver').get('/api/products/pending/').json()
+        expected = ProductSerializer(Product.objects.for_listing().filter(status='pending_approval'), many=True).data
+        self.assertEqual(rows, [dict(row) for row in expected])
+
+    def test_sparse_fieldsets(self):
+        self.create_products(3)
+        client = APIClient()
+        rows = client.get('/api/products/public/?fields=name,price,status').json()
+        self.assertEqual([sorted(row) for row in rows], [['name', 'price', 'status']] * 3)
+
+        # Cursors still work when the ordering columns aren't among the fields.
+        page = client.get('/api/products/public/?fields=name&page_size=2').json()
+        seen = [row['name'] for row in page['results']]
+        page = client.get(page['next']).json()
+        seen.extend(row['name'] for row in page['results'])
+        self.assertEqual(len(set(seen)), 3)
+
+        response = client.get('/api/products/public/?fields=name,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', str(response.json()['fields']))
+
+    def test_fast_renderer_falls_back_to_stdlib_json(self):
+        from unittest import mock
+        from marketplace import renderers
+
+        self.create_products(3, status='pending_approval')
+        client = self.client_for('approver')
+        fast = client.get('/api/products/pending/')
+        with mock.patch.object(renderers, 'orjson', None):
+            fallback = client.get('/api/products/pending/')
+        self.assertEqual(fast.json(), fallback.json())
+        self.assertIsInstance(fast.json()[0]['price'], str)
+        self.assertTrue(fast.json()[0]['created_at'].endswith('Z'))
+        admin_rows = self.client_for('admin').get('/api/auth/admin/products/').json()
+        self.assertEqual(admin_rows, fast.json())
+
+    def test_sparse_fieldsets_on_model_serializer_views(self):
+        product = self.create_products(1, status='draft')[0]
+        client = self.client_for('editor')
+        self.assertEqual(client.get('/api/products/?fields=id,name').json(), [{'id': product.id, 'name': product.name}])
+        detail = client.get(f'/api/products/{product.id}/?fields=status').json()
+        self.assertEqual(detail, {'status': 'draft'})
+
+class DashboardStatsTests(ProductTestCase):
+
+    def product_queries(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        client = self.client_for('approver')
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        queries = [q['sql'] for q in context if 'products_product' in q['sql']]
+        return response.json(), queries
+
+    def test_approval_stats_uses_one_scan(self):
+        self.create_products(2, status='approved')
+        self.create_products(1, status='rejected')
+        self.create_products(3, status='pending_approval')
+        data, queries = self.product_queries('/api/products/stats/')
+        # Counter totals plus the review-time aggregate (no reviews, so no percentiles).
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(data['pending_reviews'], 3)
+        self.assertEqual(data['approved_today'], 2)
+        self.assertEqual(data['total_reviewed'], 3)
+
+    def test_review_time_percentiles(self):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        products = self.create_products(20, status='pending_approval')
+        now = timezone.now()
+        for hours, product in enumerate(products, start=1):
+            Product.objects.filter(pk=product.pk).update(submitted_at=now - timedelta(hours=hours))
+        client = self.client_for('approver')
+        for product in products:
+            self.assertEqual(client.patch(f'/api/products/{product.id}/approve/').status_code, 200)
+
+        data, queries = self.product_queries('/api/products/stats/')
+        self.assertEqual(len(queries), 4)
+        self.assertEqual(data['review_time_sample'], 20)
+        self.assertEqual((data['avg_review_time'], data['p50_review_time'], data['p95_review_time']), ('10.5h', '10.0h', '19.0h'))
+        reviewed = Product.objects.get(pk=products[0].pk)
+        self.assertEqual(reviewed.reviewed_by, self.users['approver'])
+        self.assertEqual(reviewed.reviewed_at, reviewed.status_changed_at)
+
+    def test_analytics_counts(self):
+        self.create_products(3, status='approved')
+        self.create_products(1, status='rejected')
+        self.create_products(2, status='draft')
+        data, queries = self.product_queries('/api/products/analytics/')
+        # One conditional aggregate plus the grouped top-editors query.
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(data['overview'], {
+            'total_products': 6,
+            'approved_count': 3,
+            'rejected_count': 1,
+            'pending_count': 0,
+            'approval_rate': 75.0,
+            'reviewed_total': 4,
+        })
+        self.assertEqual(data['trends'], {'weekly_approved': 3, 'weekly_rejected': 1, 'weekly_total': 4})
+        self.assertEqual(data['top_editors'][0]['approved'], 3)
+
+
+class StatusCounterTests(ProductTestCase):
+
+    def test_counters_follow_the_product_lifecycle(self):
+        product = self.create_products(1, status='draft')[0]
+        self.assert_counters_match()
+
+        self.client_for('editor').patch(f'/api/products/{product.id}/submit/')
+        self.client_for('approver').patch(f'/api/products/{product.id}/approve/')
+        self.assert_counters_match()
+        counts = ProductStatusCounter.objects.dashboard_counts()
+        self.assertEqual((counts['approved'], counts['approved_today'], counts['pending']), (1, 1, 0))
+
+        response = self.client_for('admin').patch(
+            f'/api/auth/admin/products/{product.id}/update/', {'status': 'draft'}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assert_counters_match()
+        self.client_for('admin').delete(f'/api/auth/admin/products/{product.id}/delete/')
+        self.assert_counters_match()
+        self.assertEqual(ProductStatusCounter.objects.dashboard_counts()['total'], 0)
+
+    def test_cascade_delete_keeps_totals_consistent(self):
+        self.create_products(3, status='approved')
+        self.users['editor'].delete()
+        self.assert_counters_match()
+
+    def test_verify_reports_drift(self):
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        self.create_products(2)
+        ProductStatusCounter.objects.update(count=7)
+        with self.assertRaises(CommandError):
+            self.assert_counters_match()
+        call_command('rebuild_product_counters', stdout=StringIO())
+        self.assert_counters_match()
+
+    def test_stats_endpoints_do_not_scan_products(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.create_products(3)
+        for role, url in [
+            ('approver', '/api/products/stats/'),
+            ('approver', '/api/products/analytics/'),
+            ('admin', '/api/auth/admin/stats/'),
+        ]:
+            client = self.client_for(role)
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(client.get(url).status_code, 200)
+            # Review latency reads only reviewed rows in the stats window (partial index).
+            scans = [
+                q for q in context
+                if 'FROM "products_product"' in q['sql'] and '"review_time" IS NOT NULL' not in q['sql']
+            ]
+            self.assertFalse(scans, url)
+
+
+class PublicCatalogueCacheTests(ProductTestCase):
+    url = '/api/products/public/'
+
+    def test_anonymous_access(self):
+        self.create_products(1)
+        self.assertEqual(APIClient().get(self.url).status_code, 200)
+
+    def test_repeat_requests_are_served_from_cache(self):
+        self.create_products(2)
+        client = APIClient()
+        first = client.get(self.url)
+        with self.assertNumQueries(1):  # the generation lookup
+            second = client.get(self.url)
+        self.assertEqual(first.json(), second.json())
+
+    def test_conditional_get(self):
+        self.create_products(1)
+        client = APIClient()
+        response = client.get(self.url)
+        self.assertIn('Last-Modified', response)
+        not_modified = client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_approval_invalidates(self):
+        product = self.create_products(1, status='pending_approval')[0]
+        client = APIClient()
+        before = client.get(self.url)
+        self.assertEqual(before.json(), [])
+        self.client_for('approver').patch(f'/api/products/{product.id}/approve/')
+        after = client.get(self.url, HTTP_IF_NONE_MATCH=before['ETag'])
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual([row['id'] for row in after.json()], [product.id])
+
+    def test_only_catalogue_changes_bump_the_generation(self):
+        generation = catalogue.current()[0]
+        draft = self.create_products(1, status='draft')[0]
+        draft.name = 'Renamed draft'
+        draft.save()
+        self.assertEqual(catalogue.current()[0], generation)
+
+        approved = self.create_products(1)[0]
+        self.assertEqual(catalogue.current()[0], generation + 1)
+        approved.price = '1.00'
+        approved.save()
+        self.assertEqual(catalogue.current()[0], generation + 2)
+        approved.delete()
+        self.assertEqual(catalogue.current()[0], generation + 3)
+
+
+
+class CatalogueFilterTests(ProductTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = Business.objects.create(name='Bolt', industry='Retail', company_size='1-10')
+        user = User.objects.create_user(username='other', email='other@bolt.test', password='password123')
+        cls.other_profile = UserProfile.objects.create(user=user, business=cls.other, role='editor')
+
+    def add(self, price, profile=None):
+        profile = profile or self.editor_profile
+        return Product.objects.create(
+            name='Product', description='Description', price=price, status='approved',
+            created_by=profile.user, business=profile
+        )
+
+    def get(self, path, query=''):
+        response = APIClient().get(f'/api/products/{path}?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_filters_public_products(self):
+        cheap = self.add('10.00')
+        retail = self.add('60.00', self.other_profile)
+        self.add('300.00')
+        ids = lambda query: [row['id'] for row in self.get('public/', query)]
+        self.assertEqual(ids('max_price=50'), [cheap.id])
+        self.assertEqual(ids('industry=Retail'), [retail.id])
+        self.assertEqual(ids(f'company={self.other.id}&min_price=100'), [])
+        self.assertEqual(ids(f'company={self.other.id}'), [retail.id])
+        # business means the seller's profile, as in the rows themselves.
+        self.assertEqual(ids(f'business={retail.business_id}'), [retail.id])
+        self.assertEqual(self.get('public/', f'business={retail.business_id}')[0]['business'], retail.business_id)
+        Product.objects.filter(pk=cheap.pk).update(created_at='2020-01-01T00:00:00Z')
+        catalogue.bump()
+        self.assertEqual(ids('created_before=2021-01-01'), [cheap.id])
+        self.assertEqual(len(ids('created_after=2021-01-01')), 2)
+        response = APIClient().get('/api/products/public/?min_price=50&max_price=10')
+        self.assertEqual(response.status_code, 400)
+
+    def test_facet_counts(self):
+        self.add('10.00')
+        self.add('30.00')
+        self.add('60.00', self.other_profile)
+        self.add('2000.00', self.other_profile)
+        Product.objects.create(
+            name='Draft', description='Description', price='5.00', status='draft',
+            created_by=self.users['editor'], business=self.editor_profile
+        )
+        facets = self.get('public/facets/')
+        self.assertEqual(facets['total'], 4)
+        self.assertEqual(facets['price'], {'min': '10.00', 'max': '2000.00'})
+        self.assertEqual(
+            [(row['min'], row['max'], row['count']) for row in facets['price_ranges']],
+            [('0', '25', 1), ('25', '50', 1), ('50', '100', 1), ('1000', None, 1)],
+        )
+        self.assertEqual(
+            [(row['name'], row['count']) for row in facets['industries']],
+            [('Retail', 2), ('Technology', 2)],
+        )
+        filtered = self.get('public/facets/', 'industry=Retail')
+        self.assertEqual(filtered['companies'], [{'id': self.other.id, 'name': 'Bolt', 'count': 2}])
+
+    def test_facets_are_one_query_and_cached_per_filter_signature(self):
+        self.add('10.00')
+        with self.assertNumQueries(2):  # the generation lookup and the grouped aggregate
+            first = self.get('public/facets/', 'min_price=5')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get('public/facets/', 'min_price=5.00&page_size=3'), first)
+        self.add('20.00')
+        self.assertEqual(self.get('public/facets/', 'min_price=5')['total'], 2)
+
+class AsyncEndpointTests(ProductTestCase):
+
+    def headers(self, role):
+        from authentication.tokens import RoleRefreshToken
+
+        token = RoleRefreshToken.for_user(self.users[role]).access_token
+        return {'Authorization': f'Bearer {token}'}
+
+    async def test_async_endpoints_match_sync_ones(self):
+        from asgiref.sync import sync_to_async
+        from django.test import AsyncClient
+
+        await sync_to_async(self.create_products)(2, status='approved')
+        await sync_to_async(self.create_products)(3, status='pending_approval')
+        headers = await sync_to_async(self.headers)('approver')
+        client = AsyncClient()
+        sync_client = APIClient(headers=headers)
+        for name in ['public', 'public/?page_size=1', 'pending', 'stats', 'analytics']:
+            with self.subTest(endpoint=name):
+                path = name if '?' in name else f'{name}/'
+                response = await client.get(f'/api/products/async/{path}', headers=headers)
+                expected = await sync_to_async(sync_client.get)(f'/api/products/{path}')
+                self.assertEqual(response.status_code, 200)
+                data, expected = response.json(), expected.json()
+                if isinstance(data, dict) and data.get('next'):
+                    # Cursor links point back at the route that served them.
+                    data['next'] = data['next'].replace('/async', '')
+                self.assertEqual(data, expected)
+
+    async def test_async_role_checks(self):
+        from asgiref.sync import sync_to_async
+        from django.test import AsyncClient
+
+        response = await AsyncClient().get('/api/products/async/stats/')
+        self.assertEqual(response.status_code, 401)
+        headers = await sync_to_async(self.headers)('viewer')
+        response = await AsyncClient().get('/api/products/async/pending/', headers=headers)
+        self.assertEqual(response.status_code, 403)
+
+
+class ExportTests(ProductTestCase):
+
+    def export(self, export_format):
+        response = self.client_for('admin').get(f'/api/auth/admin/products/export/{export_format}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_jsonl_rows_match_serializer(self):
+        import json
+
+        self.create_products(3)
+        expected = self.client_for('admin').get('/api/auth/admin/products/').json()
+        rows = [json.loads(line) for line in self.export('jsonl').splitlines()]
+        self.assertEqual(rows, sorted(expected, key=lambda row: row['id']))
+
+    def test_csv_has_header_and_one_line_per_product(self):
+        import csv
+        import io
+
+        products = self.create_products(4)
+        rows = list(csv.DictReader(io.StringIO(self.export('csv'))))
+        self.assertEqual([int(row['id']) for row in rows], [p.id for p in products])
+        self.assertEqual(rows[0]['business_name'], 'Acme')
+
+    def test_export_is_admin_only_and_format_checked(self):
+        url = '/api/auth/admin/products/export/'
+        self.assertEqual(self.client_for('editor').get(f'{url}csv/').status_code, 403)
+        self.assertEqual(self.client_for('admin').get(f'{url}xml/').status_code, 400)
+
+
+class ImportTests(ProductTestCase):
+
+    def upload(self, import_format, content, role='editor', **data):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        if isinstance(content, str):
+            content = content.encode()
+        upload = SimpleUploadedFile(f'products.{import_format}', content)
+        return self.client_for(role).post(
+            f'/api/products/import/{import_format}/', {'file': upload, **data}, format='multipart'
+        )
+
+    def test_csv_import_reports_bad_rows_and_keeps_good_ones(self):
+        content = 'name,description,price\nLamp,Desk lamp,12.50\n,Missing name,1\nChair,Oak,abc\nDesk,Pine,99\n'
+        response = self.upload('csv', content, batch_size=1)
+        self.assertEqual(response.status_code, 201)
+        report = response.json()
+        self.assertEqual((report['imported'], report['failed']), (2, 2))
+        self.assertEqual([error['line'] for error in report['errors']], [3, 4])
+        self.assertIn('name', report['errors'][0]['errors'])
+        self.assertEqual(
+            sorted(Product.objects.filter(business=self.editor_profile).values_list('name', flat=True)),
+            ['Desk', 'Lamp']
+        )
+
+    def test_jsonl_import_updates_counters(self):
+        lines = [f'{{"name": "Item {i}", "description": "d", "price": "{i}.00"}}' for i in range(5)]
+        response = self.upload('jsonl', '\n'.join(lines + ['not json']), batch_size=2)
+        self.assertEqual(response.json()['imported'], 5)
+        self.assertEqual(response.json()['errors'][0]['line'], 6)
+        self.assertEqual(Product.objects.filter(status='draft').count(), 5)
+        self.assert_counters_match()
+
+    def test_undecodable_lines_fail_alone(self):
+        content = b'\xef\xbb\xbfname,description,price\nLamp,Desk lamp,1\nBad,Caf\xe9,2\n"Multi\nline",d,3\nDesk,Pine,4\n'
+        report = self.upload('csv', content).json()
+        self.assertEqual((report['imported'], report['failed']), (3, 1))
+        self.assertEqual(report['errors'], [{'line': 3, 'errors': {'non_field_errors': ['Line is not valid UTF-8']}}])
+        self.assertTrue(Product.objects.filter(name='Multi\nline').exists())
+
+        lines = [b'{"name": "A", "description": "d", "price": "1"}', b'{"name": "B\xff", "description": "d", "price": "1"}',
+                 b'{"name": "C", "description": "d", "price": "1"}']
+        report = self.upload('jsonl', b'\n'.join(lines)).json()
+        self.assertEqual((report['imported'], report['errors'][0]['line']), (2, 2))
+
+    def test_import_requires_editor(self):
+        response = self.upload('csv', 'name,description,price\nLamp,Desk lamp,1\n', role='viewer')
+        self.assertEqual(response.status_code, 403)
+
+
+class BulkReviewTests(ProductTestCase):
+
+    def test_approves_pending_ids_and_skips_the_rest(self):
+        pending = self.create_products(3, status='pending_approval')
+        draft = self.create_products(1, status='draft')[0]
+        ids = [p.id for p in pending] + [draft.id, 999999]
+        response = self.client_for('approver').post('/api/products/bulk/approve/', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'succeeded': ids[:3], 'skipped': ids[3:]})
+        self.assertEqual(Product.objects.filter(status='approved').count(), 3)
+        self.assert_counters_match()
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        client = self.client_for('approver')
+        counts = []
+        # The first batch also creates today's counter rows.
+        for size in [1, 2, 20]:
+            ids = [p.id for p in self.create_products(size, status='pending_approval')]
+            with CaptureQueriesContext(connection) as context:
+                client.post('/api/products/bulk/approve/', {'ids': ids}, format='json')
+            counts.append(len(context))
+        self.assertEqual(counts[1], counts[2])
+
+    def test_rejects_by_filter(self):
+        self.create_products(2, status='pending_approval')
+        other = self.create_products(1, status='pending_approval')[0]
+        other_user = User.objects.create_user(username='other')
+        Product.objects.filter(id=other.id).update(created_by=other_user)
+        response = self.client_for('admin').post(
+            '/api/products/bulk/reject/', {'filter': {'created_by': self.users['editor'].id}}, format='json'
+        )
+        self.assertEqual(len(response.json()['succeeded']), 2)
+        self.assertEqual(Product.objects.get(id=other.id).status, 'pending_approval')
+        self.assert_counters_match()
+
+    def test_requires_ids_or_filter_and_approver(self):
+        client = self.client_for('approver')
+        self.assertEqual(client.post('/api/products/bulk/approve/', {}, format='json').status_code, 400)
+        self.create_products(2, status='pending_approval')
+        response = client.post('/api/products/bulk/approve/', {'filter': {}}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Product.objects.filter(status='pending_approval').count(), 2)
+        response = self.client_for('editor').post('/api/products/bulk/approve/', {'ids': [1]}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class TransitionTests(ProductTestCase):
+
+    def test_transitions_follow_the_table(self):
+        product = self.create_products(1, status='draft')[0]
+        editor, approver = self.client_for('editor'), self.client_for('approver')
+        self.assertEqual(approver.patch(f'/api/products/{product.id}/approve/').status_code, 400)
+        self.assertEqual(editor.patch(f'/api/products/{product.id}/submit/').json()['status'], 'pending_approval')
+        self.assertEqual(approver.patch(f'/api/products/{product.id}/reject/').json()['status'], 'rejected')
+        self.assertEqual(approver.patch(f'/api/products/{product.id}/approve/').status_code, 400)
+        self.assert_counters_match()
+
+    def test_transition_writes_only_status_columns(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        product = self.create_products(1, status='pending_approval')[0]
+        with CaptureQueriesContext(connection) as context:
+            self.assertTrue(workflow.transition(product, 'approve'))
+        update = next(q['sql'] for q in context if q['sql'].startswith('UPDATE "products_product"'))
+        self.assertNotIn('"name"', update)
+        self.assertIn('"status" = \'pending_approval\'', update)
+
+    def test_stale_copy_loses(self):
+        product = self.create_products(1, status='pending_approval')[0]
+        stale = Product.objects.get(pk=product.pk)
+        self.assertTrue(workflow.transition(product, 'approve'))
+        self.assertFalse(workflow.transition(stale, 'reject'))
+        self.assertEqual(Product.objects.get(pk=product.pk).status, 'approved')
+
+    def test_stale_edit_keeps_the_approval(self):
+        product = self.create_products(1, status='pending_approval')[0]
+        stale = Product.objects.get(pk=product.pk)
+        generation = catalogue.current()[0]
+        self.assertTrue(workflow.transition(product, 'approve'))
+        stale.name = 'Renamed'
+        workflow.save_edits(stale, ['name'])
+        product.refresh_from_db()
+        self.assertEqual((product.name, product.status), ('Renamed', 'approved'))
+        self.assertEqual(catalogue.current()[0], generation + 2)
+        self.assertEqual(autocomplete.complete('renamed'), [(product.id, 'Renamed')])
+        self.assert_counters_match()
+
+    def test_edits_cannot_write_status(self):
+        product = self.create_products(1, status='draft')[0]
+        response = self.client_for('editor').patch(
+            f'/api/products/{product.id}/', {'name': 'Renamed', 'status': 'approved'}, format='json'
+        )
+        self.assertEqual(response.json()['status'], 'draft')
+        product.refresh_from_db()
+        self.assertEqual((product.name, product.status), ('Renamed', 'draft'))
+
+    def test_admin_status_changes_follow_the_table(self):
+        product = self.create_products(1, status='pending_approval')[0]
+        admin = self.client_for('admin')
+        url = f'/api/auth/admin/products/{product.id}/update/'
+        self.assertEqual(admin.patch(url, {'status': 'draft'}, format='json').status_code, 400)
+        response = admin.patch(url, {'name': 'Renamed', 'status': 'approved'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        product.refresh_from_db()
+        self.assertEqual((product.name, product.status), ('Renamed', 'approved'))
+        self.assertEqual(product.reviewed_by, self.users['admin'])
+        self.assert_counters_match()
+
+
+class TransitionRaceTests(TransactionTestCase):
+    THREADS = 16
+
+    def test_exactly_one_concurrent_transition_wins(self):
+        import threading
+        import time
+        from django.db import OperationalError, connection
+
+        business = Business.objects.create(name='Acme', industry='Technology', company_size='10-50')
+        user = User.objects.create_user(username='editor')
+        profile = UserProfile.objects.create(user=user, business=business, role='editor')
+        product = Product.objects.create(
+            name='Lamp', description='Desk lamp', price='9.99', status='pending_approval',
+            created_by=user, business=profile
+        )
+
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+
+        def review(action):
+            stale = Product.objects.get(pk=product.pk)
+            barrier.wait()
+            try:
+                for _ in range(100):
+                    try:
+                        results.append(workflow.transition(stale, action))
+                        return
+                    except OperationalError:
+                        # SQLite's shared in-memory test database locks whole tables.
+                        time.sleep(0.01)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=review, args=(['approve', 'reject'][i % 2],))
+            for i in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), self.THREADS)
+        self.assertEqual(results.count(True), 1)
+        self.assertIn(Product.objects.get(pk=product.pk).status, ['approved', 'rejected'])
+        self.assertEqual(
+            counters.stored_counts(ProductStatusCounter), counters.expected_counts(Product)
+        )
+
+    def test_rebuild_reads_products_under_the_counter_lock(self):
+        import threading
+        from unittest import mock
+        from django.db import OperationalError, connection
+
+        business = Business.objects.create(name='Acme', industry='Technology', company_size='10-50')
+        user = User.objects.create_user(username='editor')
+        profile = UserProfile.objects.create(user=user, business=business, role='editor')
+        product = Product.objects.create(
+            name='Lamp', description='Desk lamp', price='9.99', status='pending_approval',
+            created_by=user, business=profile
+        )
+        outcomes = []
+
+        def approve():
+            try:
+                outcomes.append(workflow.transition(Product.objects.get(pk=product.pk), 'approve'))
+            except OperationalError:
+                outcomes.append('blocked')
+            finally:
+                connection.close()
+
+        def read_while_approving(product_model):
+            # A status change attempted between the rebuild's read and its write.
+            thread = threading.Thread(target=approve)
+            thread.start()
+            thread.join()
+            return expected_counts(product_model)
+
+        expected_counts = counters.expected_counts
+        with mock.patch.object(counters, 'expected_counts', read_while_approving):
+            counters.rebuild(Product, ProductStatusCounter)
+        self.assertEqual(outcomes, ['blocked'])
+        self.assertTrue(workflow.transition(Product.objects.get(pk=product.pk), 'approve'))
+        self.assertEqual(
+            counters.stored_counts(ProductStatusCounter), counters.expected_counts(Product)
+        )
+
+
+class SearchTests(ProductTestCase):
+
+    def add(self, name, description='Description', status='approved', price='9.99'):
+        return Product.objects.create(
+            name=name, description=description, price=price, status=status,
+            created_by=self.users['editor'], business=self.editor_profile
+        )
+
+    def search(self, query):
+        response = APIClient().get(f'/api/products/search/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_ranks_name_matches_first_and_hides_unapproved(self):
+        in_description = self.add('Shade', 'Fits any desk lamp')
+        in_name = self.add('Desk lamp', 'Adjustable')
+        self.add('Lamp draft', status='draft')
+        self.add('Chair')
+        ids = [row['id'] for row in self.search('q=lamp')['results']]
+        self.assertEqual(ids, [in_name.id, in_description.id])
+
+    def test_prefix_stemming_and_filters(self):
+        cheap = self.add('Running shoes', price='20.00')
+        self.add('Runner rug', price='80.00')
+        self.assertEqual(len(self.search('q=run')['results']), 2)
+        results = self.search('q=running&max_price=50')['results']
+        self.assertEqual([row['id'] for row in results], [cheap.id])
+        self.assertEqual(self.search(f'q=run&company={self.business.id + 1}')['results'], [])
+
+    def test_index_follows_writes(self):
+        product = self.add('Oak table')
+        self.assertEqual(len(self.search('q=oak')['results']), 1)
+        Product.objects.filter(pk=product.pk).update(name='Pine table')
+        self.assertEqual(self.search('q=oak')['results'], [])
+        self.assertEqual(len(self.search('q=pine')['results']), 1)
+        product.delete()
+        self.assertEqual(self.search('q=pine')['results'], [])
+
+    def test_paginates_by_rank(self):
+        for i in range(5):
+            self.add(f'Lamp {i}', 'lamp ' * i)
+        page = self.search('q=lamp&page_size=2')
+        seen = [row['id'] for row in page['results']]
+        while page['next']:
+            page = APIClient().get(page['next']).json()
+            seen.extend(row['id'] for row in page['results'])
+        self.assertEqual(sorted(seen), sorted(Product.objects.values_list('id', flat=True)))
+        self.assertEqual(len(seen), 5)
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.add('Lamp')
+        self.assertEqual(len(self.search('q="lamp*(')['results']), 1)
+        self.assertEqual(self.search('q=lamp" OR "x')['results'], [])  # every word must match
+        for query in ['!!!', '-', '*']:
+            self.assertEqual(self.search(f'q={query}')['results'], [])
+        self.assertEqual(APIClient().get('/api/products/search/').status_code, 400)
+
+
+class AutocompleteTests(ProductTestCase):
+
+    def add(self, name, status='approved'):
+        return Product.objects.create(
+            name=name, description='Description', price='9.99', status=status,
+            created_by=self.users['editor'], business=self.editor_profile
+        )
+
+    def complete(self, query):
+        response = APIClient().get(f'/api/products/autocomplete/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.json()['results']]
+
+    def test_matches_any_word_prefix_of_approved_names(self):
+        self.add('Rustic Oak Table')
+        self.add('Oak shelf')
+        self.add('Oak draft', status='draft')
+        self.assertEqual(self.complete('q=oak'), ['Oak shelf', 'Rustic Oak Table'])
+        self.assertEqual(self.complete('q=OAK%20%20ta'), ['Rustic Oak Table'])
+        self.assertEqual(self.complete('q=ru'), ['Rustic Oak Table'])
+        self.assertEqual(self.complete('q=ak'), [])
+        self.assertEqual(self.complete('q=oak&limit=1'), ['Oak shelf'])
+        self.assertEqual(APIClient().get('/api/products/autocomplete/').status_code, 400)
+
+    def test_local_changes_apply_incrementally(self):
+        lamp = self.add('Desk lamp')
+        self.assertEqual(self.complete('q=desk'), ['Desk lamp'])
+        index = autocomplete.index()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add('Desk chair', status='pending_approval')
+        with self.captureOnCommitCallbacks(execute=True):
+            workflow.transition(Product.objects.get(name='Desk chair'), 'approve')
+        with self.captureOnCommitCallbacks(execute=True):
+            lamp.name = 'Floor lamp'
+            lamp.save()
+        self.assertEqual(self.complete('q=desk'), ['Desk chair'])
+        self.assertEqual(self.complete('q=lamp'), ['Floor lamp'])
+        with self.captureOnCommitCallbacks(execute=True):
+            lamp.delete()
+        self.assertEqual(self.complete('q=lamp'), [])
+        self.assertIs(autocomplete.index(), index)
+
+    def test_catches_up_on_changes_from_elsewhere(self):
+        lamp = self.add('Desk lamp')
+        self.add('Desk chair')
+        self.assertEqual(self.complete('q=desk'), ['Desk chair', 'Desk lamp'])
+        index = autocomplete.index()
+        # Another process's writes: the generation moves without a local apply.
+        Product.objects.filter(pk=lamp.pk).update(name='Desk light')
+        catalogue.bump([lamp.pk])
+        Product.objects.filter(name='Desk chair').update(status='draft')
+        catalogue.bump([Product.objects.get(name='Desk chair').pk])
+        catalogue.bump()  # e.g. a business renamed; no names change
+        self.assertEqual(self.complete('q=desk'), ['Desk light'])
+        self.assertIs(autocomplete.index(), index)
+
+        catalogue.bump(everything=True)
+        self.assertEqual(self.complete('q=desk'), ['Desk light'])
+        self.assertIsNot(autocomplete.index(), index)
+
+    def test_batched_updates_match_a_fresh_build(self):
+        import random
+
+        rng = random.Random(7)
+        words = ['oak', 'oaken', 'lamp', 'table', 'desk', 'rustic', 'chair', 'o']
+        names = {i: ' '.join(rng.choices(words, k=rng.randint(1, 4))) for i in range(300)}
+        index = PrefixIndex()
+        index.load(list(names.items())[:100])
+        for start in range(100, 300, 50):
+            batch = [(i, names[i]) for i in range(start, start + 50)]
+            batch += [(rng.randrange(start), None) for _ in range(20)]
+            batch += [(j, f'renamed desk {j}') for j in rng.sample(range(start), 10)]
+            index.update(batch)
+            for product_id, name in batch:
+                if name is None:
+                    names.pop(product_id, None)
+                else:
+                    names[product_id] = name
+        expected = PrefixIndex()
+        expected.load(names.items())
+        self.assertEqual(len(index), len(names))
+        self.assertEqual([index._suffix(e) for e in index._entries], [expected._suffix(e) for e in expected._entries])
+        for prefix in ['o', 'oak', 'oak l', 'desk', 'lamp desk', 'z']:
+            self.assertEqual(sorted(index.complete(prefix, 500)), sorted(expected.complete(prefix, 500)))
+
+    def test_memory_budget_keeps_newest(self):
+        index = PrefixIndex(memory_budget=1000)
+        index.load((i, f'Product number {i}') for i in range(100, 0, -1))
+        self.assertTrue(index.truncated)
+        self.assertLessEqual(index.estimated_bytes, 1000)
+        self.assertEqual(index.complete('product', limit=1), [(100, 'Product number 100')])
+        self.assertEqual(index.complete('number 1', limit=50)[0], (100, 'Product number 100'))
+
+
+class SyntheticDataTests(ProductTestCase):
+    AS_OF = '2026-01-01T00:00:00Z'
+
+    def generate(self, **options):
+        from django.core.management import call_command
+
+        call_command(
+            'generate_marketplace_data', businesses=2, users_per_business=3, products_per_user=20,
+            as_of=parse_datetime(self.AS_OF), stdout=StringIO(), **options
+        )
+
+    def test_generates_consistent_searchable_data(self):
+        self.generate(seed=7)
+        generated = Product.objects.filter(created_by__username__startswith='gen7-')
+        self.assertEqual(generated.count(), 120)
+        self.assertEqual(UserProfile.objects.filter(user__username__startswith='gen7-', role='admin').count(), 2)
+        self.assertTrue(User.objects.get(username='gen7-user0@example.test').check_password('password123'))
+        for product in generated:
+            self.assertLessEqual(product.created_at, product.updated_at)
+            self.assertLessEqual(product.updated_at, parse_datetime(self.AS_OF))
+            self.assertEqual(product.submitted_at is None, product.status == 'draft')
+            self.assertEqual(product.reviewed_at is not None, product.status in ('approved', 'rejected'))
+            if product.reviewed_at:
+                self.assertEqual(product.review_time, product.reviewed_at - product.submitted_at)
+                self.assertEqual(product.reviewed_by.profile.business_id, product.business.business_id)
+        self.assert_counters_match()
+        name = generated.filter(status='approved').first().name
+        response = APIClient().get('/api/products/search/', {'q': name})
+        self.assertEqual(response.json()['results'][0]['name'], name)
+
+        # Search still follows ordinary writes once the load is done.
+        Product.objects.create(
+            name='Zeppelin', description='Airship', price='9.99', status='approved',
+            created_by=self.users['editor'], business=self.editor_profile
+        )
+        self.assertEqual(len(APIClient().get('/api/products/search/?q=zeppelin').json()['results']), 1)
+
+    def test_is_deterministic_per_seed(self):
+        from django.core.management.base import CommandError
+
+        def rows(seed):
+            return list(
+                Product.objects.filter(created_by__username__startswith=f'gen{seed}-')
+                .order_by('id').values_list('name', 'price', 'status', 'created_at', 'review_time')
+            )
+
+        self.generate(seed=1)
+        first = rows(1)
+        Product.objects.all().delete()
+        User.objects.filter(username__startswith='gen1-').delete()
+        self.generate(seed=1)
+        self.assertEqual(rows(1), first)
+        with self.assertRaises(CommandError):
+            self.generate(seed=1)
+
+
+class MetricsTests(ProductTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from marketplace import metrics
+
+        metrics.registry.clear()
+
+    def scrape(self):
+        response = APIClient().get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        return response.content.decode().splitlines()
+
+    def test_transitions_logins_queue_depth_and_latency(self):
+        drafts = self.create_products(3, status='draft')
+        with self.captureOnCommitCallbacks(execute=True):
+            for product in drafts:
+                self.client_for('editor').patch(f'/api/products/{product.id}/submit/')
+            self.client_for('approver').patch(f'/api/products/{drafts[0].id}/approve/')
+        client = APIClient()
+        client.post('/api/auth/login/', {'email': 'editor@acme.test', 'password': 'password123'}, format='json')
+        client.post('/api/auth/login/', {'email': 'editor@acme.test', 'password': 'wrong'}, format='json')
+        client.post('/api/auth/login/', {'email': 'nobody@acme.test', 'password': 'wrong'}, format='json')
+
+        lines = self.scrape()
+        self.assertIn('product_transitions_total{from="draft",to="pending_approval"} 3', lines)
+        self.assertIn('product_transitions_total{from="pending_approval",to="approved"} 1', lines)
+        self.assertIn('login_attempts_total{result="success"} 1', lines)
+        self.assertIn('login_attempts_total{result="failure"} 2', lines)
+        self.assertIn('approval_queue_depth 2', lines)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', lines)
+        self.assertIn(
+            'http_request_duration_seconds_count{method="PATCH",route="api/products/<int:product_id>/submit/",'
+            'status="200"} 3', lines
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{method="PATCH",route="api/products/<int:product_id>/submit/",'
+            'status="200",le="+Inf"} 3', lines
+        )
+
+    def test_scrape_adds_up_other_processes(self):
+        import json
+        import tempfile
+        from marketplace import metrics
+
+        metrics.LOGIN_ATTEMPTS.inc('success', amount=2)
+        with tempfile.TemporaryDirectory() as directory:
+            metrics.registry.write(directory)
+            # Another worker's snapshot, and this process's own file, which the live values supersede.
+            with open(f'{directory}/1.json', 'w') as f:
+                json.dump({'login_attempts_total': [[['success'], 5]], 'retired_metric': [[[], 1]]}, f)
+            metrics.LOGIN_ATTEMPTS.inc('success')
+            lines = metrics.registry.exposition(directory).splitlines()
+        self.assertIn('login_attempts_total{result="success"} 8', lines)
+        self.assertNotIn('retired_metric', '\n'.join(lines))
+
+
+class ApiBenchmarkTests(TestCase):
+
+    def test_every_route_has_a_benchmark(self):
+        from .management.commands.benchmark_api import uncovered_routes
+
+        self.assertEqual(uncovered_routes(), [])
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path('', views.ProductListCreateView.as_view(), name='product-list-create'),
@@ -10,6 +10,17 @@ urlpatterns = [
     path('analytics/', views.analytics_data, name='analytics-data'),
     path('<int:product_id>/approve/', views.approve_product, name='approve-product'),
     path('<int:product_id>/reject/', views.reject_product, name='reject-product'),
+    path('bulk/<str:action>/', views.bulk_review, name='bulk-review'),
     path('<int:product_id>/submit/', views.submit_for_approval, name='submit-for-approval'),
+    path('import/<str:import_format>/', views.import_products, name='import-products'),
     path('public/', views.public_products, name='public-products'),
+    path('public/facets/', views.public_facets, name='public-facets'),
+    path('search/', views.search_products, name='search-products'),
+    path('autocomplete/', views.autocomplete_products, name='autocomplete-products'),
+
+    # ASGI-native variants of the read-only endpoints
+    path('async/public/', async_views.public_products, name='public-products-async'),
+    path('async/pending/', async_views.pending_products, name='pending-products-async'),
+    path('async/stats/', async_views.approval_stats, name='approval-stats-async'),
+    path('async/analytics/', async_views.analytics_data, name='analytics-data-async'),
 ]
\ No newline at end of file
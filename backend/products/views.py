@@ -1,14 +1,30 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated
+from datetime import timedelta
+from django.conf import settings
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from .models import Product
-from .serializers import ProductSerializer, ProductCreateSerializer
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from . import catalogue, facets, search, workflow
+from .listing import paginated_rows
+from .autocomplete import DEFAULT_LIMIT as AUTOCOMPLETE_LIMIT, MAX_LIMIT as AUTOCOMPLETE_MAX_LIMIT, autocomplete
+from .models import Product, ProductStatusCounter
+from .serializers import (
+    BulkReviewSerializer, CatalogueFilterSerializer, ProductCreateSerializer, ProductSerializer
+)
+from authentication import activity
 from authentication.decorators import role_required
+from authentication.models import UserProfile
+from marketplace.pagination import KeysetPagination, SearchPagination
+from marketplace.renderers import FastJSONRenderer
 
 class ProductListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -18,9 +34,13 @@ class ProductListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         if hasattr(user, 'profile'):
-            return Product.objects.filter(business=user.profile)
+            return Product.objects.for_listing().filter(business=user.profile)
         return Product.objects.none()
 
+    def perform_create(self, serializer):
+        product = serializer.save()
+        activity.record(self.request.user, 'product.created', f'Created product "{product.name}"', product.status, product)
+
 class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -28,17 +48,29 @@ class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         user = self.request.user
         if hasattr(user, 'profile'):
-            return Product.objects.filter(business=user.profile)
+            return Product.objects.for_listing().filter(business=user.profile)
         return Product.objects.none()
 
+    def perform_update(self, serializer):
+        try:
+            product = serializer.save()
+        except Product.DoesNotExist:
+            raise Http404
+        activity.record(self.request.user, 'product.updated', f'Updated product "{product.name}"', product.status, product)
+
+    def perform_destroy(self, instance):
+        name = instance.name
+        instance.delete()
+        activity.record(self.request.user, 'product.deleted', f'Deleted product "{name}"')
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@renderer_classes([FastJSONRenderer])
 @role_required(['approver', 'admin'])
 def pending_products(request):
     """Get all products pending approval"""
     products = Product.objects.filter(status='pending_approval')
-    serializer = ProductSerializer(products, many=True)
-    return Response(serializer.data)
+    return Response(paginated_rows(request, products))
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
@@ -46,20 +78,17 @@ def pending_products(request):
 def rejected_products(request):
     """Get all rejected products"""
     products = Product.objects.filter(status='rejected')
-    serializer = ProductSerializer(products, many=True)
-    return Response(serializer.data)
+    return Response(paginated_rows(request, products))
 
 @api_view(['PATCH'])
 @permission_classes([permissions.IsAuthenticated])
 @role_required(['approver', 'admin'])
 def approve_product(request, product_id):
     """Approve a product"""
-    product = get_object_or_404(Product, id=product_id)
-    if product.status != 'pending_approval':
+    product = get_object_or_404(Product.objects.for_listing(), id=product_id)
+    if not workflow.transition(product, 'approve', request.user.pk):
         return Response({'error': 'Product is not pending approval'}, status=400)
-    
-    product.status = 'approved'
-    product.save()
+    activity.record(request.user, 'product.approved', f'Approved product "{product.name}"', product.status, product)
     serializer = ProductSerializer(product)
     return Response(serializer.data)
 
@@ -68,106 +97,122 @@ def approve_product(request, product_id):
 @role_required(['approver', 'admin'])
 def reject_product(request, product_id):
     """Reject a product"""
-    product = get_object_or_404(Product, id=product_id)
-    if product.status != 'pending_approval':
+    product = get_object_or_404(Product.objects.for_listing(), id=product_id)
+    if not workflow.transition(product, 'reject', request.user.pk):
         return Response({'error': 'Product is not pending approval'}, status=400)
-    
-    product.status = 'rejected'
-    product.save()
+    activity.record(request.user, 'product.rejected', f'Rejected product "{product.name}"', product.status, product)
     serializer = ProductSerializer(product)
     return Response(serializer.data)
 
-@api_view(['GET'])
+BULK_ACTIONS = ['approve', 'reject']
+
+@api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 @role_required(['approver', 'admin'])
-def approval_stats(request):
-    """Get approval statistics for approver dashboard"""
-    from django.utils import timezone
-    
-    today = timezone.now().date()
-    
-    pending_count = Product.objects.filter(status='pending_approval').count()
-    approved_today = Product.objects.filter(
-        status='approved',
-        updated_at__date=today
-    ).count()
-    total_reviewed = Product.objects.filter(
-        status__in=['approved', 'rejected']
-    ).count()
-    
-    stats = {
-        'pending_reviews': pending_count,
-        'approved_today': approved_today,
-        'total_reviewed': total_reviewed,
-        'avg_review_time': '0h'
+def bulk_review(request, action):
+    """Approve or reject many pending products at once"""
+    if action not in BULK_ACTIONS:
+        return Response({'error': 'Unknown action'}, status=404)
+    serializer = BulkReviewSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+
+    if 'ids' in serializer.validated_data:
+        succeeded, skipped = workflow.transition_ids(serializer.validated_data['ids'], action, request.user.pk)
+    else:
+        succeeded = workflow.transition_matching(
+            Product.objects.filter(**serializer.filter_lookups()), action, request.user.pk
+        )
+        skipped = []
+    if succeeded:
+        to_status = workflow.TRANSITIONS[action][1]
+        activity.record(
+            request.user, f'product.{to_status}', f'{action.capitalize()}d {len(succeeded)} products in bulk', to_status
+        )
+    return Response({'succeeded': succeeded, 'skipped': skipped})
+
+# Review latency stats cover reviews made in this trailing window.
+REVIEW_STATS_WINDOW = timedelta(days=getattr(settings, 'REVIEW_STATS_WINDOW_DAYS', 30))
+
+def review_stats_since():
+    return timezone.now() - REVIEW_STATS_WINDOW
+
+def format_hours(duration):
+    if duration is None:
+        return '0h'
+    return f'{duration.total_seconds() / 3600:.1f}h'
+
+def build_approval_stats(counts, review_times):
+    return {
+        'pending_reviews': counts['pending'],
+        'approved_today': counts['approved_today'],
+        'total_reviewed': counts['approved'] + counts['rejected'],
+        'avg_review_time': format_hours(review_times['avg']),
+        'p50_review_time': format_hours(review_times['p50']),
+        'p95_review_time': format_hours(review_times['p95']),
+        'review_time_seconds': {
+            name: review_times[name] and round(review_times[name].total_seconds())
+            for name in ['avg', 'p50', 'p95']
+        },
+        'review_time_sample': review_times['count'],
     }
-    
-    return Response(stats)
 
-@api_view(['GET'])
-@permission_classes([permissions.IsAuthenticated])
-@role_required(['approver', 'admin'])
-def analytics_data(request):
-    """Get comprehensive analytics data for approver dashboard"""
-    from django.utils import timezone
-    from datetime import timedelta
-    from django.db.models import Count, Q
-    
-    today = timezone.now().date()
-    week_ago = today - timedelta(days=7)
-    
-    # Basic counts
-    total_products = Product.objects.count()
-    approved_count = Product.objects.filter(status='approved').count()
-    rejected_count = Product.objects.filter(status='rejected').count()
-    pending_count = Product.objects.filter(status='pending_approval').count()
+def build_analytics(counts, editor_stats, editors):
+    """Assemble the analytics payload from counters and the top-editor rows"""
+    approved_count = counts['approved']
+    rejected_count = counts['rejected']
     
     # Calculate approval rate
     reviewed_total = approved_count + rejected_count
     approval_rate = (approved_count / reviewed_total * 100) if reviewed_total > 0 else 0
     
-    # Weekly trends
-    weekly_approved = Product.objects.filter(
-        status='approved',
-        updated_at__date__gte=week_ago
-    ).count()
-    
-    weekly_rejected = Product.objects.filter(
-        status='rejected',
-        updated_at__date__gte=week_ago
-    ).count()
-    
-    # Top editors by approval rate
-    editor_stats = Product.objects.filter(
-        status__in=['approved', 'rejected']
-    ).values('business__user__first_name', 'business__user__email').annotate(
-        total=Count('id'),
-        approved=Count('id', filter=Q(status='approved'))
-    ).order_by('-approved')[:5]
-    
     # Add approval rate and name to editor stats
     for editor in editor_stats:
+        user = editors[editor.pop('business')].user
+        editor['business__user__first_name'] = user.first_name
+        editor['business__user__email'] = user.email
         editor['approval_rate'] = (editor['approved'] / editor['total'] * 100) if editor['total'] > 0 else 0
         editor['name'] = editor['business__user__first_name'] or editor['business__user__email']
     
-    analytics = {
+    return {
         'overview': {
-            'total_products': total_products,
+            'total_products': counts['total'],
             'approved_count': approved_count,
             'rejected_count': rejected_count,
-            'pending_count': pending_count,
+            'pending_count': counts['pending'],
             'approval_rate': round(approval_rate, 1),
             'reviewed_total': reviewed_total
         },
         'trends': {
-            'weekly_approved': weekly_approved,
-            'weekly_rejected': weekly_rejected,
-            'weekly_total': weekly_approved + weekly_rejected
+            'weekly_approved': counts['weekly_approved'],
+            'weekly_rejected': counts['weekly_rejected'],
+            'weekly_total': counts['weekly_approved'] + counts['weekly_rejected']
         },
-        'top_editors': list(editor_stats)
+        'top_editors': editor_stats
     }
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+@role_required(['approver', 'admin'])
+def approval_stats(request):
+    """Get approval statistics for approver dashboard"""
+    counts = ProductStatusCounter.objects.dashboard_counts()
+    review_times = Product.objects.review_time_stats(review_stats_since())
+    return Response(build_approval_stats(counts, review_times))
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+@role_required(['approver', 'admin'])
+def analytics_data(request):
+    """Get comprehensive analytics data for approver dashboard"""
+    counts = ProductStatusCounter.objects.dashboard_counts()
     
-    return Response(analytics)
+    # Top editors by approval rate
+    editor_stats = list(ProductStatusCounter.objects.top_businesses())
+    editors = UserProfile.objects.select_related('user').in_bulk(
+        [editor['business'] for editor in editor_stats]
+    )
+    
+    return Response(build_analytics(counts, editor_stats, editors))
 
 @api_view(['PATCH'])
 @permission_classes([permissions.IsAuthenticated])
@@ -177,18 +222,119 @@ def submit_for_approval(request, product_id):
     if not hasattr(user, 'profile'):
         return Response({'error': 'User profile not found'}, status=400)
     
-    product = get_object_or_404(Product, id=product_id, business=user.profile)
-    if product.status != 'draft':
+    product = get_object_or_404(Product.objects.for_listing(), id=product_id, business=user.profile)
+    if not workflow.transition(product, 'submit'):
         return Response({'error': 'Only draft products can be submitted for approval'}, status=400)
-    
-    product.status = 'pending_approval'
-    product.save()
+    activity.record(user, 'product.submitted', f'Submitted product "{product.name}"', product.status, product)
     serializer = ProductSerializer(product)
     return Response(serializer.data)
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+@role_required(['editor', 'admin'])
+def import_products(request, import_format):
+    """Bulk-create draft products from an uploaded CSV or JSON Lines file"""
+    from . import imports
+    if import_format not in imports.READERS:
+        return Response(
+            {'error': f'Unsupported format. Use one of: {", ".join(imports.READERS)}'},
+            status=400
+        )
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'error': 'file is required'}, status=400)
+    try:
+        batch_size = int(request.data.get('batch_size', imports.DEFAULT_BATCH_SIZE))
+    except (TypeError, ValueError):
+        return Response({'error': 'batch_size must be an integer'}, status=400)
+    batch_size = max(1, min(batch_size, imports.MAX_BATCH_SIZE))
+
+    user = request.user
+    if not hasattr(user, 'profile'):
+        return Response({'error': 'User profile not found'}, status=400)
+
+    rows = imports.READERS[import_format](upload.file)
+    report = imports.import_products(rows, user, user.profile, batch_size)
+    if report.imported:
+        activity.record(user, 'product.created', f'Imported {report.imported} products', 'draft')
+    return Response(report.as_dict(), status=201 if report.imported else 400)
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def search_products(request):
+    """Ranked full-text search over approved products' names and descriptions"""
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'q is required'}, status=400)
+    filters = CatalogueFilterSerializer(data=request.query_params)
+    filters.is_valid(raise_exception=True)
+    products = Product.objects.filter(status='approved', **filters.lookups())
+    return Response(paginated_rows(request, search.search(products, query), SearchPagination))
+
 @api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def autocomplete_products(request):
+    """Approved product names with a word starting with ``q``, from the in-process index"""
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'q is required'}, status=400)
+    try:
+        limit = int(request.query_params.get('limit', AUTOCOMPLETE_LIMIT))
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=400)
+    limit = max(1, min(limit, AUTOCOMPLETE_MAX_LIMIT))
+    matches = autocomplete.complete(query, limit)
+    return Response({'results': [{'id': product_id, 'name': name} for product_id, name in matches]})
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+@renderer_classes([FastJSONRenderer])
 def public_products(request):
-    """Public endpoint for approved products"""
-    products = Product.objects.filter(status='approved')
-    serializer = ProductSerializer(products, many=True)
-    return Response(serializer.data)
\ No newline at end of file
+    """Public endpoint for approved products, filterable, cached per catalogue generation"""
+    filters = CatalogueFilterSerializer(data=request.query_params)
+    filters.is_valid(raise_exception=True)
+    generation, changed_at = catalogue.current()
+    key = catalogue.cache_key('public', generation, request.query_params, request.get_host())
+    etag = catalogue.etag(key)
+    last_modified = int(changed_at.timestamp())
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+    
+    cache = catalogue.get_cache()
+    data = cache.get(key)
+    if data is None:
+        products = Product.objects.filter(status='approved', **filters.lookups())
+        data = paginated_rows(request, products)
+        cache.set(key, data)
+    
+    response = Response(data)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def public_facets(request):
+    """Facet counts for the public catalogue under the given filters, from one grouped query"""
+    filters = CatalogueFilterSerializer(data=request.query_params)
+    filters.is_valid(raise_exception=True)
+    generation, changed_at = catalogue.current()
+    # Keyed by the validated filters, so equivalent query strings share an entry.
+    key = catalogue.cache_key('facets', generation, filters.signature())
+    etag = catalogue.etag(key)
+    last_modified = int(changed_at.timestamp())
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    cache = catalogue.get_cache()
+    data = cache.get(key)
+    if data is None:
+        data = facets.facet_counts(Product.objects.filter(status='approved', **filters.lookups()))
+        cache.set(key, data)
+
+    response = Response(data)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -0,0 +1,171 @@
+"""
+Product status state machine.
+
+TRANSITIONS is the only way a product's status moves through the review
+workflow. Every transition is a conditional UPDATE that matches the status
+(and the moment the product entered it) the caller last saw, so when two
+requests race for the same product exactly one UPDATE matches and the other
+reports failure. Only ``status``, ``status_changed_at`` and ``updated_at`` are
+written, plus the review stamps: ``submitted_at`` on submit, ``reviewed_at``,
+``reviewed_by`` and ``review_time`` on approve/reject. Counter deltas and the
+catalogue bump are applied in the same transaction, explicitly, since queryset
+updates skip the model signals.
+
+Batches move every eligible product of a chunk with one such UPDATE: the
+eligible rows are locked and read first (id, name, business, status_changed_at),
+then updated with ``WHERE id IN (...) AND status = <from>``, and counters and
+the catalogue are updated once per chunk instead of once per product.
+
+Edits to a product's other columns go through ``save_edits()``, which writes
+only the edited columns and never status, so an edit made from a copy read
+before a transition cannot undo it.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models import DurationField, ExpressionWrapper, F, Value
+from django.utils import timezone
+
+from marketplace import metrics
+from . import catalogue, counters
+from .autocomplete import autocomplete
+from .models import Product
+
+# action: (from_status, to_status)
+TRANSITIONS = {
+    'submit': ('draft', 'pending_approval'),
+    'approve': ('pending_approval', 'approved'),
+    'reject': ('pending_approval', 'rejected'),
+}
+
+REVIEW_ACTIONS = {'approve', 'reject'}
+
+CHUNK_SIZE = 1000
+
+
+def action_between(from_status, to_status):
+    """The action that moves a product from ``from_status`` to ``to_status``, or None."""
+    for action, statuses in TRANSITIONS.items():
+        if statuses == (from_status, to_status):
+            return action
+    return None
+
+
+def _stamps(action, now, user_id):
+    """Columns besides the status ones that ``action`` writes."""
+    if action == 'submit':
+        return {'submitted_at': now}
+    if action in REVIEW_ACTIONS:
+        return {
+            'reviewed_at': now,
+            'reviewed_by_id': user_id,
+            'review_time': ExpressionWrapper(Value(now) - F('submitted_at'), output_field=DurationField()),
+        }
+    return {}
+
+
+def _record(rows, from_status, to_status, now):
+    """Apply counters and catalogue changes for ``(id, name, business_id, changed_at)`` rows that moved."""
+    changes = []
+    for _, _, business_id, changed_at in rows:
+        changes.append(counters.left(business_id, from_status, changed_at))
+        changes.append((business_id, to_status, counters.status_day(now), 1))
+    counters.apply_changes(changes)
+    transaction.on_commit(partial(metrics.PRODUCT_TRANSITIONS.inc, from_status, to_status, amount=len(rows)))
+    if catalogue.affects_catalogue(from_status, to_status):
+        catalogue.bump([product_id for product_id, _, _, _ in rows])
+        approved = to_status == 'approved'
+        autocomplete.apply([(product_id, name if approved else None) for product_id, name, _, _ in rows])
+
+
+def transition(product, action, user_id=None):
+    """
+    Apply ``action`` to ``product`` if it is still in the state it was read in.
+
+    ``user_id`` is recorded as the reviewer for approve/reject.
+
+    Returns False, leaving ``product`` untouched, when the action does not
+    apply to its status or another request changed it first.
+    """
+    from_status, to_status = TRANSITIONS[action]
+    if product.status != from_status:
+        return False
+    now = timezone.now()
+    with transaction.atomic():
+        updated = Product.objects.filter(
+            pk=product.pk, status=from_status, status_changed_at=product.status_changed_at
+        ).update(status=to_status, status_changed_at=now, updated_at=now, **_stamps(action, now, user_id))
+        if not updated:
+            return False
+        _record(
+            [(product.pk, product.name, product.business_id, product.status_changed_at)], from_status, to_status, now
+        )
+    product.status, product.status_changed_at, product.updated_at = to_status, now, now
+    if action == 'submit':
+        product.submitted_at = now
+    elif action in REVIEW_ACTIONS:
+        product.reviewed_at, product.reviewed_by_id = now, user_id
+        product.review_time = now - product.submitted_at if product.submitted_at else None
+    product._remember_status()
+    return True
+
+
+def save_edits(product, fields):
+    """
+    Write ``fields`` of ``product`` (plus ``updated_at``) and nothing else.
+
+    The status ``product`` was read with may be stale, so the current one is
+    re-read under a row lock first; the save signals then bump the catalogue
+    and update autocomplete according to the status the row really has.
+    Raises Product.DoesNotExist if the product was deleted meanwhile.
+    """
+    with transaction.atomic():
+        product.status, product.status_changed_at = (
+            Product.objects.select_for_update().filter(pk=product.pk)
+            .values_list('status', 'status_changed_at').get()
+        )
+        product._remember_status()
+        product.save(update_fields=[*fields, 'updated_at'])
+
+
+def _transition_chunk(ids, action, user_id):
+    from_status, to_status = TRANSITIONS[action]
+    with transaction.atomic():
+        rows = list(
+            Product.objects.filter(id__in=ids, status=from_status).select_for_update()
+            .order_by('id').values_list('id', 'name', 'business_id', 'status_changed_at')
+        )
+        if not rows:
+            return []
+        now = timezone.now()
+        ids = [row[0] for row in rows]
+        Product.objects.filter(id__in=ids, status=from_status).update(
+            status=to_status, status_changed_at=now, updated_at=now, **_stamps(action, now, user_id)
+        )
+        _record(rows, from_status, to_status, now)
+    return ids
+
+
+def transition_ids(ids, action, user_id=None, chunk_size=CHUNK_SIZE):
+    """Apply ``action`` to the listed products; return ``(succeeded, skipped)`` id lists."""
+    ids = list(dict.fromkeys(ids))
+    succeeded = []
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        succeeded.extend(_transition_chunk(chunk, action, user_id))
+    moved = set(succeeded)
+    return succeeded, [product_id for product_id in ids if product_id not in moved]
+
+
+def transition_matching(queryset, action, user_id=None, chunk_size=CHUNK_SIZE):
+    """Apply ``action`` to every eligible product in ``queryset``, chunk by chunk."""
+    from_status = TRANSITIONS[action][0]
+    succeeded = []
+    last_id = 0
+    while True:
+        chunk = queryset.filter(status=from_status, id__gt=last_id).order_by('id')
+        chunk_ids = list(chunk.values_list('id', flat=True)[:chunk_size])
+        if not chunk_ids:
+            return succeeded
+        succeeded.extend(_transition_chunk(chunk_ids, action, user_id))
+        last_id = chunk_ids[-1]
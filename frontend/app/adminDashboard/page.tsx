@@ -134,12 +134,12 @@ export default function AdminDashboard() {
   const fetchActivities = async () => {
     try {
       const token = Cookies.get('auth_token');
-      const response = await fetch('http://localhost:8000/api/auth/admin/activities/', {
+      const response = await fetch('http://localhost:8000/api/auth/admin/activities/?page_size=5', {
         headers: { 'Authorization': `Bearer ${token}` }
       });
       if (response.ok) {
         const data = await response.json();
-        setActivities(data);
+        setActivities(data.results);
       }
     } catch (error) {
       console.error('Error fetching activities:', error);